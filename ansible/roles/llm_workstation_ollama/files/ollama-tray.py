@@ -3,6 +3,17 @@
 Ollama System Tray Controller
 KDE Plasma system tray application for managing Ollama LLM service.
 Uses pystray for better Wayland/KDE compatibility.
+
+Service state is pushed, not polled: a background thread subscribes to the
+ollama unit's PropertiesChanged signals on the system D-Bus (via jeepney)
+and updates the icon as soon as ActiveState changes, including changes made
+outside the tray. If D-Bus or jeepney is unavailable it falls back to
+polling `systemctl is-active`, backing off from CHECK_INTERVAL to
+MAX_CHECK_INTERVAL while the state is stable.
+
+Icons are rendered once at startup: every static badge and all ANIM_FRAMES
+frames of the starting/stopping spinner, drawn at the base image's
+resolution and downscaled to ICON_SIZE. Animating is then a dict lookup.
 """
 
 import subprocess
@@ -11,6 +22,7 @@ import sys
 import threading
 import time
 import math
+import os
 from pathlib import Path
 
 import pystray
@@ -18,7 +30,13 @@ from PIL import Image, ImageDraw
 
 # Dark icon has proper transparency - we'll make it white for dark themes
 ICON_PATH = "/usr/share/icons/hicolor/256x256/apps/ollama.png"
-CHECK_INTERVAL = 3  # seconds
+CHECK_INTERVAL = 3  # seconds, fallback polling when the state just changed
+MAX_CHECK_INTERVAL = 30  # seconds, fallback polling once the state is stable
+UNIT_NAME = "ollama.service"
+# Tray icons are shown at 22-48px; render once at this size (HiDPI headroom)
+ICON_SIZE = int(os.environ.get("OLLAMA_TRAY_ICON_SIZE", "64"))
+ANIM_FRAMES = 8  # spinner frames, 45 degrees apart
+ANIM_INTERVAL = 0.15  # seconds per frame
 
 # Badge colors
 COLOR_RUNNING = (46, 204, 113)     # Green - online
@@ -34,6 +52,34 @@ STATE_STOPPING = "stopping"
 STATE_ERROR = "error"
 
 
+def _failure_detail():
+    try:
+        detail = subprocess.run(
+            ["systemctl", "status", "ollama", "--no-pager", "-l"],
+            capture_output=True, text=True, timeout=5
+        )
+        return f"Service failed:\n{detail.stdout[-500:]}"
+    except Exception as e:
+        return f"Service failed (couldn't get details: {e})"
+
+
+def state_from_active(status):
+    """
+    Map a systemd ActiveState to (state, error_msg).
+    """
+    if status == "active":
+        return STATE_RUNNING, None
+    elif status in ("inactive", "dead"):
+        return STATE_STOPPED, None
+    elif status in ("activating", "reloading"):
+        return STATE_STARTING, None
+    elif status == "deactivating":
+        return STATE_STOPPING, None
+    elif status == "failed":
+        return STATE_ERROR, _failure_detail()
+    return STATE_ERROR, f"Unknown service state: {status}"
+
+
 def get_ollama_state():
     """
     Get actual ollama service state. Returns (state, error_msg).
@@ -44,33 +90,52 @@ def get_ollama_state():
             ["systemctl", "is-active", "ollama"],
             capture_output=True, text=True, timeout=5
         )
-        status = result.stdout.strip()
-        if status == "active":
-            return STATE_RUNNING, None
-        elif status in ("inactive", "dead"):
-            return STATE_STOPPED, None
-        elif status == "activating":
-            return STATE_STARTING, None
-        elif status == "deactivating":
-            return STATE_STOPPING, None
-        elif status == "failed":
-            # Get failure reason
-            try:
-                detail = subprocess.run(
-                    ["systemctl", "status", "ollama", "--no-pager", "-l"],
-                    capture_output=True, text=True, timeout=5
-                )
-                return STATE_ERROR, f"Service failed:\n{detail.stdout[-500:]}"
-            except Exception as e:
-                return STATE_ERROR, f"Service failed (couldn't get details: {e})"
-        else:
-            return STATE_ERROR, f"Unknown service state: {status}"
+        return state_from_active(result.stdout.strip())
     except subprocess.TimeoutExpired:
         return STATE_ERROR, "Timeout checking service status"
     except Exception as e:
         return STATE_ERROR, f"Error checking status: {e}"
 
 
+def watch_unit_dbus(on_active_state, should_stop):
+    """
+    Call on_active_state(ActiveState) with the unit's current state and then
+    on every change, until should_stop() is true. Blocks; raises if the
+    system bus or jeepney is unavailable so the caller can fall back.
+    """
+    from jeepney import DBusAddress, MatchRule, message_bus, new_method_call
+    from jeepney.io.blocking import Proxy, open_dbus_connection
+
+    systemd = "org.freedesktop.systemd1"
+    unit_iface = "org.freedesktop.systemd1.Unit"
+    with open_dbus_connection(bus="SYSTEM") as conn:
+        manager = DBusAddress("/org/freedesktop/systemd1", bus_name=systemd,
+                              interface="org.freedesktop.systemd1.Manager")
+        # systemd only emits unit signals while a client is subscribed
+        conn.send_and_get_reply(new_method_call(manager, "Subscribe"))
+        unit_path = conn.send_and_get_reply(
+            new_method_call(manager, "LoadUnit", "s", (UNIT_NAME,))).body[0]
+
+        match = dict(type="signal", path=unit_path,
+                     interface="org.freedesktop.DBus.Properties", member="PropertiesChanged")
+        # The bus filters on the well-known sender name; delivered messages
+        # carry systemd's unique name, so the local filter leaves it out.
+        Proxy(message_bus, conn).AddMatch(MatchRule(sender=systemd, **match))
+        with conn.filter(MatchRule(**match)) as queue:
+            props = DBusAddress(unit_path, bus_name=systemd, interface="org.freedesktop.DBus.Properties")
+            reply = conn.send_and_get_reply(
+                new_method_call(props, "Get", "ss", (unit_iface, "ActiveState")))
+            on_active_state(reply.body[0][1])
+            while not should_stop():
+                try:
+                    msg = conn.recv_until_filtered(queue, timeout=1)
+                except TimeoutError:
+                    continue
+                interface, changed, _ = msg.body
+                if interface == unit_iface and "ActiveState" in changed:
+                    on_active_state(changed["ActiveState"][1])
+
+
 def run_systemctl(action):
     """
     Run systemctl action. Returns (success, error_msg).
@@ -197,6 +262,22 @@ def create_icon_with_badge(base_img, state, anim_frame=0):
     return img
 
 
+def render_icon_frames(base_img, size=ICON_SIZE):
+    """
+    Pre-render every icon the tray can show, keyed by (state, frame).
+    Static states only have frame 0; transitional states have ANIM_FRAMES.
+    """
+    frames = {}
+    for state in (STATE_RUNNING, STATE_STOPPED, STATE_ERROR, STATE_STARTING, STATE_STOPPING):
+        count = ANIM_FRAMES if state in (STATE_STARTING, STATE_STOPPING) else 1
+        for frame in range(count):
+            img = create_icon_with_badge(base_img, state, frame)
+            if img.width != size:
+                img = img.resize((size, size), Image.LANCZOS)
+            frames[(state, frame)] = img
+    return frames
+
+
 class OllamaTray:
     def __init__(self):
         self.app_running = True
@@ -205,19 +286,21 @@ class OllamaTray:
         self.anim_frame = 0
         self.anim_timer = None
         self.lock = threading.Lock()
+        # Live unit state, fed by D-Bus or fallback polling; actions wait on it
+        self.live_state = None
+        self.live_changed = threading.Condition()
+        self.action_in_progress = False
+        self.dbus_active = False
+        self.poll_now = threading.Event()
         
         self.base_icon = load_base_icon()
         
-        # Pre-generate static icons
-        self.static_icons = {
-            STATE_RUNNING: create_icon_with_badge(self.base_icon, STATE_RUNNING),
-            STATE_STOPPED: create_icon_with_badge(self.base_icon, STATE_STOPPED),
-            STATE_ERROR: create_icon_with_badge(self.base_icon, STATE_ERROR),
-        }
+        # Pre-render all static icons and animation frames
+        self.frames = render_icon_frames(self.base_icon)
         
         self.icon = pystray.Icon(
             "ollama-tray",
-            self.static_icons[STATE_STOPPED],
+            self.frames[(STATE_STOPPED, 0)],
             "Ollama",
             menu=self._create_menu()
         )
@@ -289,10 +372,10 @@ class OllamaTray:
         if self.current_state not in (STATE_STARTING, STATE_STOPPING):
             return  # State changed, stop animating
         
-        self.anim_frame = (self.anim_frame + 1) % 8
-        self.icon.icon = create_icon_with_badge(self.base_icon, state, self.anim_frame)
+        self.anim_frame = (self.anim_frame + 1) % ANIM_FRAMES
+        self.icon.icon = self.frames[(state, self.anim_frame)]
         
-        self.anim_timer = threading.Timer(0.15, self._animate_tick, args=[state])
+        self.anim_timer = threading.Timer(ANIM_INTERVAL, self._animate_tick, args=[state])
         self.anim_timer.daemon = True
         self.anim_timer.start()
     
@@ -308,7 +391,7 @@ class OllamaTray:
             # Stop animation if we're no longer transitioning
             if new_state not in (STATE_STARTING, STATE_STOPPING):
                 self._stop_animation()
-                self.icon.icon = self.static_icons.get(new_state, self.static_icons[STATE_ERROR])
+                self.icon.icon = self.frames.get((new_state, 0), self.frames[(STATE_ERROR, 0)])
             elif old_state not in (STATE_STARTING, STATE_STOPPING):
                 # Just started transitioning, begin animation
                 self._start_animation(new_state)
@@ -327,76 +410,74 @@ class OllamaTray:
     def _refresh_state(self):
         """Check actual state and update icon."""
         state, error = get_ollama_state()
-        self._set_state(state, error)
+        self._on_live_state(state, error)
+    
+    def _on_live_state(self, state, error=None):
+        """Record a unit state observation; reflect it unless an action owns the icon."""
+        with self.live_changed:
+            self.live_state = state
+            self.live_changed.notify_all()
+        if not self.action_in_progress:
+            self._set_state(state, error)
+    
+    def _await_state(self, targets, timeout):
+        """
+        Wait until the unit reaches one of *targets* (or errors); returns the
+        last observed state. Event-driven with D-Bus, 0.5s polls without.
+        """
+        deadline = time.monotonic() + timeout
+        if not self.dbus_active:
+            while True:
+                state, _ = get_ollama_state()
+                with self.live_changed:
+                    self.live_state = state
+                if state in targets or state == STATE_ERROR or time.monotonic() >= deadline:
+                    return state
+                time.sleep(0.5)
+        with self.live_changed:
+            self.live_changed.wait_for(
+                lambda: self.live_state in targets or self.live_state == STATE_ERROR,
+                timeout=max(0.0, deadline - time.monotonic())
+            )
+            return self.live_state
+    
+    def _run_action(self, action, target, timeout, icon):
+        """Run systemctl *action* and wait for *target*, owning the icon meanwhile."""
+        self.action_in_progress = True
+        try:
+            success, error = run_systemctl(action)
+            if not success:
+                self._set_state(STATE_ERROR, error)
+                icon.notify(f"Failed to {action}: {error[:50]}", "Ollama")
+                return
+            state = self._await_state((target,), timeout)
+            if state != target:
+                state, error = get_ollama_state()
+                self._set_state(state, error)
+            else:
+                self._set_state(state)
+        finally:
+            self.action_in_progress = False
+            self.poll_now.set()
     
     def _toggle_ollama(self, icon, item):
         if self.current_state == STATE_RUNNING:
             self._set_state(STATE_STOPPING)
             icon.notify("Stopping Ollama...", "Ollama")
-            
-            def do_stop():
-                success, error = run_systemctl("stop")
-                if not success:
-                    self._set_state(STATE_ERROR, error)
-                    icon.notify(f"Failed to stop: {error[:50]}", "Ollama")
-                else:
-                    # Poll until stopped
-                    for _ in range(10):
-                        time.sleep(0.5)
-                        state, err = get_ollama_state()
-                        if state == STATE_STOPPED:
-                            self._set_state(STATE_STOPPED)
-                            return
-                    self._refresh_state()
-            
-            threading.Thread(target=do_stop, daemon=True).start()
+            threading.Thread(target=self._run_action,
+                             args=("stop", STATE_STOPPED, 5, icon), daemon=True).start()
         
         elif self.current_state == STATE_STOPPED:
             self._set_state(STATE_STARTING)
             icon.notify("Starting Ollama...", "Ollama")
-            
-            def do_start():
-                success, error = run_systemctl("start")
-                if not success:
-                    self._set_state(STATE_ERROR, error)
-                    icon.notify(f"Failed to start: {error[:50]}", "Ollama")
-                else:
-                    # Poll until running
-                    for _ in range(20):
-                        time.sleep(0.5)
-                        state, err = get_ollama_state()
-                        if state == STATE_RUNNING:
-                            self._set_state(STATE_RUNNING)
-                            return
-                        elif state == STATE_ERROR:
-                            self._set_state(STATE_ERROR, err)
-                            return
-                    self._refresh_state()
-            
-            threading.Thread(target=do_start, daemon=True).start()
+            threading.Thread(target=self._run_action,
+                             args=("start", STATE_RUNNING, 10, icon), daemon=True).start()
     
     def _restart_ollama(self, icon, item):
         self._set_state(STATE_STARTING)
         icon.notify("Restarting Ollama...", "Ollama")
-        
-        def do_restart():
-            success, error = run_systemctl("restart")
-            if not success:
-                self._set_state(STATE_ERROR, error)
-                icon.notify(f"Failed to restart: {error[:50]}", "Ollama")
-            else:
-                for _ in range(20):
-                    time.sleep(0.5)
-                    state, err = get_ollama_state()
-                    if state == STATE_RUNNING:
-                        self._set_state(STATE_RUNNING)
-                        return
-                    elif state == STATE_ERROR:
-                        self._set_state(STATE_ERROR, err)
-                        return
-                self._refresh_state()
-        
-        threading.Thread(target=do_restart, daemon=True).start()
+        threading.Thread(target=self._run_action,
+                         args=("restart", STATE_RUNNING, 10, icon), daemon=True).start()
     
     def _show_error(self, icon, item):
         if self.last_error:
@@ -408,18 +489,30 @@ class OllamaTray:
         icon.stop()
     
     def _monitor_loop(self):
-        """Background thread to monitor ollama status."""
+        """Background thread: D-Bus signals, or adaptive polling if D-Bus is unavailable."""
+        try:
+            def on_active_state(status):
+                self.dbus_active = True
+                self._on_live_state(*state_from_active(status))
+            
+            watch_unit_dbus(on_active_state, lambda: not self.app_running)
+            return
+        except Exception as e:
+            print(f"ollama-tray: D-Bus monitoring unavailable ({e}); polling instead", file=sys.stderr)
+            self.dbus_active = False
+        
+        interval = CHECK_INTERVAL
         while self.app_running:
-            # Don't override transitioning states from monitor
-            if self.current_state not in (STATE_STARTING, STATE_STOPPING):
+            before = self.live_state
+            if not self.action_in_progress:
                 self._refresh_state()
-            time.sleep(CHECK_INTERVAL)
+            # Poll quickly right after a change, back off while stable
+            interval = CHECK_INTERVAL if self.live_state != before else min(interval * 2, MAX_CHECK_INTERVAL)
+            self.poll_now.wait(interval)
+            self.poll_now.clear()
     
     def run(self):
-        # Initial state check
-        self._refresh_state()
-        
-        # Start monitoring thread
+        # Start monitoring thread (its first D-Bus reply or poll sets the state)
         monitor = threading.Thread(target=self._monitor_loop, daemon=True)
         monitor.start()
         
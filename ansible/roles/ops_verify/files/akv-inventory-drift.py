@@ -9,24 +9,52 @@ class of drift we just cleaned up: secret rotated in AKV, inventory
 never updated → SecretsDriftAlert silently hides the real state (or
 produces phantom alerts).
 
-Runs inside the ops_verify role's venv (PyYAML + subprocess — az CLI is
+Runs inside the ops_verify role's venv (PyYAML via ops_inventory's
+cached loader + subprocess — az CLI is
 invoked externally, no `azure-*` python SDK dependency).
+
+Each az invocation costs ~1s of CLI startup, so secret attributes are
+fetched with one `az keyvault secret list` per vault; `secret show` is only
+used for names the listing did not return (or if the listing failed).
+Vaults are fetched concurrently (AKV_MAX_WORKERS) under an overall
+deadline (AKV_DEADLINE_SECONDS, kept well inside the unit's
+TimeoutStartSec). A vault that fails or misses the deadline is reported
+as unreachable and its entries are left out of the missing/drift metrics
+rather than misreported as missing secrets.
+
+Vault snapshots are cached in AKV_CACHE_PATH. Every vault is listed on
+every run, so a rotation is seen as soon as it happens. If the listing
+checksum (names + updated, the closest thing `az` exposes to an ETag) is
+unchanged and the snapshot is younger than AKV_CACHE_TTL_SECONDS, the
+cached per-secret `show` results are reused instead of being re-fetched.
+Failed lookups are never cached, and nothing is stored for a vault whose
+listing failed.
 """
 from __future__ import annotations
 
 import datetime as dt
+import hashlib
 import json
 import os
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 
-import yaml
+import ops_inventory
+from ops_metrics import Registry, write_atomic
 
 INVENTORY = Path(os.environ.get("INVENTORY", "/flux/ops/miket-infra/.ops/secrets.yaml"))
 METRICS_DIR = Path(os.environ.get("NODE_EXPORTER_TEXTFILE_DIR", "/var/lib/node_exporter/textfile_collector"))
 METRICS_FILE = METRICS_DIR / "akv_inventory_drift.prom"
 DRIFT_WARN_SECONDS = 30 * 86400  # 30 days — declared rotated vs AKV updated
+MAX_WORKERS = int(os.environ.get("AKV_MAX_WORKERS", "4"))
+DEADLINE_SECONDS = float(os.environ.get("AKV_DEADLINE_SECONDS", "60"))
+LIST_TIMEOUT = 60
+SHOW_TIMEOUT = 15
+CACHE_PATH = Path(os.environ.get("AKV_CACHE_PATH", "/var/lib/ops-verify/akv-cache.json"))
+CACHE_TTL_SECONDS = float(os.environ.get("AKV_CACHE_TTL_SECONDS", str(6 * 3600)))  # 0 disables
 
 # The `az` CLI credential cache is per-user (~/.azure). The hourly
 # secrets-drift systemd service runs as root (simplest path for the shared
@@ -34,20 +62,29 @@ DRIFT_WARN_SECONDS = 30 * 86400  # 30 days — declared rotated vs AKV updated
 # a user that does via `runuser` when we're root. AZ_USER is an env
 # override for tests and for hosts that use a different account name.
 AZ_USER = os.environ.get("AZ_USER", "mdt")
+# AZ_BIN overrides the az executable (e.g. a fake az for testing).
+AZ_BIN = os.environ.get("AZ_BIN", "az")
 
 
 def _az_cmd(args: list[str]) -> list[str]:
     if os.geteuid() == 0:
-        return ["runuser", "-u", AZ_USER, "--", "az", *args]
-    return ["az", *args]
+        return ["runuser", "-u", AZ_USER, "--", AZ_BIN, *args]
+    return [AZ_BIN, *args]
+
 
+def _timeout(limit: float, deadline: float | None) -> float:
+    """Per-call timeout clipped to the time left before *deadline* (monotonic)."""
+    if deadline is None:
+        return limit
+    return max(0.1, min(limit, deadline - time.monotonic()))
 
-def az_secret_updated(vault: str, name: str) -> dt.datetime | None:
+
+def az_secret_updated(vault: str, name: str, deadline: float | None = None) -> dt.datetime | None:
     try:
         out = subprocess.check_output(
             _az_cmd(["keyvault", "secret", "show", "--vault-name", vault, "--name", name,
                      "--query", "attributes.updated", "-o", "tsv"]),
-            timeout=15, stderr=subprocess.DEVNULL,
+            timeout=_timeout(SHOW_TIMEOUT, deadline), stderr=subprocess.DEVNULL,
         ).decode().strip()
     except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
         return None
@@ -57,6 +94,137 @@ def az_secret_updated(vault: str, name: str) -> dt.datetime | None:
     return dt.datetime.fromisoformat(out)
 
 
+def az_vault_secrets(vault: str, deadline: float | None = None) -> dict[str, dt.datetime | None] | None:
+    """
+    All secrets in *vault* with their attributes.updated, from a single
+    `az keyvault secret list`. Returns None if the listing failed.
+    """
+    try:
+        out = subprocess.check_output(
+            _az_cmd(["keyvault", "secret", "list", "--vault-name", vault,
+                     "--query", "[].{id:id, updated:attributes.updated}", "-o", "json"]),
+            timeout=_timeout(LIST_TIMEOUT, deadline), stderr=subprocess.DEVNULL,
+        ).decode()
+        items = json.loads(out or "[]")
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError, ValueError):
+        return None
+    secrets: dict[str, dt.datetime | None] = {}
+    for item in items:
+        # id is https://<vault>.vault.azure.net/secrets/<name>
+        name = (item.get("id") or "").rstrip("/").rsplit("/", 1)[-1]
+        if name:
+            secrets[name] = parse_iso(item.get("updated"))
+    return secrets
+
+
+def _iso(value: dt.datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def listing_checksum(listed: dict[str, dt.datetime | None]) -> str:
+    payload = json.dumps(sorted((name, _iso(updated)) for name, updated in listed.items()))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_cache(path: Path = CACHE_PATH) -> dict[str, dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: dict[str, dict], path: Path = CACHE_PATH) -> None:
+    try:
+        write_atomic(path, json.dumps(cache, indent=1, sort_keys=True), mode=0o600)
+    except OSError as e:
+        print(f"cannot write cache {path}: {e}", file=sys.stderr)
+
+
+def fetch_vault(vault: str, secrets: set[str], deadline: float | None = None,
+                cached: dict | None = None, ttl: float = CACHE_TTL_SECONDS) -> dict:
+    """
+    Updated timestamps for *secrets* in one vault: a single list call,
+    falling back to per-secret `show` for anything the list missed.
+    The vault counts as reachable if the list or any show call succeeded.
+
+    *cached* is this vault's previous snapshot. Its `show` results are
+    reused when the listing checksum still matches and the snapshot is
+    younger than *ttl*; ``cache`` in the result is then "hit", otherwise
+    "miss". ``snapshot`` is the entry to store, or None if the listing
+    failed.
+    """
+    start = time.monotonic()
+    now = time.time()
+    listed = az_vault_secrets(vault, deadline)
+    checksum = listing_checksum(listed) if listed is not None else None
+    reuse = None
+    if cached and checksum and cached.get("checksum") == checksum \
+            and now - cached.get("fetched_at", 0) < ttl:
+        reuse = cached
+    reachable = listed is not None
+    updated: dict[str, dt.datetime | None] = {}
+    for secret in sorted(secrets):
+        value = (listed or {}).get(secret)
+        if value is None and reuse and reuse.get("secrets", {}).get(secret):
+            value = parse_iso(reuse["secrets"][secret])
+        elif value is None and (deadline is None or time.monotonic() < deadline):
+            value = az_secret_updated(vault, secret, deadline)
+        reachable = reachable or value is not None
+        updated[secret] = value
+    return {
+        "reachable": reachable,
+        "updated": updated,
+        "seconds": time.monotonic() - start,
+        "cache": "hit" if reuse else "miss",
+        "snapshot": {
+            # Reused results keep their original age so the TTL still bounds them
+            "fetched_at": reuse["fetched_at"] if reuse else now,
+            "checksum": checksum,
+            "secrets": {s: _iso(v) for s, v in updated.items() if v is not None},
+        } if checksum else None,
+    }
+
+
+def fetch_updated(entries: list[tuple[str, str]], max_workers: int = MAX_WORKERS,
+                  deadline_seconds: float = DEADLINE_SECONDS,
+                  cache: dict[str, dict] | None = None) -> dict[str, dict]:
+    """
+    Fetch every vault concurrently through a bounded pool. Returns
+    {vault: {reachable, updated, seconds, cache}}; vaults that have not
+    finished by the deadline are returned as unreachable so the run can
+    still emit partial results. *cache* is updated in place with fresh
+    snapshots of the vaults that answered.
+    """
+    cache = cache if cache is not None else {}
+    by_vault: dict[str, set[str]] = {}
+    for vault, secret in entries:
+        by_vault.setdefault(vault, set()).add(secret)
+    if not by_vault:
+        return {}
+
+    start = time.monotonic()
+    deadline = start + deadline_seconds
+    # Each az call's timeout is clipped to the deadline, so stragglers
+    # exit shortly after it and the pool shutdown below doesn't hang.
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            pool.submit(fetch_vault, v, s, deadline, cache.get(v)): v
+            for v, s in by_vault.items()
+        }
+        done, _ = wait(futures, timeout=deadline_seconds)
+        results: dict[str, dict] = {}
+        for future, vault in futures.items():
+            if future in done:
+                results[vault] = future.result()
+                if results[vault]["snapshot"] is not None:
+                    cache[vault] = results[vault]["snapshot"]
+            else:
+                future.cancel()
+                results[vault] = {"reachable": False, "updated": {}, "seconds": time.monotonic() - start,
+                                  "cache": "miss", "timed_out": True}
+    return results
+
+
 def parse_iso(s: str | None) -> dt.datetime | None:
     if not s:
         return None
@@ -67,57 +235,71 @@ def main() -> int:
     if not INVENTORY.exists():
         print(f"inventory missing: {INVENTORY}", file=sys.stderr)
         return 1
-    inv = yaml.safe_load(INVENTORY.read_text()) or []
+    return run(ops_inventory.load(INVENTORY) or [])
+
 
+def run_check(ctx) -> int:
+    """ops_verify_runner plugin entry point; the runner owns inventory parsing."""
+    if not INVENTORY.exists():
+        print(f"inventory missing: {INVENTORY}", file=sys.stderr)
+        return 1
+    return run(ctx.load_yaml(INVENTORY) or [])
+
+
+def run(inv: list) -> int:
+    run_start = time.monotonic()
     now = dt.datetime.now(dt.timezone.utc)
     now_unix = int(now.timestamp())
 
-    lines: list[str] = []
     drifted = 0
     checked = 0
     missing_in_akv = 0
 
-    lines.append(
-        "# HELP secrets_inventory_akv_drift_seconds Absolute drift in seconds "
-        "between inventory last_rotated and AKV attributes.updated. A large "
-        "value means one side (usually inventory) is out of date."
+    reg = Registry()
+    drift_seconds = reg.gauge(
+        "secrets_inventory_akv_drift_seconds",
+        "Absolute drift in seconds between inventory last_rotated and AKV "
+        "attributes.updated. A large value means one side (usually inventory) "
+        "is out of date.",
     )
-    lines.append("# TYPE secrets_inventory_akv_drift_seconds gauge")
-
-    lines.append(
-        "# HELP secrets_inventory_akv_missing 1 if the inventory references a "
-        "secret_name that does not exist in the named vault; 0 otherwise."
+    missing = reg.gauge(
+        "secrets_inventory_akv_missing",
+        "1 if the inventory references a secret_name that does not exist in "
+        "the named vault; 0 otherwise.",
     )
-    lines.append("# TYPE secrets_inventory_akv_missing gauge")
 
-    for entry in inv:
-        if entry.get("store") != "keyvault":
-            continue
-        vault = entry.get("keyvault_name")
-        secret = entry.get("secret_name")
-        name = entry.get("name", secret or "?")
-        if not vault or not secret:
+    entries = [
+        e for e in inv
+        if e.get("store") == "keyvault" and e.get("keyvault_name") and e.get("secret_name")
+    ]
+    cache = load_cache()
+    vaults = fetch_updated([(e["keyvault_name"], e["secret_name"]) for e in entries], cache=cache)
+    save_cache(cache)
+    unreachable = sorted(v for v, r in vaults.items() if not r["reachable"])
+    skipped = 0
+
+    for entry in entries:
+        vault = entry["keyvault_name"]
+        secret = entry["secret_name"]
+        name = entry.get("name", secret)
+        if vault in unreachable:
+            # Unknown, not missing — surfaced via the vault_reachable metric
+            skipped += 1
             continue
         checked += 1
 
-        akv_updated = az_secret_updated(vault, secret)
+        akv_updated = vaults[vault]["updated"].get(secret)
         if akv_updated is None:
             missing_in_akv += 1
-            lines.append(
-                f'secrets_inventory_akv_missing{{name="{name}",vault="{vault}",secret="{secret}"}} 1'
-            )
+            missing.set(1, name=name, vault=vault, secret=secret)
             continue
-        lines.append(
-            f'secrets_inventory_akv_missing{{name="{name}",vault="{vault}",secret="{secret}"}} 0'
-        )
+        missing.set(0, name=name, vault=vault, secret=secret)
 
         inv_rotated = parse_iso(entry.get("last_rotated"))
         if inv_rotated is None:
             continue
         delta = abs((akv_updated - inv_rotated).total_seconds())
-        lines.append(
-            f'secrets_inventory_akv_drift_seconds{{name="{name}",vault="{vault}",secret="{secret}"}} {int(delta)}'
-        )
+        drift_seconds.set(int(delta), name=name, vault=vault, secret=secret)
         if delta > DRIFT_WARN_SECONDS:
             drifted += 1
             print(
@@ -127,45 +309,72 @@ def main() -> int:
                 file=sys.stderr,
             )
 
-    lines.append(
-        "# HELP secrets_inventory_akv_checked_total Keyvault-store entries "
-        "cross-checked against AKV on the most recent run."
-    )
-    lines.append("# TYPE secrets_inventory_akv_checked_total gauge")
-    lines.append(f"secrets_inventory_akv_checked_total {checked}")
+    reg.gauge(
+        "secrets_inventory_akv_checked_total",
+        "Keyvault-store entries cross-checked against AKV on the most recent run.",
+    ).set(checked)
+    reg.gauge(
+        "secrets_inventory_akv_drifted_total",
+        "Keyvault-store entries whose inventory last_rotated diverges from AKV "
+        f"updated by more than {DRIFT_WARN_SECONDS} seconds.",
+    ).set(drifted)
+    reg.gauge(
+        "secrets_inventory_akv_missing_total",
+        "Inventory entries that reference an AKV secret name not present in "
+        "the named vault.",
+    ).set(missing_in_akv)
 
-    lines.append(
-        "# HELP secrets_inventory_akv_drifted_total Keyvault-store entries "
-        "whose inventory last_rotated diverges from AKV updated by more than "
-        f"{DRIFT_WARN_SECONDS} seconds."
+    reachable = reg.gauge(
+        "secrets_inventory_akv_vault_reachable",
+        "1 if the vault answered this run; 0 if every az call failed or the "
+        "run deadline expired first (its entries are then excluded from the "
+        "missing/drift metrics).",
     )
-    lines.append("# TYPE secrets_inventory_akv_drifted_total gauge")
-    lines.append(f"secrets_inventory_akv_drifted_total {drifted}")
-
-    lines.append(
-        "# HELP secrets_inventory_akv_missing_total Inventory entries that "
-        "reference an AKV secret name not present in the named vault."
+    fetch_seconds = reg.gauge(
+        "secrets_inventory_akv_vault_fetch_seconds",
+        "Wall time spent fetching secret attributes from the vault on the "
+        "most recent run.",
     )
-    lines.append("# TYPE secrets_inventory_akv_missing_total gauge")
-    lines.append(f"secrets_inventory_akv_missing_total {missing_in_akv}")
+    for vault in sorted(vaults):
+        reachable.set(int(vaults[vault]["reachable"]), vault=vault)
+        fetch_seconds.set(round(vaults[vault]["seconds"], 3), vault=vault)
+    reg.gauge(
+        "secrets_inventory_akv_unreachable_total",
+        "Vaults that could not be queried on the most recent run.",
+    ).set(len(unreachable))
 
-    lines.append(
-        "# HELP secrets_inventory_akv_last_run_timestamp_seconds Unix time of "
-        "the last AKV cross-check run."
+    hits = sum(1 for r in vaults.values() if r["cache"] == "hit")
+    lookups = reg.gauge(
+        "secrets_inventory_akv_cache_lookups",
+        "Vaults by cache outcome on the most recent run: hit (listing "
+        "unchanged, cached show results reused) or miss.",
     )
-    lines.append("# TYPE secrets_inventory_akv_last_run_timestamp_seconds gauge")
-    lines.append(f"secrets_inventory_akv_last_run_timestamp_seconds {now_unix}")
+    for result in ("hit", "miss"):
+        lookups.set(sum(1 for r in vaults.values() if r["cache"] == result), result=result)
+    reg.gauge(
+        "secrets_inventory_akv_cache_hit_ratio",
+        "Fraction of vaults whose cached show results were reused.",
+    ).set(round(hits / len(vaults), 3) if vaults else 0)
+
+    reg.gauge(
+        "secrets_inventory_akv_run_duration_seconds",
+        "Wall time of the most recent AKV cross-check run.",
+    ).set(round(time.monotonic() - run_start, 3))
+    reg.gauge(
+        "secrets_inventory_akv_last_run_timestamp_seconds",
+        "Unix time of the last AKV cross-check run.",
+    ).set(now_unix)
 
-    METRICS_DIR.mkdir(parents=True, exist_ok=True)
-    tmp = METRICS_FILE.with_suffix(".prom.tmp")
-    tmp.write_text("\n".join(lines) + "\n")
-    os.chmod(tmp, 0o644)
-    tmp.rename(METRICS_FILE)
+    reg.write(METRICS_FILE)
 
     print(
         f"akv-inventory-drift checked={checked} drifted={drifted} "
-        f"missing_in_akv={missing_in_akv}"
+        f"missing_in_akv={missing_in_akv} unreachable_vaults={len(unreachable)} "
+        f"skipped={skipped} cache_hits={hits}/{len(vaults)}"
     )
+    for vault in unreachable:
+        reason = "deadline expired" if vaults[vault].get("timed_out") else "az calls failed"
+        print(f"unreachable vault={vault} reason={reason}", file=sys.stderr)
     return 0
 
 
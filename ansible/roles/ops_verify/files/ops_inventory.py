@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+ops_inventory.py — fast, cached YAML inventory loading for ops tooling.
+
+`.ops/secrets.yaml` and `devices/inventory.yaml` are re-parsed by every
+check and tool that reads them. This loader:
+
+  * parses with libyaml's CSafeLoader when PyYAML was built with it
+    (falls back to the pure-Python SafeLoader otherwise);
+  * stores the parsed document as a marshal snapshot in a cache dir,
+    keyed by the file's path. A snapshot is served when (mtime_ns, size)
+    still match; if only the mtime moved (git checkout, touch) the
+    content sha256 is compared and the snapshot re-stamped instead of
+    re-parsed;
+  * wraps the result in an `InventoryView` with by-host / by-store /
+    by-vault indexes built on first use.
+
+Installed next to the ops_verify Python checks (same bin dir as
+ops_metrics.py). Usage:
+
+    view = ops_inventory.load_view("/flux/ops/miket-infra/.ops/secrets.yaml")
+    view.by_vault["kv-miket-ops"]     # -> [entry, ...]
+
+CLI:
+    ops_inventory.py show FILE [--by host|store|vault]
+    ops_inventory.py bench FILE [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as Loader
+    LIBYAML = True
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as Loader
+    LIBYAML = False
+
+SNAPSHOT_VERSION = 1
+
+
+def _default_cache_dir() -> Path:
+    if os.environ.get("OPS_INVENTORY_CACHE_DIR"):
+        return Path(os.environ["OPS_INVENTORY_CACHE_DIR"])
+    if os.geteuid() == 0:
+        return Path("/var/lib/ops-verify/inventory-cache")
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "ops-inventory"
+
+
+CACHE_DIR = _default_cache_dir()
+
+
+# ---------------------------------------------------------------------------
+# marshal encoding
+# ---------------------------------------------------------------------------
+# marshal handles dict/list/str/int/float/bool/None/bytes natively. YAML
+# timestamps (`last_rotated: 2026-04-14`) become date/datetime objects, which
+# it does not, so they are stored as tagged tuples — safe_load never produces
+# tuples, so the tag cannot collide with real data.
+
+_DATE = "__date__"
+_DATETIME = "__datetime__"
+
+
+def _encode(obj, tagged: list[bool]):
+    if isinstance(obj, dict):
+        return {k: _encode(v, tagged) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_encode(v, tagged) for v in obj]
+    if isinstance(obj, dt.datetime):
+        tagged[0] = True
+        return (_DATETIME, obj.isoformat())
+    if isinstance(obj, dt.date):
+        tagged[0] = True
+        return (_DATE, obj.isoformat())
+    if isinstance(obj, set):
+        # !!set; marshal has frozensets but keep the safe_load shape
+        return {_encode(v, tagged): None for v in obj}
+    return obj
+
+
+def _decode(obj):
+    if isinstance(obj, dict):
+        return {k: _decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v) for v in obj]
+    if isinstance(obj, tuple):
+        if obj[0] == _DATETIME:
+            return dt.datetime.fromisoformat(obj[1])
+        return dt.date.fromisoformat(obj[1])
+    return obj
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def parse(text: str | bytes):
+    return yaml.load(text, Loader=Loader)
+
+
+def _snapshot_path(path: Path, cache_dir: Path) -> Path:
+    key = hashlib.sha1(str(path).encode()).hexdigest()[:16]
+    return cache_dir / f"{path.name}.{key}.snap"
+
+
+def _read_snapshot(snap: Path) -> dict | None:
+    try:
+        with open(snap, "rb") as f:
+            header = marshal.load(f)
+            if not isinstance(header, dict) or header.get("version") != SNAPSHOT_VERSION:
+                return None
+            header["data"] = marshal.load(f)
+        return header
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_snapshot(snap: Path, header: dict, data) -> None:
+    """Best effort: on any failure the temp file is removed and nothing is cached."""
+    tmp = None
+    try:
+        snap.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=snap.parent, prefix=f".{snap.name}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            # Header first so a stale snapshot is rejected without
+            # unmarshalling the whole document.
+            marshal.dump(header, f)
+            # ValueError if the document holds a type marshal can't encode
+            marshal.dump(data, f)
+        os.replace(tmp, snap)
+    except (OSError, ValueError) as e:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        print(f"ops_inventory: cannot write snapshot {snap}: {e}", file=sys.stderr)
+
+
+class LoadStats:
+    """How the most recent load() was served: "snapshot", "rehashed" or "parsed"."""
+
+    def __init__(self) -> None:
+        self.source = ""
+        self.seconds = 0.0
+
+
+def load(path: Path | str, cache_dir: Path | str | None = CACHE_DIR, stats: LoadStats | None = None):
+    """
+    Parsed YAML for *path*, served from the marshal snapshot when the file
+    is unchanged. ``cache_dir=None`` disables the snapshot (plain C-loader
+    parse).
+    """
+    start = time.perf_counter()
+    path = Path(path).resolve()
+    st = path.stat()
+    source = "parsed"
+    data = None
+
+    if cache_dir is None:
+        data = parse(path.read_bytes())
+    else:
+        snap = _snapshot_path(path, Path(cache_dir))
+        cached = _read_snapshot(snap)
+        if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            source = "snapshot"
+            data = cached["data"]
+        else:
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            tagged = [False]
+            if cached and cached["sha256"] == digest:
+                source = "rehashed"
+                encoded = cached["data"]
+                tagged[0] = cached["tagged"]
+            else:
+                encoded = _encode(parse(raw), tagged)
+            _write_snapshot(snap, {
+                "version": SNAPSHOT_VERSION,
+                "path": str(path),
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "sha256": digest,
+                "tagged": tagged[0],
+            }, encoded)
+            cached = {"tagged": tagged[0], "data": encoded}
+        if cached["tagged"]:
+            data = _decode(cached["data"])
+        elif data is None:
+            data = cached["data"]
+
+    if stats is not None:
+        stats.source = source
+        stats.seconds = time.perf_counter() - start
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Indexed view
+# ---------------------------------------------------------------------------
+
+def _records(data) -> list[dict]:
+    """
+    Flatten either inventory shape into a list of dicts:
+      * secrets.yaml — a list of entries (store, keyvault_name, host/hosts, ...)
+      * devices/inventory.yaml — devices.<section>.<hostname>: {...}; each
+        record gains `host` and `section`.
+    """
+    if isinstance(data, list):
+        return [e for e in data if isinstance(e, dict)]
+    if isinstance(data, dict) and isinstance(data.get("devices"), dict):
+        out = []
+        for section, members in data["devices"].items():
+            for name, device in (members or {}).items():
+                out.append({**(device or {}), "host": name, "section": section})
+        return out
+    return []
+
+
+def _hosts(record: dict) -> list[str]:
+    hosts = record.get("hosts") or record.get("host") or []
+    return [hosts] if isinstance(hosts, str) else list(hosts)
+
+
+class InventoryView:
+    """Parsed inventory plus lazily built lookup indexes."""
+
+    def __init__(self, data) -> None:
+        self.data = data
+        self.records = _records(data)
+        self._indexes: dict[str, dict[str, list[dict]]] = {}
+
+    def _index(self, name: str, keys) -> dict[str, list[dict]]:
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = {}
+            for record in self.records:
+                for key in keys(record):
+                    index.setdefault(key, []).append(record)
+        return index
+
+    @property
+    def by_host(self) -> dict[str, list[dict]]:
+        return self._index("host", _hosts)
+
+    @property
+    def by_store(self) -> dict[str, list[dict]]:
+        return self._index("store", lambda r: [r["store"]] if r.get("store") else [])
+
+    @property
+    def by_vault(self) -> dict[str, list[dict]]:
+        return self._index("vault", lambda r: [r["keyvault_name"]] if r.get("keyvault_name") else [])
+
+
+def load_view(path: Path | str, cache_dir: Path | str | None = CACHE_DIR,
+              stats: LoadStats | None = None) -> InventoryView:
+    return InventoryView(load(path, cache_dir, stats))
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def bench(path: Path, repeat: int) -> list[tuple[str, float]]:
+    """Median seconds per load for each strategy: (label, seconds)."""
+    raw = path.read_bytes()
+
+    def median(fn) -> float:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return sorted(times)[len(times) // 2]
+
+    results = [("pure-python SafeLoader", median(lambda: yaml.load(raw, Loader=yaml.SafeLoader)))]
+    if LIBYAML:
+        results.append(("libyaml CSafeLoader", median(lambda: yaml.load(raw, Loader=yaml.CSafeLoader))))
+    with tempfile.TemporaryDirectory() as tmp:
+        def cold():
+            for snap in Path(tmp).iterdir():
+                snap.unlink()
+            load(path, tmp)
+
+        results.append(("snapshot cold (parse + write)", median(cold)))
+        load(path, tmp)
+        results.append(("snapshot warm", median(lambda: load(path, tmp))))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_show = sub.add_parser("show", help="Load a file and print index sizes or one index")
+    p_show.add_argument("file")
+    p_show.add_argument("--by", choices=("host", "store", "vault"))
+    p_bench = sub.add_parser("bench", help="Compare cold and warm load times")
+    p_bench.add_argument("file")
+    p_bench.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    path = Path(args.file)
+    if args.command == "show":
+        stats = LoadStats()
+        view = load_view(path, stats=stats)
+        print(f"{path}: {len(view.records)} records, served from {stats.source} in {stats.seconds * 1000:.2f}ms")
+        if args.by:
+            for key, records in sorted(getattr(view, f"by_{args.by}").items()):
+                print(f"  {key}: {len(records)}")
+        else:
+            print(f"  hosts={len(view.by_host)} stores={len(view.by_store)} vaults={len(view.by_vault)}")
+        return 0
+
+    results = bench(path, max(1, args.repeat))
+    base = results[0][1]
+    print(f"{path} ({path.stat().st_size} bytes, libyaml={'yes' if LIBYAML else 'no'}, repeat={args.repeat})")
+    for label, seconds in results:
+        print(f"  {label:<32} {seconds * 1000:9.2f}ms  {base / seconds:6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
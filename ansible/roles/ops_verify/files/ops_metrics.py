@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+ops_metrics.py — Prometheus textfile-collector writer for ops_verify jobs.
+
+Installed next to the ops_verify Python checks (same bin dir, so a plain
+`import ops_metrics` works from them). Jobs register metric families,
+set/inc/observe samples with keyword labels, and write the whole registry
+once at the end:
+
+    reg = Registry()
+    missing = reg.gauge("secrets_inventory_akv_missing", "1 if ...")
+    missing.set(1, name=name, vault=vault, secret=secret)
+    reg.write(METRICS_DIR / "akv_inventory_drift.prom")
+
+Samples are held in dicts keyed by label tuple and rendered with a single
+join, so output cost is linear in series count (see `--bench`). Label
+values and HELP text are escaped per the exposition format. write() is
+atomic and durable: temp file in the target directory, fsync, rename,
+fsync of the directory.
+
+Also usable as a CLI:
+    ops_metrics.py merge a.prom b.prom -o combined.prom
+    ops_metrics.py bench --series 50000
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable
+
+METRIC_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+LABEL_NAME_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+TYPES = ("gauge", "counter", "histogram", "summary", "untyped")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def escape_label_value(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _sorted_labels(pairs: Iterable[tuple[str, str]]) -> Labels:
+    """Canonical label order (by name, histogram ``le`` last): one key per series."""
+    return tuple(sorted(pairs, key=lambda kv: (kv[0] == "le", kv[0])))
+
+
+def _labels(labels: dict[str, object]) -> Labels:
+    for key in labels:
+        if not LABEL_NAME_RE.match(key) or key.startswith("__"):
+            raise ValueError(f"invalid label name: {key!r}")
+    return _sorted_labels((k, str(v)) for k, v in labels.items())
+
+
+def _render_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label_value(v)}"' for k, v in labels) + "}"
+
+
+class MetricFamily:
+    """One metric family: HELP/TYPE plus samples keyed by (sample name, labels)."""
+
+    def __init__(self, name: str, kind: str, help: str = "", buckets: Iterable[float] | None = None):
+        if not METRIC_NAME_RE.match(name):
+            raise ValueError(f"invalid metric name: {name!r}")
+        if kind not in TYPES:
+            raise ValueError(f"invalid metric type: {kind!r}")
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) if buckets is not None else None
+        self.samples: dict[tuple[str, Labels], float] = {}
+
+    def set(self, value: float, **labels: object) -> None:
+        self.samples[(self.name, _labels(labels))] = value
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = (self.name, _labels(labels))
+        self.samples[key] = self.samples.get(key, 0) + amount
+
+    def observe(self, value: float, **labels: object) -> None:
+        if self.kind != "histogram":
+            raise TypeError(f"{self.name} is a {self.kind}, not a histogram")
+        base = _labels(labels)
+        for bound in self.buckets + (math.inf,):
+            if value <= bound:
+                key = (f"{self.name}_bucket", base + (("le", format_value(float(bound))),))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            else:
+                self.samples.setdefault((f"{self.name}_bucket", base + (("le", format_value(float(bound))),)), 0)
+        for suffix, amount in (("_sum", value), ("_count", 1)):
+            key = (f"{self.name}{suffix}", base)
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def render(self, out: list[str]) -> None:
+        if self.help:
+            out.append(f"# HELP {self.name} {escape_help(self.help)}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for (sample_name, labels), value in self.samples.items():
+            out.append(f"{sample_name}{_render_labels(labels)} {format_value(value)}")
+
+
+class Registry:
+    """Ordered collection of metric families for one textfile."""
+
+    def __init__(self) -> None:
+        self.families: dict[str, MetricFamily] = {}
+
+    def _family(self, name: str, kind: str, help: str, buckets=None) -> MetricFamily:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, kind, help, buckets)
+        elif family.kind != kind:
+            raise ValueError(f"{name} already registered as {family.kind}")
+        return family
+
+    def gauge(self, name: str, help: str = "") -> MetricFamily:
+        return self._family(name, "gauge", help)
+
+    def counter(self, name: str, help: str = "") -> MetricFamily:
+        return self._family(name, "counter", help)
+
+    def histogram(self, name: str, help: str = "", buckets: Iterable[float] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._family(name, "histogram", help, buckets)
+
+    def merge(self, other: "Registry") -> None:
+        """Fold *other* in: families are unioned, later samples win on identical series."""
+        for name, family in other.families.items():
+            mine = self.families.get(name)
+            if mine is None:
+                mine = self.families[name] = MetricFamily(name, family.kind, family.help, family.buckets)
+            elif mine.kind != family.kind:
+                raise ValueError(f"{name}: type conflict {mine.kind} vs {family.kind}")
+            mine.help = mine.help or family.help
+            mine.samples.update(family.samples)
+
+    def render(self) -> str:
+        out: list[str] = []
+        for family in self.families.values():
+            family.render(out)
+        return "\n".join(out) + "\n" if out else ""
+
+    def write(self, path: Path | str, mode: int = 0o644) -> None:
+        write_atomic(Path(path), self.render(), mode)
+
+
+def write_atomic(path: Path, content: str, mode: int = 0o644) -> None:
+    """Write via a temp file in the same directory, fsync, rename, fsync the directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+# ---------------------------------------------------------------------------
+# Parsing (for merge)
+# ---------------------------------------------------------------------------
+
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)(?:\s+\S+)?$")
+_LABEL_RE = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"\s*,?')
+_UNESCAPE = {"\\\\": "\\", '\\"': '"', "\\n": "\n"}
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r'\\[\\"n]', lambda m: _UNESCAPE[m.group(0)], value)
+
+
+def _parse_value(text: str) -> float:
+    value = float(text)
+    return int(value) if value.is_integer() and "." not in text and "e" not in text.lower() else value
+
+
+def parse(text: str) -> Registry:
+    """Parse exposition-format text back into a Registry (timestamps are dropped)."""
+    reg = Registry()
+    helps: dict[str, str] = {}
+    current: MetricFamily | None = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            parts = line.split(None, 3)
+            if len(parts) >= 3 and parts[1] == "HELP":
+                helps[parts[2]] = _unescape(parts[3]) if len(parts) > 3 else ""
+                if parts[2] in reg.families:
+                    reg.families[parts[2]].help = helps[parts[2]]
+            elif len(parts) >= 4 and parts[1] == "TYPE":
+                current = reg._family(parts[2], parts[3], helps.get(parts[2], ""))
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            raise ValueError(f"unparseable sample line: {line!r}")
+        sample_name, label_text, value = match.groups()
+        labels: Labels = ()
+        if label_text:
+            labels = _sorted_labels((k, _unescape(v)) for k, v in _LABEL_RE.findall(label_text[1:-1]))
+        family = current
+        if family is None or not sample_name.startswith(family.name):
+            family = reg.families.get(sample_name) or reg._family(sample_name, "untyped", helps.get(sample_name, ""))
+        family.samples[(sample_name, labels)] = _parse_value(value)
+    return reg
+
+
+def merge_files(paths: Iterable[Path | str], output: Path | str) -> Registry:
+    merged = Registry()
+    for path in paths:
+        merged.merge(parse(Path(path).read_text()))
+    merged.write(output)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def bench(series: int, out_dir: Path) -> list[tuple[int, float, float]]:
+    """Build, render and write registries of 1x/2x/4x *series*; returns (n, build_s, write_s)."""
+    results = []
+    for n in (series, series * 2, series * 4):
+        start = time.perf_counter()
+        reg = Registry()
+        gauge = reg.gauge("bench_gauge", "Benchmark gauge with awkward \"label\" values")
+        hist = reg.histogram("bench_latency_seconds", "Benchmark histogram")
+        for i in range(n):
+            gauge.set(i, host=f"host-{i % 97}", path=f'/space/"q"\\{i}', idx=i)
+        for i in range(min(n, 1000)):
+            hist.observe((i % 100) / 50, job=f"job-{i % 10}")
+        built = time.perf_counter()
+        reg.write(out_dir / "bench.prom")
+        results.append((n, built - start, time.perf_counter() - built))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_merge = sub.add_parser("merge", help="Merge textfiles into one")
+    p_merge.add_argument("inputs", nargs="+")
+    p_merge.add_argument("-o", "--output", required=True)
+    p_bench = sub.add_parser("bench", help="Time build+write at 1x/2x/4x series counts")
+    p_bench.add_argument("--series", type=int, default=25000)
+    p_bench.add_argument("--dir", default=tempfile.gettempdir())
+    args = parser.parse_args(argv)
+
+    if args.command == "merge":
+        merged = merge_files(args.inputs, args.output)
+        series = sum(len(f.samples) for f in merged.families.values())
+        print(f"merged {len(args.inputs)} files: {len(merged.families)} families, {series} series -> {args.output}")
+        return 0
+
+    results = bench(args.series, Path(args.dir))
+    base = results[0][1] + results[0][2]
+    for n, build_s, write_s in results:
+        total = build_s + write_s
+        print(f"series={n:>7} build={build_s:.3f}s write={write_s:.3f}s total={total:.3f}s "
+              f"scaling={total / base:.2f}x ({n / results[0][0]:.0f}x series)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
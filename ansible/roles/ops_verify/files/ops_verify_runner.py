@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+ops_verify_runner.py — run the ops_verify Python checks inside one process.
+
+Each Python check used to start its own interpreter, import PyYAML and
+re-parse `.ops/secrets.yaml`. The runner loads every check as a plugin
+(a module in the bin dir exposing `run_check(ctx) -> int`) and shares one
+parsed copy of each YAML file between them; files are re-parsed only when
+their mtime changes, and then through ops_inventory's snapshot cache.
+
+Modes:
+    ops_verify_runner.py --once [CHECK ...]   run checks (default: all) and exit
+    ops_verify_runner.py --daemon             run each check on its own interval
+
+Per-check duration, exit status and last-success time are exported to
+ops_verify_runner.prom in the textfile collector dir.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import signal
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import ops_inventory
+from ops_metrics import Registry
+
+BIN_DIR = Path(__file__).resolve().parent
+METRICS_DIR = Path(os.environ.get("NODE_EXPORTER_TEXTFILE_DIR", "/var/lib/node_exporter/textfile_collector"))
+METRICS_FILE = METRICS_DIR / "ops_verify_runner.prom"
+
+# name -> (module file in BIN_DIR, interval seconds in --daemon mode)
+CHECKS: dict[str, tuple[str, int]] = {
+    "akv-drift": ("akv-inventory-drift.py", 3600),
+}
+
+
+class Context:
+    """State shared by every check in the process."""
+
+    def __init__(self) -> None:
+        self._yaml: dict[Path, tuple[float, object]] = {}
+        self.parses = 0
+
+    def load_yaml(self, path: Path | str):
+        """Parsed YAML for *path*, re-read only when the file's mtime changes."""
+        path = Path(path)
+        mtime = path.stat().st_mtime
+        cached = self._yaml.get(path)
+        if cached is None or cached[0] != mtime:
+            self.parses += 1
+            self._yaml[path] = (mtime, ops_inventory.load(path))
+        return self._yaml[path][1]
+
+
+def load_plugin(name: str):
+    filename, _ = CHECKS[name]
+    spec = importlib.util.spec_from_file_location(f"ops_verify_check_{name.replace('-', '_')}", BIN_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, "run_check"):
+        raise AttributeError(f"{filename} has no run_check(ctx)")
+    return module
+
+
+class Runner:
+    def __init__(self, names: list[str]) -> None:
+        self.ctx = Context()
+        self.plugins = {name: load_plugin(name) for name in names}
+        self.state: dict[str, dict] = {
+            name: {"status": None, "duration": None, "last_success": None, "runs": 0, "next_due": 0.0}
+            for name in names
+        }
+
+    def run(self, name: str) -> int:
+        state = self.state[name]
+        start = time.monotonic()
+        try:
+            status = self.plugins[name].run_check(self.ctx)
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        state["duration"] = time.monotonic() - start
+        state["status"] = status
+        state["runs"] += 1
+        if status == 0:
+            state["last_success"] = int(time.time())
+        print(f"ops-verify-runner check={name} status={status} duration={state['duration']:.3f}s")
+        return status
+
+    def write_metrics(self) -> None:
+        reg = Registry()
+        duration = reg.gauge("ops_verify_check_duration_seconds",
+                             "Wall time of the most recent run of the check inside the runner.")
+        status = reg.gauge("ops_verify_check_last_status",
+                           "Exit status of the most recent run (0 = success).")
+        success = reg.gauge("ops_verify_check_last_success_timestamp_seconds",
+                            "Unix time of the check's most recent successful run.")
+        runs = reg.counter("ops_verify_check_runs_total", "Check runs since the runner started.")
+        for name, state in self.state.items():
+            if state["duration"] is not None:
+                duration.set(round(state["duration"], 3), check=name)
+                status.set(state["status"], check=name)
+            if state["last_success"] is not None:
+                success.set(state["last_success"], check=name)
+            runs.set(state["runs"], check=name)
+        reg.gauge("ops_verify_runner_yaml_parses_total",
+                  "YAML files parsed since the runner started (shared across checks).").set(self.ctx.parses)
+        reg.write(METRICS_FILE)
+
+    def once(self) -> int:
+        worst = 0
+        for name in self.state:
+            worst = max(worst, self.run(name))
+        self.write_metrics()
+        return worst
+
+    def daemon(self) -> int:
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        while not stopping:
+            now = time.monotonic()
+            for name, state in self.state.items():
+                if now >= state["next_due"]:
+                    self.run(name)
+                    state["next_due"] = time.monotonic() + CHECKS[name][1]
+                    self.write_metrics()
+            next_due = min(s["next_due"] for s in self.state.values())
+            # Short sleeps so SIGTERM is honoured promptly
+            while not stopping and time.monotonic() < next_due:
+                time.sleep(min(5.0, max(0.0, next_due - time.monotonic())))
+        return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run ops_verify Python checks in one process")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--once", action="store_true", help="Run the checks once and exit")
+    mode.add_argument("--daemon", action="store_true", help="Run each check on its interval until stopped")
+    parser.add_argument("checks", nargs="*", help=f"Checks to run (default: all of {', '.join(CHECKS)})")
+    args = parser.parse_args(argv)
+
+    unknown = [c for c in args.checks if c not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+    runner = Runner(args.checks or list(CHECKS))
+    return runner.once() if args.once else runner.daemon()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -92,10 +92,16 @@ echo "${TS} secrets-drift alert=${ALERT} warning=${WARNING} ok=${OK} total=${TOT
 # the drift-detection layer — if the inventory goes stale (secret rotated
 # in AKV, YAML not updated), the same phantom-alert failure mode we hit
 # once already is now visible as its own metric + alert, not hidden.
-if [[ -x /usr/local/bin/akv-inventory-drift.py ]] && [[ -x "$VENV/bin/python" ]]; then
+#
+# The check runs through ops_verify_runner.py (one interpreter for all
+# Python checks). When the long-lived ops-verify-runner.service is active
+# it already runs akv-drift on its own schedule, so skip it here.
+if systemctl is-active --quiet ops-verify-runner.service 2>/dev/null; then
+    echo "${TS} akv-inventory-drift handled by ops-verify-runner.service" >>"$LOG_FILE"
+elif [[ -x /usr/local/bin/ops_verify_runner.py ]] && [[ -x "$VENV/bin/python" ]]; then
     INVENTORY="${INFRA_DIR}/.ops/secrets.yaml" \
     NODE_EXPORTER_TEXTFILE_DIR="$METRICS_DIR" \
-    "$VENV/bin/python" /usr/local/bin/akv-inventory-drift.py >>"$LOG_FILE" 2>&1 || \
+    "$VENV/bin/python" /usr/local/bin/ops_verify_runner.py --once akv-drift >>"$LOG_FILE" 2>&1 || \
         echo "${TS} akv-inventory-drift failed (see log above)" >>"$LOG_FILE"
 fi
 
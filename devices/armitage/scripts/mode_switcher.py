@@ -3,23 +3,96 @@
 
 """Mode switcher utility for the Armitage workstation.
 
-This script toggles between productivity and gaming profiles by
+This script toggles between system modes (productivity, gaming, ...) by
 coordinating the relevant systemd units.  It stores the last selected
 mode locally so that user interfaces or monitoring agents can surface
 the current state without querying systemd.
+
+Modes are declared under ``modes:`` in ``devices/armitage/config.yml``
+(``MODE_CONFIG`` overrides the path; the built-in gaming/productivity
+table is used if the file or PyYAML is unavailable).  A switch first reads
+live unit state and plans only the transitions that are missing: units
+already running are not restarted, units already stopped are left alone,
+and switching into the current mode issues no systemctl calls at all.
+
+Planned transitions are batched: units with no ordering constraint between
+them go into one ``systemctl stop`` / ``systemctl start`` call, and units
+with ``after`` dependencies go into later batches (stops in reverse).
+systemd queues the jobs of a batch together and systemctl waits for all of
+them to finish, so units within a batch transition concurrently.  Set
+``SYSTEMCTL`` to point at a stand-in binary for testing.
+
+``status --live`` asks systemd for every relevant unit's state in a single
+D-Bus ``ListUnitsByNames`` call (via ``busctl``; ``BUSCTL`` overrides the
+binary), derives the mode from the live states and rewrites the stored
+state if it was stale.  ``watch`` subscribes to the units'
+``PropertiesChanged`` signals and prints one JSON line per mode change,
+so consumers get pushed updates instead of polling; it needs dbus-python
+and PyGObject (python3-dbus / python3-gobject on Fedora).
+
+A switch is not reported done when systemctl returns.  If the mode starts
+the vLLM container, ``/health`` and then ``/v1/models`` are polled with
+exponential backoff until the model is served; if it stops it, the switch
+records vLLM's GPU processes (compute apps in the vLLM unit's or
+container's cgroup) beforehand and waits until they have left
+``nvidia-smi``'s compute-app list (VRAM actually released).  Both times
+are reported, and a timeout is an error so dependent automation never
+races a half-loaded backend.
+
+``agent`` serves a small JSON API on the Tailscale address so
+``tools/cli/tailnet.py switch-mode`` can switch modes without an Ansible
+run.  Every request must carry ``Authorization: Bearer <token>``, where the
+token is the content of ``MODE_AGENT_TOKEN_FILE`` (mode 0600)::
+
+    GET  /v1/mode                      -> live status (see ``status --live``)
+    POST /v1/mode {"mode": "gaming", "wait": true}
+                                       -> set_mode() result; 409 while busy
 """
 from __future__ import annotations
 
 import argparse
+import contextlib
+import fcntl
+import hmac
 import json
+import os
 import subprocess
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import urllib.error
+import urllib.request
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 STATE_FILE = Path.home() / ".local/share/armitage" / "mode_state.json"
-DEFAULT_MODE = "productivity"
-
-SYSTEMD_UNITS: Dict[str, Dict[str, List[str]]] = {
+# Held for the whole switch so the CLI and the agent never overlap
+LOCK_FILE = STATE_FILE.with_name("mode_switch.lock")
+MODE_CONFIG = Path(os.environ.get("MODE_CONFIG", Path(__file__).resolve().parent.parent / "config.yml"))
+SYSTEMCTL = os.environ.get("SYSTEMCTL", "systemctl")
+BUSCTL = os.environ.get("BUSCTL", "busctl")
+
+SYSTEMD_BUS_NAME = "org.freedesktop.systemd1"
+SYSTEMD_OBJECT = "/org/freedesktop/systemd1"
+SYSTEMD_MANAGER = "org.freedesktop.systemd1.Manager"
+SYSTEMD_UNIT = "org.freedesktop.systemd1.Unit"
+
+VLLM_UNIT = "vllm-container@armitage.service"
+VLLM_URL = os.environ.get("VLLM_URL", "http://127.0.0.1:8000")
+VLLM_CONTAINER = os.environ.get("VLLM_CONTAINER", "vllm-armitage")
+CONTAINER_RUNTIME = os.environ.get("CONTAINER_RUNTIME", "podman")
+NVIDIA_SMI = os.environ.get("NVIDIA_SMI", "nvidia-smi")
+READY_TIMEOUT = float(os.environ.get("VLLM_READY_TIMEOUT", "300"))
+VRAM_TIMEOUT = float(os.environ.get("VRAM_RELEASE_TIMEOUT", "60"))
+
+AGENT_PORT = int(os.environ.get("MODE_AGENT_PORT", "8765"))
+AGENT_MAX_BODY = 4096  # bytes; a mode request is a few dozen
+AGENT_TOKEN_FILE = Path(os.environ.get("MODE_AGENT_TOKEN_FILE", Path.home() / ".config/armitage/mode-agent.token"))
+
+# ActiveState values that count as "on" / "off" when matching a mode
+UP_STATES = {"active", "activating", "reloading"}
+DOWN_STATES = {"inactive", "failed", "deactivating"}
+
+_BUILTIN_UNITS: Dict[str, Dict[str, List[str]]] = {
     "gaming": {
         "start": [
             "gaming-mode.target",
@@ -41,6 +114,29 @@ SYSTEMD_UNITS: Dict[str, Dict[str, List[str]]] = {
 }
 
 
+def load_modes(path: Path = MODE_CONFIG) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[str, List[str]], str]:
+    """``(modes, unit_after, default_mode)`` from the ``modes:`` section of *path*."""
+    try:
+        import yaml
+
+        config = (yaml.safe_load(path.read_text()) or {}).get("modes") or {}
+    except (ImportError, OSError):
+        config = {}
+    profiles = config.get("profiles") or _BUILTIN_UNITS
+    modes = {
+        name: {"start": list(spec.get("start") or []), "stop": list(spec.get("stop") or [])}
+        for name, spec in profiles.items()
+    }
+    after = {unit: list((spec or {}).get("after") or []) for unit, spec in (config.get("units") or {}).items()}
+    default = config.get("default", "productivity")
+    if default not in modes:
+        raise ValueError(f"{path}: default mode '{default}' is not defined")
+    return modes, after, default
+
+
+SYSTEMD_UNITS, UNIT_AFTER, DEFAULT_MODE = load_modes()
+
+
 def _ensure_state_dir() -> None:
     STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
@@ -51,6 +147,21 @@ def _store_state(mode: str) -> None:
     STATE_FILE.write_text(json.dumps(payload, indent=2))
 
 
+class SwitchInProgress(RuntimeError):
+    """Another switch (CLI or agent) holds LOCK_FILE."""
+
+
+@contextlib.contextmanager
+def _switch_lock():
+    _ensure_state_dir()
+    with open(LOCK_FILE, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SwitchInProgress("a mode switch is already in progress") from None
+        yield  # released when the file is closed
+
+
 def _load_state() -> str:
     if STATE_FILE.exists():
         try:
@@ -63,49 +174,466 @@ def _load_state() -> str:
     return DEFAULT_MODE
 
 
-def _run_systemctl(action: str, unit: str) -> None:
+def _run_systemctl(action: str, units: List[str]) -> None:
+    """Run one ``systemctl <action>`` for all *units*; systemctl waits for every job."""
+    if not units:
+        return
     result = subprocess.run([
-        "systemctl",
+        SYSTEMCTL,
         action,
-        unit,
+        *units,
     ], check=False, capture_output=True, text=True)
     if result.returncode != 0:
         message = result.stderr.strip() or result.stdout.strip()
-        raise RuntimeError(f"systemctl {action} {unit} failed: {message}")
-
-
-def set_mode(mode: str) -> str:
-    """Apply the requested mode and persist the new state."""
+        raise RuntimeError(f"systemctl {action} {' '.join(units)} failed: {message}")
+
+
+def _backoff(delays=(0.5, 1.0, 2.0, 4.0)):
+    """0.5s, 1s, 2s, 4s, then 5s forever."""
+    yield from delays
+    while True:
+        yield 5.0
+
+
+def _http_ok(path: str) -> Optional[bytes]:
+    try:
+        with urllib.request.urlopen(f"{VLLM_URL}{path}", timeout=5) as response:
+            return response.read() if response.status == 200 else None
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def wait_vllm_ready(timeout: float = READY_TIMEOUT) -> float:
+    """Block until vLLM answers /health and lists a model on /v1/models; returns seconds waited."""
+    started = time.monotonic()
+    delays = _backoff()
+    while True:
+        if _http_ok("/health") is not None:
+            body = _http_ok("/v1/models")
+            try:
+                if body is not None and json.loads(body).get("data"):
+                    return time.monotonic() - started
+            except ValueError:
+                pass
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            raise RuntimeError(f"vLLM at {VLLM_URL} not ready after {timeout:.0f}s")
+        time.sleep(min(next(delays), remaining))
+
+
+def _gpu_processes() -> Optional[Dict[str, int]]:
+    """``{pid: MiB}`` of every GPU compute app; None without nvidia-smi."""
+    try:
+        result = subprocess.run([
+            NVIDIA_SMI,
+            "--query-compute-apps=pid,used_memory",
+            "--format=csv,noheader,nounits",
+        ], check=False, capture_output=True, text=True, timeout=10)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    processes: Dict[str, int] = {}
+    for line in result.stdout.splitlines():
+        parts = [p.strip() for p in line.split(",")]
+        if len(parts) == 2:
+            processes[parts[0]] = int(parts[1]) if parts[1].isdigit() else 0
+    return processes
+
+
+def _vllm_container_id() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            [CONTAINER_RUNTIME, "inspect", "--format", "{{.Id}}", VLLM_CONTAINER],
+            check=False, capture_output=True, text=True, timeout=10,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    return (result.stdout.strip() or None) if result.returncode == 0 else None
+
+
+def vllm_gpu_pids() -> Optional[List[str]]:
+    """
+    Pids of the GPU compute apps that belong to vLLM: those whose cgroup is
+    the vLLM unit's or the vLLM container's.  Taken before the unit is
+    stopped, so the VRAM wait covers exactly these processes and not other
+    GPU users (Ollama, Blender, ...).  None if nvidia-smi is unavailable.
+    """
+    processes = _gpu_processes()
+    if not processes:
+        return None if processes is None else []
+    markers = [VLLM_UNIT]
+    container_id = _vllm_container_id()
+    if container_id:
+        markers.append(container_id)
+    pids = []
+    for pid in processes:
+        try:
+            cgroup = Path(f"/proc/{pid}/cgroup").read_text()
+        except OSError:
+            continue  # already gone
+        if any(marker in cgroup for marker in markers):
+            pids.append(pid)
+    return pids
+
+
+def wait_vram_released(pids: List[str], timeout: float = VRAM_TIMEOUT) -> Optional[float]:
+    """Block until none of *pids* holds GPU memory; None if nvidia-smi is unavailable."""
+    started = time.monotonic()
+    delays = _backoff((0.2, 0.5, 1.0, 2.0))
+    while True:
+        processes = _gpu_processes()
+        if processes is None:
+            return None
+        held = {pid: mib for pid, mib in processes.items() if pid in pids}
+        if not held:
+            return time.monotonic() - started
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            raise RuntimeError(
+                f"VRAM not released after {timeout:.0f}s ({sum(held.values())} MiB held by pids {', '.join(held)})"
+            )
+        time.sleep(min(next(delays), remaining))
+
+
+def _layers(units: List[str], after: Dict[str, List[str]]) -> List[List[str]]:
+    """Split *units* into batches so each unit comes after the units it depends on."""
+    remaining = list(units)
+    done: set = set()
+    layers: List[List[str]] = []
+    while remaining:
+        ready = [u for u in remaining if not (set(after.get(u, [])) & set(remaining))]
+        if not ready:
+            raise ValueError(f"dependency cycle between units: {', '.join(remaining)}")
+        layers.append(ready)
+        done.update(ready)
+        remaining = [u for u in remaining if u not in done]
+    return layers
+
+
+def plan_transition(mode: str, states: Optional[Dict[str, str]]) -> List[Tuple[str, List[str]]]:
+    """
+    Ordered ``(action, units)`` batches that take the system from *states*
+    (unit -> ActiveState, None if unknown) into *mode*.  Only units not
+    already in the desired state are included; stops come first, in
+    reverse dependency order, then starts in dependency order.
+    """
+    definition = SYSTEMD_UNITS[mode]
+    if states is None:
+        to_stop = list(definition["stop"])
+        to_start = list(definition["start"])
+    else:
+        to_stop = [u for u in definition["stop"] if states.get(u, "inactive") not in DOWN_STATES]
+        to_start = [u for u in definition["start"] if states.get(u, "inactive") not in UP_STATES]
+
+    # Stopping reverses the edges: a unit stops before the units it runs after
+    before: Dict[str, List[str]] = {}
+    for unit, deps in UNIT_AFTER.items():
+        for dep in deps:
+            before.setdefault(dep, []).append(unit)
+    plan = [("stop", layer) for layer in _layers(to_stop, before)]
+    plan += [("start", layer) for layer in _layers(to_start, UNIT_AFTER)]
+    return plan
+
+
+def set_mode(mode: str, wait: bool = True) -> Dict[str, object]:
+    """
+    Apply the requested mode and persist the new state once the readiness
+    and VRAM waits have passed (a failed wait raises and leaves the stored
+    mode untouched).  Raises SwitchInProgress if another switch holds
+    LOCK_FILE.  Returns timings in seconds: ``switch`` (systemctl),
+    ``ready`` (vLLM serving) and ``vram`` (GPU memory released); the latter
+    two are None when not applicable.
+    ``plan`` holds the transitions that were issued (empty: already there).
+    """
     if mode not in SYSTEMD_UNITS:
         valid = ", ".join(SYSTEMD_UNITS)
         raise ValueError(f"Unknown mode '{mode}'. Valid modes: {valid}")
 
-    definition = SYSTEMD_UNITS[mode]
-
-    for unit in definition.get("stop", []):
-        _run_systemctl("stop", unit)
-
-    for unit in definition.get("start", []):
-        _run_systemctl("start", unit)
-
-    _store_state(mode)
-    return mode
+    with _switch_lock():
+        definition = SYSTEMD_UNITS[mode]
+        started = time.monotonic()
 
-
-def print_status() -> str:
-    mode = _load_state()
-    print(mode)
-    return mode
+        try:
+            units = query_unit_states(_mode_units())
+            states: Optional[Dict[str, str]] = {name: info["active"] for name, info in units.items()}
+        except (RuntimeError, OSError, ValueError, KeyError, IndexError):
+            states = None  # unknown: fall back to issuing every transition
+        plan = plan_transition(mode, states)
+        # Record vLLM's GPU processes while they are still running
+        vllm_pids = vllm_gpu_pids() if wait and VLLM_UNIT in definition["stop"] else None
+        for action, batch in plan:
+            _run_systemctl(action, batch)
+
+        timings: Dict[str, object] = {
+            "switch": time.monotonic() - started, "ready": None, "vram": None, "plan": plan,
+        }
+        if vllm_pids is not None:
+            timings["vram"] = wait_vram_released(vllm_pids)
+        if wait and VLLM_UNIT in definition["start"]:
+            timings["ready"] = wait_vllm_ready()
+        # Only a switch that passed its gates becomes the stored mode
+        _store_state(mode)
+        return timings
+
+
+def _mode_units() -> List[str]:
+    units: List[str] = []
+    for definition in SYSTEMD_UNITS.values():
+        for unit in definition.get("start", []) + definition.get("stop", []):
+            if unit not in units:
+                units.append(unit)
+    return units
+
+
+def query_unit_states(units: List[str]) -> Dict[str, Dict[str, str]]:
+    """
+    ``{unit: {"active": ActiveState, "sub": SubState, "path": object path}}``
+    for all *units* from one ListUnitsByNames round-trip.  Units systemd
+    has never loaded come back as inactive.
+    """
+    result = subprocess.run([
+        BUSCTL,
+        "call",
+        "--json=short",
+        SYSTEMD_BUS_NAME,
+        SYSTEMD_OBJECT,
+        SYSTEMD_MANAGER,
+        "ListUnitsByNames",
+        "as",
+        str(len(units)),
+        *units,
+    ], check=False, capture_output=True, text=True)
+    if result.returncode != 0:
+        message = result.stderr.strip() or result.stdout.strip()
+        raise RuntimeError(f"ListUnitsByNames failed: {message}")
+    # data[0] is a(ssssssouso): name, description, load, active, sub,
+    # following, object path, job id, job type, job path
+    rows = json.loads(result.stdout)["data"][0]
+    return {
+        row[0]: {"active": row[3], "sub": row[4], "path": row[6]}
+        for row in rows
+    }
+
+
+def detect_mode(states: Dict[str, str]) -> Optional[str]:
+    """The mode whose start units are all up and stop units all down, if any."""
+    for mode, definition in SYSTEMD_UNITS.items():
+        if all(states.get(u, "inactive") in UP_STATES for u in definition.get("start", [])) and \
+                all(states.get(u, "inactive") in DOWN_STATES for u in definition.get("stop", [])):
+            return mode
+    return None
+
+
+def live_status() -> Dict[str, object]:
+    """Live mode from systemd, reconciled with the stored state."""
+    stored = _load_state()
+    units = query_unit_states(_mode_units())
+    states = {name: info["active"] for name, info in units.items()}
+    live = detect_mode(states)
+    reconciled = live is not None and live != stored
+    if reconciled:
+        _store_state(live)
+    return {"mode": live, "stored": stored, "reconciled": reconciled, "units": states}
+
+
+def print_status(live: bool = False, as_json: bool = False) -> Optional[str]:
+    if not live:
+        mode = _load_state()
+        print(json.dumps({"mode": mode}) if as_json else mode)
+        return mode
+
+    status = live_status()
+    if as_json:
+        print(json.dumps(status))
+    else:
+        print(status["mode"] or "mixed")
+        if status["reconciled"]:
+            print(f"  (stored state was {status['stored']}; updated)")
+        elif status["mode"] is None:
+            print(f"  (stored state: {status['stored']})")
+        for unit, state in status["units"].items():
+            print(f"  {unit}: {state}")
+    return status["mode"]
+
+
+def watch() -> None:
+    """Print a JSON line on every live mode change, driven by systemd signals."""
+    try:
+        import dbus
+        from dbus.mainloop.glib import DBusGMainLoop
+        from gi.repository import GLib
+    except ImportError as exc:
+        raise RuntimeError("watch needs dbus-python and PyGObject (python3-dbus, python3-gobject)") from exc
+
+    DBusGMainLoop(set_as_default=True)
+    bus = dbus.SystemBus()
+    manager = dbus.Interface(bus.get_object(SYSTEMD_BUS_NAME, SYSTEMD_OBJECT), SYSTEMD_MANAGER)
+    # systemd only emits unit signals while at least one client is subscribed
+    manager.Subscribe()
+
+    units = _mode_units()
+    rows = manager.ListUnitsByNames(units)
+    states = {str(row[0]): str(row[3]) for row in rows}
+    by_path = {str(row[6]): str(row[0]) for row in rows}
+    current = {"mode": detect_mode(states)}
+
+    def emit() -> None:
+        print(json.dumps({"mode": current["mode"], "units": states, "ts": time.time()}), flush=True)
+        if current["mode"] is not None:
+            _store_state(current["mode"])
+
+    def on_properties_changed(interface, changed, invalidated, path=None):
+        if interface != SYSTEMD_UNIT or path not in by_path or "ActiveState" not in changed:
+            return
+        states[by_path[path]] = str(changed["ActiveState"])
+        mode = detect_mode(states)
+        if mode != current["mode"]:
+            current["mode"] = mode
+            emit()
+
+    bus.add_signal_receiver(
+        on_properties_changed,
+        signal_name="PropertiesChanged",
+        dbus_interface="org.freedesktop.DBus.Properties",
+        bus_name=SYSTEMD_BUS_NAME,
+        path_keyword="path",
+    )
+    emit()
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+
+
+def _tailscale_ipv4() -> Optional[str]:
+    try:
+        result = subprocess.run(["tailscale", "ip", "-4"], check=False, capture_output=True, text=True, timeout=5)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    address = result.stdout.strip().splitlines()
+    return address[0] if result.returncode == 0 and address else None
+
+
+def _load_agent_token(path: Path = AGENT_TOKEN_FILE) -> str:
+    try:
+        token = path.read_text().strip()
+    except OSError as exc:
+        raise RuntimeError(
+            f"agent token {path} unreadable ({exc}); create it with: "
+            f"python3 -c 'import secrets; print(secrets.token_urlsafe(32))' > {path} && chmod 600 {path}"
+        ) from exc
+    if not token:
+        raise RuntimeError(f"agent token {path} is empty")
+    if path.stat().st_mode & 0o077:
+        raise RuntimeError(f"agent token {path} must not be group/world accessible (chmod 600)")
+    return token
+
+
+class _AgentHandler(BaseHTTPRequestHandler):
+    server_version = "armitage-mode-agent/1"
+    token = ""
+
+    def _reply(self, code: int, payload: Dict[str, object]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        header = self.headers.get("Authorization", "")
+        supplied = header[len("Bearer "):] if header.startswith("Bearer ") else ""
+        if hmac.compare_digest(supplied.encode(), self.token.encode()):
+            return True
+        self._reply(401, {"error": "unauthorized"})
+        return False
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        if not self._authorized():
+            return
+        if self.path != "/v1/mode":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            self._reply(200, live_status())
+        except RuntimeError as exc:
+            self._reply(200, {"mode": None, "stored": _load_state(), "error": str(exc)})
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        if not self._authorized():
+            return
+        if self.path != "/v1/mode":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= AGENT_MAX_BODY:
+            self._reply(400, {"error": f"Content-Length must be 0-{AGENT_MAX_BODY}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            mode = request["mode"]
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {"error": "expected JSON body {\"mode\": ...}"})
+            return
+        if not isinstance(mode, str) or mode not in SYSTEMD_UNITS:
+            self._reply(400, {"error": f"unknown mode {json.dumps(mode)}", "modes": sorted(SYSTEMD_UNITS)})
+            return
+        wait = request.get("wait", True)
+        if not isinstance(wait, bool):
+            self._reply(400, {"error": "\"wait\" must be true or false"})
+            return
+        try:
+            result = set_mode(mode, wait=wait)
+            self._reply(200, {"mode": mode, **result})
+        except SwitchInProgress as exc:
+            self._reply(409, {"error": str(exc)})
+        except (RuntimeError, ValueError) as exc:
+            self._reply(500, {"mode": mode, "error": str(exc)})
+
+    def log_message(self, fmt: str, *args) -> None:
+        print(f"{self.client_address[0]} {fmt % args}", flush=True)
+
+
+def serve_agent(bind: Optional[str], port: int = AGENT_PORT) -> None:
+    """Serve the mode API on *bind* (default: this node's Tailscale IPv4) until interrupted."""
+    address = bind or _tailscale_ipv4()
+    if not address:
+        raise RuntimeError("no Tailscale IPv4 found; pass --bind explicitly")
+    _AgentHandler.token = _load_agent_token()
+    server = ThreadingHTTPServer((address, port), _AgentHandler)
+    print(f"mode agent listening on {address}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Toggle Armitage system modes")
+    parser = argparse.ArgumentParser(description="Switch Armitage system modes")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     switch_parser = subparsers.add_parser("switch", help="Switch to the specified mode")
     switch_parser.add_argument("mode", choices=sorted(SYSTEMD_UNITS.keys()))
+    switch_parser.add_argument("--no-wait", action="store_true",
+                               help="Return once systemctl does (skip vLLM readiness / VRAM release waits)")
+
+    status_parser = subparsers.add_parser("status", help="Print the current mode")
+    status_parser.add_argument("--live", action="store_true",
+                               help="Query systemd (one D-Bus call) and reconcile the stored mode")
+    status_parser.add_argument("--json", action="store_true", help="Print JSON")
+
+    subparsers.add_parser("watch", help="Stream mode changes as JSON lines (systemd D-Bus signals)")
 
-    subparsers.add_parser("status", help="Print the last stored mode")
+    agent_parser = subparsers.add_parser("agent", help="Serve the authenticated mode API on the tailnet")
+    agent_parser.add_argument("--bind", help="Address to listen on (default: Tailscale IPv4)")
+    agent_parser.add_argument("--port", type=int, default=AGENT_PORT)
 
     return parser.parse_args()
 
@@ -114,12 +642,32 @@ def main() -> None:
     args = parse_args()
 
     if args.command == "status":
-        print_status()
+        print_status(live=args.live, as_json=args.json)
+        return
+
+    if args.command == "watch":
+        watch()
+        return
+
+    if args.command == "agent":
+        serve_agent(args.bind, args.port)
         return
 
     if args.command == "switch":
-        new_mode = set_mode(args.mode)
-        print(f"Switched to {new_mode}")
+        try:
+            timings = set_mode(args.mode, wait=not args.no_wait)
+        except SwitchInProgress as exc:
+            raise SystemExit(f"Cannot switch to {args.mode}: {exc}")
+        if not timings["plan"]:
+            details = ["already in mode, no unit changes"]
+        else:
+            steps = "; ".join(f"{action} {' '.join(batch)}" for action, batch in timings["plan"])
+            details = [f"{steps}: {timings['switch']:.2f}s"]
+        if timings["vram"] is not None:
+            details.append(f"VRAM released {timings['vram']:.2f}s")
+        if timings["ready"] is not None:
+            details.append(f"vLLM ready {timings['ready']:.2f}s")
+        print(f"Switched to {args.mode} ({', '.join(details)})")
         return
 
     raise RuntimeError("Unsupported command")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Offline smoke test for the AKV inventory drift check.
+
+Runs ansible/roles/ops_verify/files/akv-inventory-drift.py against a fake
+`az` executable placed first on PATH. The fake serves secrets from a JSON
+state file and logs every invocation, so the test can assert:
+
+  * one `secret list` per vault per run, and `secret show` only for names
+    the listing did not return (or for vaults whose listing failed);
+  * drift / missing / unreachable output and metrics;
+  * the snapshot cache: unchanged listings reuse show results, a rotated
+    secret changes the checksum, failed lookups are retried next run;
+  * the run deadline: a hung vault is reported unreachable, not missing.
+
+No Azure login or network access is needed.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DRIFT_SCRIPT = REPO_ROOT / "ansible/roles/ops_verify/files/akv-inventory-drift.py"
+
+# Fake az: `az keyvault secret list|show --vault-name V [--name N] ...`
+# State: {"vaults": {V: {N: updated}}, "unlisted": {V: [N]},
+#         "list_fail": [V], "hang": [V]}
+FAKE_AZ = r"""#!/usr/bin/env python3
+import json, os, sys, time
+args = sys.argv[1:]
+state = json.load(open(os.environ["FAKE_AZ_STATE"]))
+vault = args[args.index("--vault-name") + 1]
+name = args[args.index("--name") + 1] if "--name" in args else None
+with open(os.environ["FAKE_AZ_LOG"], "a") as log:
+    log.write(json.dumps([args[2], vault, name]) + "\n")
+if vault in state.get("hang", []):
+    time.sleep(30)
+secrets = state["vaults"].get(vault)
+if secrets is None:
+    sys.exit(1)
+if args[2] == "list":
+    if vault in state.get("list_fail", []):
+        sys.exit(1)
+    unlisted = state.get("unlisted", {}).get(vault, [])
+    print(json.dumps([
+        {"id": f"https://{vault}.vault.azure.net/secrets/{n}", "updated": u}
+        for n, u in secrets.items() if n not in unlisted
+    ]))
+elif name in secrets:
+    print(secrets[name])
+else:
+    sys.exit(3)
+"""
+
+INVENTORY = """\
+- {name: db-password, store: keyvault, keyvault_name: kv-ops, secret_name: db-password, last_rotated: "2026-01-01T00:00:00+00:00"}
+- {name: api-token, store: keyvault, keyvault_name: kv-ops, secret_name: api-token, last_rotated: "2026-01-01T00:00:00+00:00"}
+- {name: tls-key, store: keyvault, keyvault_name: kv-ops, secret_name: tls-key, last_rotated: "2026-01-01T00:00:00+00:00"}
+- {name: backup-key, store: keyvault, keyvault_name: kv-backup, secret_name: backup-key, last_rotated: "2026-01-01T00:00:00+00:00"}
+- {name: ghost, store: keyvault, keyvault_name: kv-backup, secret_name: ghost}
+- {name: local-only, store: sops, secret_name: local-only}
+"""
+
+STATE = {
+    "vaults": {
+        "kv-ops": {
+            "db-password": "2026-01-01T00:00:00+00:00",
+            # rotated in AKV, inventory never updated -> drift
+            "api-token": "2026-05-01T00:00:00+00:00",
+            "tls-key": "2026-01-02T00:00:00+00:00",
+        },
+        "kv-backup": {"backup-key": "2026-01-01T00:00:00+00:00"},
+    },
+    # tls-key is missing from kv-ops' listing; kv-backup's listing fails
+    "unlisted": {"kv-ops": ["tls-key"]},
+    "list_fail": ["kv-backup"],
+}
+
+
+class Sandbox:
+    """Temp dir holding the fake az, its state and log, inventory, metrics and caches."""
+
+    def __init__(self) -> None:
+        self.root = Path(tempfile.mkdtemp(prefix="akv-drift-smoke-"))
+        bin_dir = self.root / "bin"
+        bin_dir.mkdir()
+        az = bin_dir / "az"
+        az.write_text(FAKE_AZ)
+        az.chmod(0o755)
+        (self.root / "secrets.yaml").write_text(INVENTORY)
+        self.set_state(STATE)
+        self.env = {
+            **os.environ,
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "FAKE_AZ_STATE": str(self.root / "state.json"),
+            "FAKE_AZ_LOG": str(self.root / "az.log"),
+            "INVENTORY": str(self.root / "secrets.yaml"),
+            "NODE_EXPORTER_TEXTFILE_DIR": str(self.root),
+            "AKV_CACHE_PATH": str(self.root / "akv-cache.json"),
+            "OPS_INVENTORY_CACHE_DIR": str(self.root / "inventory-cache"),
+            # As root the check shells out via `runuser -u AZ_USER`
+            "AZ_USER": "root",
+        }
+
+    def set_state(self, state: Dict) -> None:
+        (self.root / "state.json").write_text(json.dumps(state))
+
+    def run(self, **env: str) -> Tuple[int, str, str, List[Tuple[str, str, str]]]:
+        """Run the check once: (exit code, stdout, stderr, az calls)."""
+        log = self.root / "az.log"
+        log.write_text("")
+        result = subprocess.run(
+            [sys.executable, str(DRIFT_SCRIPT)], env={**self.env, **env},
+            capture_output=True, text=True, timeout=120,
+        )
+        calls = [tuple(json.loads(line)) for line in log.read_text().splitlines()]
+        return result.returncode, result.stdout, result.stderr, calls
+
+    def metrics(self) -> str:
+        return (self.root / "akv_inventory_drift.prom").read_text()
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _lists(calls) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for action, vault, _ in calls:
+        if action == "list":
+            counts[vault] = counts.get(vault, 0) + 1
+    return counts
+
+
+def _shows(calls) -> List[Tuple[str, str]]:
+    return sorted((vault, name) for action, vault, name in calls if action == "show")
+
+
+def run_scenarios(box: Sandbox) -> List[Tuple[str, bool, str]]:
+    results: List[Tuple[str, bool, str]] = []
+
+    def check(name: str, passed: bool, detail: str) -> None:
+        results.append((name, passed, detail))
+
+    # 1. Cold cache
+    code, out, err, calls = box.run()
+    check("cold: one list per vault", _lists(calls) == {"kv-ops": 1, "kv-backup": 1}, str(_lists(calls)))
+    check("cold: show only for misses",
+          _shows(calls) == [("kv-backup", "backup-key"), ("kv-backup", "ghost"), ("kv-ops", "tls-key")],
+          str(_shows(calls)))
+    check("cold: drift reported", code == 0 and "drift name=api-token" in err
+          and "drift name=db-password" not in err, err.strip())
+    check("cold: summary line", "checked=5 drifted=1 missing_in_akv=1 unreachable_vaults=0" in out, out.strip())
+    metrics = box.metrics()
+    check("cold: missing metric",
+          'secrets_inventory_akv_missing{name="ghost",secret="ghost",vault="kv-backup"} 1' in metrics
+          and 'secrets_inventory_akv_missing{name="tls-key",secret="tls-key",vault="kv-ops"} 0' in metrics,
+          "akv_inventory_drift.prom")
+
+    # 2. Warm cache, nothing changed: kv-ops reuses its show results; kv-backup
+    #    (listing failed, no snapshot) and the missing secret are looked up again
+    code, out, err, calls = box.run()
+    check("warm: one list per vault", _lists(calls) == {"kv-ops": 1, "kv-backup": 1}, str(_lists(calls)))
+    check("warm: cached shows reused, failures retried",
+          _shows(calls) == [("kv-backup", "backup-key"), ("kv-backup", "ghost")], str(_shows(calls)))
+    check("warm: cache metrics",
+          'secrets_inventory_akv_cache_lookups{result="hit"} 1' in box.metrics(), "cache_lookups")
+
+    # 3. Rotation: listing checksum changes, so kv-ops' shows are re-fetched
+    rotated = json.loads(json.dumps(STATE))
+    rotated["vaults"]["kv-ops"]["db-password"] = "2026-06-01T00:00:00+00:00"
+    box.set_state(rotated)
+    code, out, err, calls = box.run()
+    check("rotation: re-listed and re-shown", _lists(calls) == {"kv-ops": 1, "kv-backup": 1}
+          and ("kv-ops", "tls-key") in _shows(calls), str(_shows(calls)))
+    check("rotation: drift picked up immediately", "drift name=db-password" in err, err.strip())
+
+    # 4. TTL expired: shows are re-fetched even with an unchanged listing
+    code, out, err, calls = box.run(AKV_CACHE_TTL_SECONDS="0")
+    check("ttl: expired snapshot re-shown", ("kv-ops", "tls-key") in _shows(calls), str(_shows(calls)))
+
+    # 5. Deadline: a hung vault is unreachable, not missing
+    hung = json.loads(json.dumps(STATE))
+    hung["hang"] = ["kv-backup"]
+    box.set_state(hung)
+    start = time.monotonic()
+    code, out, err, calls = box.run(AKV_DEADLINE_SECONDS="2", AKV_CACHE_TTL_SECONDS="0")
+    elapsed = time.monotonic() - start
+    check("deadline: run bounded", code == 0 and elapsed < 10, f"{elapsed:.1f}s")
+    check("deadline: vault unreachable",
+          "unreachable vault=kv-backup reason=deadline expired" in err
+          and "unreachable_vaults=1" in out and "missing_in_akv=0" in out, out.strip())
+    return results
+
+
+def main() -> int:
+    print("=" * 60)
+    print("AKV Inventory Drift Smoke Test (fake az)")
+    print("=" * 60)
+    if not DRIFT_SCRIPT.exists():
+        print(f"❌ {DRIFT_SCRIPT} not found")
+        return 1
+
+    box = Sandbox()
+    try:
+        results = run_scenarios(box)
+    finally:
+        box.cleanup()
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}" + ("" if passed else f"\n   {detail}"))
+    failed = sum(1 for _, passed, _ in results if not passed)
+    print()
+    print(f"Overall: {len(results) - failed}/{len(results)} checks PASS")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Benchmark result store and regression comparator.
+
+burst_test.py and context_smoke.py append every run to a local SQLite database
+(artifacts/benchmarks.db by default, override with BENCH_DB) keyed by run id,
+git commit, client host and target, with one sample row per request and model.
+The per-run CSVs in artifacts/ are still written, but history now survives.
+
+`compare` runs a two-sided Mann-Whitney U test per model on request latency and
+on per-request throughput (completion tokens/sec) between two runs, and flags a
+regression when the difference is significant and the median moved the wrong
+way by more than a threshold.
+
+Usage:
+    python3 tests/bench_store.py list [--suite burst]
+    python3 tests/bench_store.py show <run_id>
+    python3 tests/bench_store.py compare previous latest --suite burst
+"""
+
+import os
+import sys
+import json
+import math
+import uuid
+import sqlite3
+import socket
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BENCH_DB = os.getenv("BENCH_DB", os.path.join("artifacts", "benchmarks.db"))
+
+# Regression thresholds
+ALPHA = 0.05  # significance level for Mann-Whitney
+THRESHOLD = 0.10  # minimum relative change in the median to flag
+MIN_SAMPLES = 3  # below this the test has no power; report only
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    suite       TEXT NOT NULL,
+    started_at  TEXT NOT NULL,
+    git_commit  TEXT NOT NULL,
+    host        TEXT NOT NULL,
+    target      TEXT,
+    metrics     TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id            TEXT NOT NULL REFERENCES runs(run_id),
+    model             TEXT NOT NULL,
+    request_id        TEXT,
+    success           INTEGER NOT NULL,
+    status_code       INTEGER,
+    latency           REAL,
+    prompt_tokens     INTEGER,
+    completion_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_runs_suite ON runs (suite, started_at);
+CREATE INDEX IF NOT EXISTS idx_samples_run ON samples (run_id, model);
+"""
+
+
+def connect(db_path: str = BENCH_DB) -> sqlite3.Connection:
+    """Open (and initialise) the benchmark database."""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def git_commit() -> str:
+    """Short commit of the checkout running the benchmark ("-dirty" if modified)."""
+    try:
+        commit = subprocess.run(
+            ["git", "-C", str(REPO_ROOT), "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "-C", str(REPO_ROOT), "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+    if not commit:
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def record_run(suite: str, results: List[Dict], *, target: str = "",
+               metrics: Optional[Dict] = None, default_model: str = "",
+               db_path: str = BENCH_DB) -> str:
+    """
+    Append one benchmark run and its per-request samples. Returns the run id.
+
+    *results* are the per-request dicts the test scripts already build; the
+    keys used are model, request_id/test_name, success, status_code, latency,
+    prompt_tokens and completion_tokens.
+    """
+    started_at = datetime.now().isoformat(timespec="seconds")
+    run_id = f"{suite}-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+    conn = connect(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO runs (run_id, suite, started_at, git_commit, host, target, metrics) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, suite, started_at, git_commit(), socket.gethostname(), target,
+             json.dumps(metrics or {})),
+        )
+        conn.executemany(
+            "INSERT INTO samples (run_id, model, request_id, success, status_code, latency, "
+            "prompt_tokens, completion_tokens) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    r.get("model") or default_model,
+                    str(r.get("request_id", r.get("test_name", ""))),
+                    1 if r.get("success") else 0,
+                    r.get("status_code"),
+                    r.get("latency"),
+                    r.get("prompt_tokens"),
+                    r.get("completion_tokens"),
+                )
+                for r in results
+            ],
+        )
+    conn.close()
+    return run_id
+
+
+def resolve_run(conn: sqlite3.Connection, ref: str, suite: Optional[str]) -> sqlite3.Row:
+    """Resolve a run id, or "latest"/"previous" within *suite*."""
+    if ref in ("latest", "previous"):
+        query = "SELECT * FROM runs"
+        params: Tuple = ()
+        if suite:
+            query += " WHERE suite = ?"
+            params = (suite,)
+        query += " ORDER BY started_at DESC, rowid DESC LIMIT 1 OFFSET ?"
+        row = conn.execute(query, params + (0 if ref == "latest" else 1,)).fetchone()
+    else:
+        row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (ref,)).fetchone()
+    if row is None:
+        raise SystemExit(f"No run matches '{ref}'" + (f" in suite '{suite}'" if suite else ""))
+    return row
+
+
+def load_samples(conn: sqlite3.Connection, run_id: str) -> Dict[str, List[sqlite3.Row]]:
+    """Successful samples for *run_id*, grouped by model."""
+    grouped: Dict[str, List[sqlite3.Row]] = {}
+    for row in conn.execute(
+        "SELECT * FROM samples WHERE run_id = ? AND success = 1", (run_id,)
+    ):
+        grouped.setdefault(row["model"], []).append(row)
+    return grouped
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+def mann_whitney_u(a: List[float], b: List[float]) -> Tuple[float, float]:
+    """
+    Two-sided Mann-Whitney U test using the normal approximation with tie
+    correction and continuity correction. Returns (U for *a*, p-value).
+    """
+    n1, n2 = len(a), len(b)
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    n = n1 + n2
+
+    # Average ranks across ties
+    ranks = [0.0] * n
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[k] = avg_rank
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+
+    rank_sum_a = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u_a = rank_sum_a - n1 * (n1 + 1) / 2
+    mean_u = n1 * n2 / 2
+    var_u = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var_u <= 0:
+        return u_a, 1.0
+
+    z = (abs(u_a - mean_u) - 0.5) / math.sqrt(var_u)
+    p = math.erfc(max(z, 0.0) / math.sqrt(2))
+    return u_a, min(p, 1.0)
+
+
+def compare_samples(name: str, base: List[float], new: List[float], higher_is_worse: bool,
+                    alpha: float, threshold: float) -> Dict:
+    """Compare one metric between runs and decide whether it regressed."""
+    result = {
+        "metric": name,
+        "n_base": len(base),
+        "n_new": len(new),
+        "median_base": round(statistics.median(base), 4) if base else None,
+        "median_new": round(statistics.median(new), 4) if new else None,
+        "change": None,
+        "p_value": None,
+        "verdict": "insufficient data",
+    }
+    if not base or not new:
+        return result
+
+    if result["median_base"]:
+        result["change"] = round(result["median_new"] / result["median_base"] - 1, 4)
+    if len(base) < MIN_SAMPLES or len(new) < MIN_SAMPLES:
+        return result
+
+    _, p = mann_whitney_u(base, new)
+    result["p_value"] = round(p, 5)
+    change = result["change"] or 0.0
+    worse = change > threshold if higher_is_worse else change < -threshold
+    better = change < -threshold if higher_is_worse else change > threshold
+    if p < alpha and worse:
+        result["verdict"] = "REGRESSION"
+    elif p < alpha and better:
+        result["verdict"] = "improvement"
+    else:
+        result["verdict"] = "no significant change"
+    return result
+
+
+def compare_runs(conn: sqlite3.Connection, base_id: str, new_id: str,
+                 alpha: float = ALPHA, threshold: float = THRESHOLD) -> List[Dict]:
+    """Per-model latency and throughput comparison between two runs."""
+    base = load_samples(conn, base_id)
+    new = load_samples(conn, new_id)
+    comparisons = []
+    for model in sorted(set(base) | set(new)):
+        base_rows, new_rows = base.get(model, []), new.get(model, [])
+        for name, extract, higher_is_worse in (
+            ("latency_s", lambda r: r["latency"], True),
+            ("tokens_per_s", lambda r: (r["completion_tokens"] or 0) / r["latency"]
+             if r["latency"] and r["completion_tokens"] else None, False),
+        ):
+            base_values = [v for v in map(extract, base_rows) if v is not None]
+            new_values = [v for v in map(extract, new_rows) if v is not None]
+            result = compare_samples(name, base_values, new_values, higher_is_worse, alpha, threshold)
+            result["model"] = model
+            comparisons.append(result)
+    return comparisons
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def cmd_list(conn: sqlite3.Connection, args: argparse.Namespace) -> int:
+    query = ("SELECT r.*, COUNT(s.rowid) AS samples, SUM(s.success) AS ok FROM runs r "
+             "LEFT JOIN samples s ON s.run_id = r.run_id")
+    params: Tuple = ()
+    if args.suite:
+        query += " WHERE r.suite = ?"
+        params = (args.suite,)
+    query += " GROUP BY r.run_id ORDER BY r.started_at DESC LIMIT ?"
+    rows = conn.execute(query, params + (args.limit,)).fetchall()
+    print(f"{'run_id':<40} {'commit':<14} {'host':<14} {'ok/total':>9}  target")
+    for row in rows:
+        print(f"{row['run_id']:<40} {row['git_commit']:<14} {row['host']:<14} "
+              f"{(row['ok'] or 0):>4}/{row['samples']:<4}  {row['target'] or ''}")
+    return 0
+
+
+def cmd_show(conn: sqlite3.Connection, args: argparse.Namespace) -> int:
+    run = resolve_run(conn, args.run, args.suite)
+    print(json.dumps({**dict(run), "metrics": json.loads(run["metrics"] or "{}")}, indent=2))
+    for model, rows in load_samples(conn, run["run_id"]).items():
+        latencies = [r["latency"] for r in rows]
+        print(f"  {model}: n={len(rows)} median={statistics.median(latencies):.3f}s "
+              f"min={min(latencies):.3f}s max={max(latencies):.3f}s")
+    return 0
+
+
+def cmd_compare(conn: sqlite3.Connection, args: argparse.Namespace) -> int:
+    base = resolve_run(conn, args.base, args.suite)
+    new = resolve_run(conn, args.new, args.suite)
+    print("=" * 60)
+    print("Benchmark Comparison")
+    print("=" * 60)
+    print(f"Base: {base['run_id']} ({base['git_commit']}, {base['host']})")
+    print(f"New:  {new['run_id']} ({new['git_commit']}, {new['host']})")
+    print(f"Mann-Whitney U, alpha={args.alpha}, threshold={args.threshold:.0%}")
+    print()
+
+    comparisons = compare_runs(conn, base["run_id"], new["run_id"], args.alpha, args.threshold)
+    regressions = 0
+    for c in comparisons:
+        icon = {"REGRESSION": "❌", "improvement": "✅"}.get(c["verdict"], "  ")
+        change = f"{c['change'] * 100:+.1f}%" if c["change"] is not None else "n/a"
+        p_value = f"{c['p_value']:.4f}" if c["p_value"] is not None else "n/a"
+        print(f"{icon} {c['model']:<28} {c['metric']:<13} "
+              f"median {c['median_base']} -> {c['median_new']} ({change}), p={p_value}: {c['verdict']}")
+        if c["verdict"] == "REGRESSION":
+            regressions += 1
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"base": base["run_id"], "new": new["run_id"], "comparisons": comparisons}, f, indent=2)
+        print(f"\nComparison saved to: {args.json}")
+
+    if regressions:
+        print(f"\n❌ {regressions} significant regression(s)")
+        return 1
+    print("\n✅ No significant regressions")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query and compare stored benchmark runs")
+    parser.add_argument("--db", default=BENCH_DB, help=f"Benchmark database (default: {BENCH_DB})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List stored runs")
+    list_parser.add_argument("--suite", help="Filter by suite (burst, context, ...)")
+    list_parser.add_argument("--limit", type=int, default=20)
+
+    show_parser = subparsers.add_parser("show", help="Show one run")
+    show_parser.add_argument("run", help="Run id, 'latest' or 'previous'")
+    show_parser.add_argument("--suite")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two runs for regressions")
+    compare_parser.add_argument("base", help="Baseline run id, 'latest' or 'previous'")
+    compare_parser.add_argument("new", help="Candidate run id, 'latest' or 'previous'")
+    compare_parser.add_argument("--suite", help="Suite used to resolve latest/previous")
+    compare_parser.add_argument("--alpha", type=float, default=ALPHA)
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                                help="Minimum relative median change to flag (default: 0.10)")
+    compare_parser.add_argument("--json", help="Also write the comparison to this JSON file")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    conn = connect(args.db)
+    handlers = {"list": cmd_list, "show": cmd_show, "compare": cmd_compare}
+    sys.exit(handlers[args.command](conn, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,16 @@
 """
 Burst load test for vLLM deployments.
 Tests concurrent request handling and queueing behavior.
+
+With --replay, re-issues a recorded traffic trace (see traffic_trace.py) at its
+original arrival timing, optionally sped up with --speed.
+
+--client-mode selects how the client reacts to rate limiting:
+  naive  - fire-and-forget; a 429 is a final result (default, original behavior)
+  retry  - retry 429/503 after Retry-After (or exponential backoff), with jitter
+  paced  - retry, plus token-bucket admission at --rpm/--tpm and at most
+           --max-parallel requests in flight, matching the proxy's limits
+--compare-modes runs all three and reports goodput and queueing delay side by side.
 """
 
 import os
@@ -11,11 +21,18 @@ import sys
 import time
 import json
 import csv
+import argparse
 import requests
+import threading
+import statistics
 import concurrent.futures
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import bench_store
+import traffic_trace
+from rate_control import RetryPolicy, TokenBucket, parse_retry_after
+
 # Configuration
 WINTERMUTE_HOST = os.getenv("WINTERMUTE_HOST", "wintermute")
 MOTOKO_HOST = os.getenv("MOTOKO_HOST", "localhost")  # Use localhost for LiteLLM proxy
@@ -27,10 +44,26 @@ TEST_MODEL = "llama31-8b-wintermute"  # Use Wintermute for burst test
 BASE_URL = f"http://{MOTOKO_HOST}:{LITELLM_PORT}"
 LITELLM_TOKEN = os.getenv("LITELLM_TOKEN", "")
 
+# Client rate control (defaults match the armitage LiteLLM limits)
+CLIENT_MODES = ["naive", "retry", "paced"]
+BURST_RPM = int(os.getenv("BURST_RPM", "40"))
+BURST_TPM = int(os.getenv("BURST_TPM", "0"))  # 0 = no tpm pacing
+BURST_MAX_PARALLEL = int(os.getenv("BURST_MAX_PARALLEL", "2"))
+MAX_RETRIES = 5
+RETRYABLE_STATUS = (429, 503)
 
-def make_request(request_id: int) -> Dict:
+
+def make_request(
+    request_id: int,
+    *,
+    model: str = TEST_MODEL,
+    prompt: Optional[str] = None,
+    max_tokens: int = 100,
+    base_url: str = BASE_URL,
+) -> Dict:
     """Make a single API request."""
-    prompt = f"Request #{request_id}: Please provide a brief summary of machine learning."
+    if prompt is None:
+        prompt = f"Request #{request_id}: Please provide a brief summary of machine learning."
     
     headers = {
         "Content-Type": "application/json",
@@ -39,18 +72,18 @@ def make_request(request_id: int) -> Dict:
         headers["Authorization"] = f"Bearer {LITELLM_TOKEN}"
     
     payload = {
-        "model": TEST_MODEL,
+        "model": model,
         "messages": [
             {"role": "user", "content": prompt}
         ],
-        "max_tokens": 100,
+        "max_tokens": max_tokens,
         "temperature": 0.1,
     }
     
     start_time = time.time()
     try:
         response = requests.post(
-            f"{BASE_URL}/v1/chat/completions",
+            f"{base_url}/v1/chat/completions",
             headers=headers,
             json=payload,
             timeout=300,
@@ -62,6 +95,7 @@ def make_request(request_id: int) -> Dict:
             usage = data.get("usage", {})
             return {
                 "request_id": request_id,
+                "model": model,
                 "success": True,
                 "status_code": response.status_code,
                 "latency": elapsed,
@@ -77,6 +111,7 @@ def make_request(request_id: int) -> Dict:
                 "success": False,
                 "status_code": 429,
                 "latency": elapsed,
+                "retry_after": parse_retry_after(response.headers.get("Retry-After")),
                 "error": f"Rate limited (Retry-After: {retry_after})",
             }
         else:
@@ -85,6 +120,9 @@ def make_request(request_id: int) -> Dict:
                 "success": False,
                 "status_code": response.status_code,
                 "latency": elapsed,
+                # 503 may carry Retry-After too
+                "retry_after": (parse_retry_after(response.headers.get("Retry-After"))
+                                if response.status_code in RETRYABLE_STATUS else None),
                 "error": f"HTTP {response.status_code}: {response.text[:200]}",
             }
     except requests.exceptions.Timeout:
@@ -107,18 +145,94 @@ def make_request(request_id: int) -> Dict:
         }
 
 
-def run_burst_test() -> List[Dict]:
-    """Run burst test with concurrent requests."""
-    print(f"Running burst test with {BURST_SIZE} concurrent requests...")
+class ClientControls:
+    """Shared retry policy and admission limits for one burst run."""
+
+    def __init__(self, mode: str, rpm: int, tpm: int, max_parallel: int, max_retries: int):
+        self.mode = mode
+        self.policy = RetryPolicy(max_retries=max_retries)
+        paced = mode == "paced"
+        self.rpm_bucket = TokenBucket.per_minute(rpm, burst=max_parallel) if paced and rpm > 0 else None
+        self.tpm_bucket = TokenBucket.per_minute(tpm) if paced and tpm > 0 else None
+        self.parallel = threading.BoundedSemaphore(max_parallel) if paced and max_parallel > 0 else None
+
+
+def make_controlled_request(request_id: int, controls: ClientControls, **kwargs) -> Dict:
+    """
+    Make a request under *controls*: wait for admission (paced), send, and
+    retry 429/503 responses per the retry policy (retry/paced). Records the
+    attempt count, time spent queued for admission, time spent backing off
+    and the end-to-end completion time.
+    """
+    submitted = time.monotonic()
+    attempts = 0
+    queue_delay = 0.0
+    backoff_delay = 0.0
+    cost = traffic_trace.estimate_tokens(kwargs.get("prompt") or "") + kwargs.get("max_tokens", 100)
+
+    while True:
+        admit_start = time.monotonic()
+        if controls.rpm_bucket:
+            controls.rpm_bucket.acquire()
+        if controls.tpm_bucket:
+            controls.tpm_bucket.acquire(cost)
+        if controls.parallel:
+            controls.parallel.acquire()
+        queue_delay += time.monotonic() - admit_start
+        try:
+            result = make_request(request_id, **kwargs)
+        finally:
+            if controls.parallel:
+                controls.parallel.release()
+        attempts += 1
+
+        if (controls.mode == "naive" or result["success"]
+                or result["status_code"] not in RETRYABLE_STATUS
+                or attempts > controls.policy.max_retries):
+            break
+        delay = controls.policy.delay(attempts - 1, result.get("retry_after"))
+        if delay is None:
+            break  # server asked for a longer wait than we allow; keep this response
+        time.sleep(delay)
+        backoff_delay += delay
+
+    result.update({
+        "client_mode": controls.mode,
+        "attempts": attempts,
+        "queue_delay": round(queue_delay, 4),
+        "backoff_delay": round(backoff_delay, 4),
+        "completion_time": round(time.monotonic() - submitted, 4),
+    })
+    return result
+
+
+def run_burst_test(
+    base_url: str = BASE_URL,
+    *,
+    mode: str = "naive",
+    requests_count: int = BURST_SIZE,
+    rpm: int = BURST_RPM,
+    tpm: int = BURST_TPM,
+    max_parallel: int = BURST_MAX_PARALLEL,
+    max_retries: int = MAX_RETRIES,
+) -> Tuple[List[Dict], float]:
+    """Run burst test with concurrent requests. Returns (results, wall time)."""
+    print(f"Running burst test with {requests_count} concurrent requests ({mode} client)...")
     print(f"  Model: {TEST_MODEL}")
-    print(f"  Base URL: {BASE_URL}")
+    print(f"  Base URL: {base_url}")
+    if mode == "paced":
+        print(f"  Admission: rpm={rpm or 'off'} tpm={tpm or 'off'} max_parallel={max_parallel or 'off'}")
     print()
     
+    controls = ClientControls(mode, rpm, tpm, max_parallel, max_retries)
     start_time = time.time()
     
     # Submit all requests concurrently
-    with concurrent.futures.ThreadPoolExecutor(max_workers=BURST_SIZE) as executor:
-        futures = [executor.submit(make_request, i) for i in range(BURST_SIZE)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=requests_count) as executor:
+        futures = [
+            executor.submit(make_controlled_request, i, controls, base_url=base_url)
+            for i in range(requests_count)
+        ]
         results = [future.result() for future in concurrent.futures.as_completed(futures)]
     
     total_time = time.time() - start_time
@@ -131,45 +245,161 @@ def run_burst_test() -> List[Dict]:
         status = "✅" if result["success"] else "❌"
         print(f"{status} Request {result['request_id']}: "
               f"Status {result['status_code']}, "
-              f"Latency {result['latency']:.2f}s")
+              f"Latency {result['latency']:.2f}s, "
+              f"Attempts {result['attempts']}, "
+              f"Completed {result['completion_time']:.2f}s")
+        if result["error"]:
+            print(f"    Error: {result['error']}")
+    
+    print(f"\nTotal time: {total_time:.2f}s")
+    
+    return results, total_time
+
+
+def run_replay_test(trace_path: str, speed: float, base_url: str) -> Tuple[List[Dict], float]:
+    """Replay a recorded trace at its original arrival timing scaled by *speed*."""
+    records = [r for r in traffic_trace.load_trace(trace_path) if r.get("endpoint", "chat") == "chat"]
+    summary = traffic_trace.summarize_trace(records)
+    print(f"Replaying {len(records)} chat requests from {trace_path} at {speed}x...")
+    print(f"  Trace duration: {summary.get('duration', 0)}s "
+          f"(replay ~{(summary.get('duration') or 0) / speed:.1f}s)")
+    print(f"  Base URL: {base_url}")
+    print()
+    
+    def send(index: int, record: Dict) -> Dict:
+        return make_request(
+            index,
+            model=record.get("model") or TEST_MODEL,
+            prompt=traffic_trace.synthesize_prompt(record),
+            max_tokens=record.get("max_tokens") or 100,
+            base_url=base_url,
+        )
+    
+    start_time = time.time()
+    results = traffic_trace.replay_trace(records, send, speed=speed)
+    total_time = time.time() - start_time
+    for result in results:
+        result["client_mode"] = "replay"
+    
+    for result in results:
+        status = "✅" if result["success"] else "❌"
+        print(f"{status} Request {result['request_id']} @ {result['scheduled_offset']:.2f}s: "
+              f"Status {result['status_code']}, "
+              f"Latency {result['latency']:.2f}s, "
+              f"Start lag {result['start_lag'] * 1000:.0f}ms")
         if result["error"]:
             print(f"    Error: {result['error']}")
     
     print(f"\nTotal time: {total_time:.2f}s")
     
-    return results
+    return results, total_time
+
+
+def summarize_run(results: List[Dict], wall_time: float) -> Dict:
+    """Goodput and delay figures for one run."""
+    ok = [r for r in results if r["success"]]
+    completion_tokens = sum(r.get("completion_tokens", 0) for r in ok)
+    queue_delays = [r["queue_delay"] + r["backoff_delay"] for r in results if "queue_delay" in r]
+    completion_times = [r["completion_time"] for r in ok if "completion_time" in r]
+    
+    def p90(values: List[float]) -> Optional[float]:
+        return round(statistics.quantiles(values, n=10)[8], 3) if len(values) >= 10 else None
+    
+    return {
+        "requests": len(results),
+        "successful": len(ok),
+        "rate_limited": sum(1 for r in results if r["status_code"] == 429),
+        "errors": sum(1 for r in results if not r["success"] and r["status_code"] != 429),
+        "attempts": sum(r.get("attempts", 1) for r in results),
+        "wall_time": round(wall_time, 3),
+        "goodput_rps": round(len(ok) / wall_time, 4) if wall_time else None,
+        "goodput_tps": round(completion_tokens / wall_time, 2) if wall_time else None,
+        "queue_delay_mean": round(statistics.mean(queue_delays), 3) if queue_delays else None,
+        "queue_delay_p90": p90(queue_delays),
+        "completion_mean": round(statistics.mean(completion_times), 3) if completion_times else None,
+        "completion_p90": p90(completion_times),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Burst / trace-replay load test")
+    parser.add_argument("--replay", metavar="TRACE", help="Replay a recorded trace (.jsonl or .parquet)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (default: 1.0)")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"Target base URL (default: {BASE_URL})")
+    parser.add_argument("--requests", type=int, default=BURST_SIZE, help="Burst size (default: 5)")
+    parser.add_argument("--client-mode", choices=CLIENT_MODES, default="naive",
+                        help="How the client handles rate limiting (default: naive)")
+    parser.add_argument("--compare-modes", action="store_true",
+                        help="Run the burst once per client mode and compare")
+    parser.add_argument("--rpm", type=int, default=BURST_RPM, help="Admission rpm for paced mode")
+    parser.add_argument("--tpm", type=int, default=BURST_TPM, help="Admission tpm for paced mode (0 = off)")
+    parser.add_argument("--max-parallel", type=int, default=BURST_MAX_PARALLEL,
+                        help="In-flight request cap for paced mode")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES)
+    return parser.parse_args()
 
 
 def main():
     """Run burst test and generate report."""
+    args = parse_args()
+    
     print("=" * 60)
-    print("Burst Load Test")
+    print("Burst Load Test" if not args.replay else "Trace Replay Load Test")
     print("=" * 60)
     print(f"Timestamp: {datetime.now().isoformat()}")
     print()
     
-    results = run_burst_test()
+    runs = []
+    if args.replay:
+        results, wall_time = run_replay_test(args.replay, args.speed, args.base_url)
+        runs.append(("replay", results, wall_time))
+    else:
+        for mode in (CLIENT_MODES if args.compare_modes else [args.client_mode]):
+            results, wall_time = run_burst_test(
+                args.base_url,
+                mode=mode,
+                requests_count=args.requests,
+                rpm=args.rpm,
+                tpm=args.tpm,
+                max_parallel=args.max_parallel,
+                max_retries=args.max_retries,
+            )
+            runs.append((mode, results, wall_time))
+            print()
+    
+    summaries = {mode: summarize_run(results, wall_time) for mode, results, wall_time in runs}
     
     # Summary
-    print("\n" + "=" * 60)
-    print("Test Summary")
-    print("=" * 60)
-    successful = sum(1 for r in results if r["success"])
-    rate_limited = sum(1 for r in results if r["status_code"] == 429)
-    errors = sum(1 for r in results if not r["success"] and r["status_code"] != 429)
-    
-    print(f"Total requests: {len(results)}")
-    print(f"Successful: {successful}")
-    print(f"Rate limited (429): {rate_limited}")
-    print(f"Errors: {errors}")
-    
-    if successful > 0:
-        successful_latencies = [r["latency"] for r in results if r["success"]]
-        import statistics
-        print(f"\nLatency stats (successful requests):")
-        print(f"  Mean: {statistics.mean(successful_latencies):.2f}s")
-        print(f"  Min: {min(successful_latencies):.2f}s")
-        print(f"  Max: {max(successful_latencies):.2f}s")
+    for mode, results, _ in runs:
+        summary = summaries[mode]
+        print("\n" + "=" * 60)
+        print("Test Summary" + (f" ({mode} client)" if mode != "replay" else ""))
+        print("=" * 60)
+        print(f"Total requests: {summary['requests']}")
+        print(f"Successful: {summary['successful']}")
+        print(f"Rate limited (429): {summary['rate_limited']}")
+        print(f"Errors: {summary['errors']}")
+        if summary["attempts"] != summary["requests"]:
+            print(f"Attempts (incl. retries): {summary['attempts']}")
+        
+        if summary["successful"] > 0:
+            successful_latencies = [r["latency"] for r in results if r["success"]]
+            print(f"\nLatency stats (successful requests):")
+            print(f"  Mean: {statistics.mean(successful_latencies):.2f}s")
+            print(f"  Min: {min(successful_latencies):.2f}s")
+            print(f"  Max: {max(successful_latencies):.2f}s")
+            print(f"Goodput: {summary['goodput_rps']} req/s, {summary['goodput_tps']} tokens/s")
+            if summary["queue_delay_mean"] is not None:
+                print(f"Queueing delay (admission + backoff): mean {summary['queue_delay_mean']}s")
+    
+    if len(runs) > 1:
+        print("\n" + "=" * 60)
+        print("Client Mode Comparison")
+        print("=" * 60)
+        print(f"{'':<20}" + "".join(f"{mode:>12}" for mode, _, _ in runs))
+        for key in ("successful", "rate_limited", "attempts", "wall_time", "goodput_rps",
+                    "goodput_tps", "queue_delay_mean", "queue_delay_p90", "completion_mean", "completion_p90"):
+            print(f"{key:<20}" + "".join(f"{str(summaries[mode][key]):>12}" for mode, _, _ in runs))
     
     # Write CSV report
     artifacts_dir = "artifacts"
@@ -178,15 +408,36 @@ def main():
     
     with open(csv_path, "w", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=[
-            "request_id", "success", "status_code", "latency",
-            "prompt_tokens", "completion_tokens", "error"
-        ])
+            "client_mode", "request_id", "model", "success", "status_code", "latency",
+            "prompt_tokens", "completion_tokens", "scheduled_offset", "start_lag",
+            "attempts", "queue_delay", "backoff_delay", "completion_time", "error"
+        ], extrasaction="ignore")
         writer.writeheader()
-        for r in results:
-            writer.writerow(r)
+        for _, results, _ in runs:
+            for r in results:
+                writer.writerow(r)
     
     print(f"\nResults saved to: {csv_path}")
     
+    # Append to the benchmark history (compare with tests/bench_store.py)
+    for mode, results, _ in runs:
+        suite = mode if mode == "replay" else ("burst" if mode == "naive" else f"burst-{mode}")
+        run_id = bench_store.record_run(
+            suite,
+            results,
+            target=args.base_url,
+            default_model=TEST_MODEL,
+            metrics={
+                **summaries[mode],
+                "trace": args.replay,
+                "speed": args.speed if args.replay else None,
+            },
+        )
+        print(f"Run recorded in {bench_store.BENCH_DB}: {run_id}")
+    
+    errors = sum(summary["errors"] for summary in summaries.values())
+    rate_limited = sum(summary["rate_limited"] for summary in summaries.values())
+    
     # Exit with error if more than 1 request failed (allowing for 1 error as per acceptance criteria)
     if errors > 1:
         print(f"\n❌ Test failed: {errors} errors (max allowed: 1)")
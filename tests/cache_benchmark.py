@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Response cache benchmark for the LiteLLM proxy.
+Replays a prompt trace with a configurable repeat ratio twice - once with the
+proxy cache bypassed, once with it allowed - and reports hit rate, latency
+reduction and backend load for each pass.
+
+Use --local to run against an in-process stub backend fronted by an exact-match
+cache, which gives an upper bound for what the proxy cache can save.
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import hashlib
+import argparse
+import threading
+import statistics
+import urllib.request
+import concurrent.futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from datetime import datetime
+
+import requests
+
+import traffic_trace
+from stub_openai_server import StubConfig, start_in_thread
+
+# Configuration
+LITELLM_URL = os.getenv("LITELLM_URL", "http://127.0.0.1:4000")
+LITELLM_TOKEN = os.getenv("LITELLM_TOKEN", "")
+TEST_MODEL = os.getenv("CACHE_BENCH_MODEL", "akira/qwen2.5-7b")
+
+# Benchmark defaults
+TRACE_SIZE = 50
+REPEAT_RATIO = 0.5
+MAX_TOKENS = 64
+STUB_TTFT = 0.1  # stub backend time to first token in --local mode
+STUB_TOKENS_PER_SEC = 200.0
+
+# LiteLLM sets this header when a response is served from its cache
+CACHE_HIT_HEADER = "x-litellm-cache-key"
+
+
+def load_trace(path: str) -> List[Dict]:
+    """
+    Load prompts from a trace. Lines may carry literal "prompt"/"messages", or
+    be shape-only records from traffic_trace.py, in which case prompts are
+    synthesized per prompt_hash so recorded repeats stay repeats.
+    """
+    entries = []
+    for record in traffic_trace.load_trace(path):
+        if record.get("endpoint", "chat") != "chat":
+            continue
+        if "messages" not in record:
+            prompt = record.get("prompt") or traffic_trace.synthesize_prompt(record)
+            record["messages"] = [{"role": "user", "content": prompt}]
+        entries.append(record)
+    return entries
+
+
+def synthetic_prompts(count: int) -> List[Dict]:
+    """Generate distinct prompts when no recorded trace is supplied."""
+    topics = ["tailnet ACLs", "restic snapshots", "vLLM batching", "Nextcloud external storage",
+              "NoMachine codecs", "systemd timers", "Podman quadlets", "Key Vault rotation"]
+    return [
+        {"messages": [{"role": "user", "content": f"Q{i}: explain {topics[i % len(topics)]} in two sentences."}]}
+        for i in range(count)
+    ]
+
+
+def build_replay(prompts: List[Dict], size: int, repeat_ratio: float, seed: int) -> List[Dict]:
+    """
+    Build a replay sequence of *size* requests where roughly *repeat_ratio*
+    of them repeat a prompt already sent earlier in the sequence.
+    Raises ValueError if *prompts* is empty.
+    """
+    if not prompts:
+        raise ValueError("no prompts to replay")
+    rng = random.Random(seed)
+    next_unique = 0
+    sent: List[Dict] = []
+    replay = []
+    for _ in range(size):
+        if sent and (rng.random() < repeat_ratio or next_unique == len(prompts)):
+            replay.append(rng.choice(sent))
+        else:
+            entry = prompts[next_unique]
+            next_unique += 1
+            sent.append(entry)
+            replay.append(entry)
+    return replay
+
+
+def salt_replay(replay: List[Dict], salt: str) -> List[Dict]:
+    """Prefix every prompt with *salt*, keeping repeats identical within the pass."""
+    salted = []
+    for entry in replay:
+        messages = [dict(m) for m in entry["messages"]]
+        messages[-1]["content"] = f"[bench {salt}] {messages[-1].get('content', '')}"
+        salted.append({**entry, "messages": messages})
+    return salted
+
+
+def make_request(base_url: str, entry: Dict, cache_enabled: bool) -> Dict:
+    """Send one chat completion and classify it as cache hit or miss."""
+    headers = {"Content-Type": "application/json"}
+    if LITELLM_TOKEN:
+        headers["Authorization"] = f"Bearer {LITELLM_TOKEN}"
+
+    payload = {
+        "model": entry.get("model") or TEST_MODEL,
+        "messages": entry["messages"],
+        "max_tokens": entry.get("max_tokens") or MAX_TOKENS,
+        "temperature": 0,
+    }
+    if not cache_enabled:
+        # LiteLLM per-request cache bypass
+        payload["cache"] = {"no-cache": True}
+
+    start_time = time.time()
+    try:
+        response = requests.post(
+            f"{base_url}/v1/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=300,
+        )
+        elapsed = time.time() - start_time
+        return {
+            "success": response.status_code == 200,
+            "status_code": response.status_code,
+            "latency": elapsed,
+            "cache_hit": bool(response.headers.get(CACHE_HIT_HEADER)),
+            "error": None if response.status_code == 200 else f"HTTP {response.status_code}: {response.text[:200]}",
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "status_code": None,
+            "latency": time.time() - start_time,
+            "cache_hit": False,
+            "error": str(e),
+        }
+
+
+def backend_request_count(stats_url: Optional[str]) -> Optional[int]:
+    """Read the stub backend's completion counter, if a stats URL is known."""
+    if not stats_url:
+        return None
+    try:
+        return requests.get(stats_url, timeout=5).json().get("chat_completions")
+    except Exception:
+        return None
+
+
+def run_pass(base_url: str, replay: List[Dict], cache_enabled: bool,
+             concurrency: int, stats_url: Optional[str]) -> Dict:
+    """Replay the trace once and summarise hit rate, latency and backend load."""
+    label = "cache on" if cache_enabled else "cache off"
+    print(f"\nReplaying {len(replay)} requests ({label}, concurrency {concurrency})...")
+
+    backend_before = backend_request_count(stats_url)
+    start_time = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda e: make_request(base_url, e, cache_enabled), replay))
+    total_time = time.time() - start_time
+    backend_after = backend_request_count(stats_url)
+
+    ok = [r for r in results if r["success"]]
+    hits = sum(1 for r in ok if r["cache_hit"])
+    latencies = [r["latency"] for r in ok]
+    if backend_before is not None and backend_after is not None:
+        backend_requests = backend_after - backend_before
+    else:
+        # Without backend stats, every successful non-hit reached the backend
+        backend_requests = len(ok) - hits
+
+    summary = {
+        "mode": label,
+        "requests": len(results),
+        "successful": len(ok),
+        "errors": len(results) - len(ok),
+        "cache_hits": hits,
+        "hit_rate": round(hits / len(ok), 4) if ok else 0.0,
+        "backend_requests": backend_requests,
+        "total_time": round(total_time, 3),
+        "latency_mean": round(statistics.mean(latencies), 4) if latencies else None,
+        "latency_p50": round(statistics.median(latencies), 4) if latencies else None,
+        "latency_p90": round(statistics.quantiles(latencies, n=10)[8], 4) if len(latencies) >= 10 else None,
+    }
+    for r in results:
+        if r["error"]:
+            print(f"  ❌ {r['error']}")
+            break
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# --local mode: exact-match cache front over stub_openai_server
+# ---------------------------------------------------------------------------
+
+def _serve(handler_cls) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_cache_front(backend_url: str) -> ThreadingHTTPServer:
+    """Start an exact-match response cache that mimics LiteLLM's local cache."""
+    cache: Dict[str, bytes] = {}
+
+    class CacheHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            bypass = request.pop("cache", {}).get("no-cache", False)
+            key = hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+            body = None if bypass else cache.get(key)
+            hit = body is not None
+            if not hit:
+                upstream = urllib.request.Request(
+                    f"{backend_url}{self.path}",
+                    data=json.dumps(request).encode(),
+                    headers={"Content-Type": "application/json"},
+                )
+                with urllib.request.urlopen(upstream, timeout=60) as resp:
+                    body = resp.read()
+                if not bypass:
+                    cache[key] = body
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if hit:
+                self.send_header(CACHE_HIT_HEADER, key)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _serve(CacheHandler)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the LiteLLM response cache")
+    parser.add_argument("--base-url", default=LITELLM_URL, help="LiteLLM proxy base URL")
+    parser.add_argument("--trace", help="JSONL prompt trace to replay (default: synthetic prompts)")
+    parser.add_argument("--requests", type=int, default=TRACE_SIZE, help="Requests per pass")
+    parser.add_argument("--repeat-ratio", type=float, default=REPEAT_RATIO,
+                        help="Fraction of requests that repeat an earlier prompt (0.0-1.0)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent requests per pass")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the replay order")
+    parser.add_argument("--backend-stats-url", help="URL returning {\"chat_completions\": N} for backend load")
+    parser.add_argument("--local", action="store_true",
+                        help="Benchmark an in-process stub backend + cache instead of the proxy")
+    parser.add_argument("--stub-ttft", type=float, default=STUB_TTFT,
+                        help="Stub backend time to first token in seconds (--local only)")
+    parser.add_argument("--stub-tokens-per-sec", type=float, default=STUB_TOKENS_PER_SEC,
+                        help="Stub backend decode speed (--local only)")
+    return parser.parse_args()
+
+
+def main():
+    """Run the cache off/on passes and write a comparison report."""
+    args = parse_args()
+
+    print("=" * 60)
+    print("LiteLLM Response Cache Benchmark")
+    print("=" * 60)
+    print(f"Timestamp: {datetime.now().isoformat()}")
+
+    base_url = args.base_url
+    stats_url = args.backend_stats_url
+    if args.local:
+        backend_url, _ = start_in_thread(StubConfig(
+            port=0, ttft=args.stub_ttft, tokens_per_sec=args.stub_tokens_per_sec,
+        ))
+        front = start_cache_front(backend_url)
+        base_url = f"http://127.0.0.1:{front.server_address[1]}"
+        stats_url = f"{backend_url}/stats"
+
+    prompts = load_trace(args.trace) if args.trace else synthetic_prompts(args.requests)
+    if not prompts or args.requests < 1:
+        reason = "--requests must be at least 1" if args.requests < 1 else f"trace {args.trace} has no chat requests"
+        print(f"\n❌ Nothing to benchmark: {reason}")
+        sys.exit(1)
+    replay = build_replay(prompts, args.requests, args.repeat_ratio, args.seed)
+    distinct = len({json.dumps(e["messages"], sort_keys=True) for e in replay})
+
+    print(f"  Base URL: {base_url}{' (local stub)' if args.local else ''}")
+    print(f"  Requests: {len(replay)} ({distinct} distinct, repeat ratio {args.repeat_ratio})")
+
+    # Each pass salts its prompts with a per-run nonce so neither an earlier
+    # run nor the cache-off pass (LiteLLM may still write on no-cache) can
+    # warm the cache for the cache-on pass.
+    nonce = f"{int(time.time())}"
+    off = run_pass(base_url, salt_replay(replay, f"{nonce}-off"), False, args.concurrency, stats_url)
+    on = run_pass(base_url, salt_replay(replay, f"{nonce}-on"), True, args.concurrency, stats_url)
+
+    print("\n" + "=" * 60)
+    print("Benchmark Summary")
+    print("=" * 60)
+    print(f"{'':<22}{'cache off':>14}{'cache on':>14}")
+    for key in ("successful", "cache_hits", "hit_rate", "backend_requests",
+                "total_time", "latency_mean", "latency_p50", "latency_p90"):
+        print(f"{key:<22}{str(off[key]):>14}{str(on[key]):>14}")
+
+    reduction = None
+    if off["latency_mean"] and on["latency_mean"] is not None:
+        reduction = round(1 - on["latency_mean"] / off["latency_mean"], 4)
+        print(f"\nMean latency reduction: {reduction * 100:.1f}%")
+    if off["backend_requests"]:
+        saved = off["backend_requests"] - on["backend_requests"]
+        print(f"Backend requests saved: {saved} ({saved / off['backend_requests'] * 100:.1f}%)")
+
+    artifacts_dir = "artifacts"
+    os.makedirs(artifacts_dir, exist_ok=True)
+    report_path = os.path.join(artifacts_dir, "cache_benchmark_results.json")
+    with open(report_path, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "base_url": base_url,
+            "local": args.local,
+            "trace": args.trace,
+            "requests": len(replay),
+            "distinct_prompts": distinct,
+            "repeat_ratio": args.repeat_ratio,
+            "concurrency": args.concurrency,
+            "cache_off": off,
+            "cache_on": on,
+            "latency_reduction": reduction,
+        }, f, indent=2)
+
+    print(f"\nResults saved to: {report_path}")
+
+    if off["errors"] or on["errors"]:
+        print(f"\n❌ Benchmark had errors (off: {off['errors']}, on: {on['errors']})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,8 @@ import statistics
 from typing import Dict, List, Tuple
 from datetime import datetime
 
+import bench_store
+
 # Configuration
 WINTERMUTE_HOST = os.getenv("WINTERMUTE_HOST", "wintermute")
 ARMITAGE_HOST = os.getenv("ARMITAGE_HOST", "armitage")
@@ -225,6 +227,17 @@ def main():
     
     print(f"\nResults saved to: {csv_path}")
     
+    # Append to the benchmark history (compare with tests/bench_store.py).
+    # Samples are keyed by test name: the same model is reached both through
+    # LiteLLM and directly, and those latencies must not be pooled.
+    run_id = bench_store.record_run(
+        "context",
+        [{**r, "model": r["test_name"]} for r in results],
+        target=",".join(sorted({t["base_url"] for t in TESTS})),
+        metrics={"successful": successful, "total": total},
+    )
+    print(f"Run recorded in {bench_store.BENCH_DB}: {run_id}")
+    
     # Exit with error if any test failed
     if successful < total:
         sys.exit(1)
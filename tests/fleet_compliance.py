@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Fleet-wide architectural compliance scanner.
+
+Loads every host from devices/inventory.yaml and ansible/inventory/hosts.yml,
+applies the must-listen / must-not-listen port policy in
+compliance_policy.yaml, and probes every (host, port) pair concurrently.
+
+Each hostname is resolved once up front (concurrently, cached for the run)
+and all of its ports are probed against the resolved address, so DNS cost is
+per host rather than per port. Hosts that do not resolve are reported as
+unresolved without spending any connect timeouts.
+
+Outputs a compliance matrix on stdout, artifacts/fleet_compliance.csv, and a
+Prometheus textfile (--prom-file) for the node-exporter textfile collector.
+"""
+
+import os
+import sys
+import csv
+import time
+import socket
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+import port_probe
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Shared cached YAML loader (libyaml + marshal snapshot), shipped with ops_verify
+sys.path.insert(0, os.path.join(REPO_ROOT, "ansible", "roles", "ops_verify", "files"))
+import ops_inventory  # noqa: E402
+
+DEVICE_INVENTORY = os.path.join(REPO_ROOT, "devices", "inventory.yaml")
+ANSIBLE_INVENTORY = os.path.join(REPO_ROOT, "ansible", "inventory", "hosts.yml")
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compliance_policy.yaml")
+
+PROM_FILE = os.path.join("artifacts", "fleet_compliance.prom")
+
+
+# ============================================================================
+# Inventory
+# ============================================================================
+
+def _walk_ansible_group(name: str, group: Dict, hosts: Dict[str, Dict], parents: List[str]):
+    group = group or {}
+    lineage = parents + [name]
+    for host, hostvars in (group.get("hosts") or {}).items():
+        entry = hosts.setdefault(host, {"name": host, "address": None, "groups": set()})
+        entry["groups"].update(lineage)
+        if hostvars and hostvars.get("ansible_host"):
+            entry["address"] = hostvars["ansible_host"]
+    for child, child_group in (group.get("children") or {}).items():
+        _walk_ansible_group(child, child_group, hosts, lineage)
+
+
+def load_hosts(
+    device_inventory: str = DEVICE_INVENTORY,
+    ansible_inventory: str = ANSIBLE_INVENTORY,
+    tailnet_domain: str = "",
+) -> Dict[str, Dict]:
+    """
+    Merge both inventories into ``{name: {name, address, groups}}``.
+    Address preference: Ansible ansible_host, then fqdn, then Tailscale IP,
+    then ``<hostname>.<tailnet_domain>``.
+    """
+    hosts: Dict[str, Dict] = {}
+
+    if os.path.exists(ansible_inventory):
+        data = ops_inventory.load(ansible_inventory) or {}
+        for name, group in data.items():
+            _walk_ansible_group(name, group, hosts, [])
+
+    if os.path.exists(device_inventory):
+        data = ops_inventory.load(device_inventory) or {}
+        for section, members in (data.get("devices") or {}).items():
+            for name, device in (members or {}).items():
+                device = device or {}
+                entry = hosts.setdefault(name, {"name": name, "address": None, "groups": set()})
+                entry["groups"].update({"all", section})
+                network = device.get("network") or {}
+                entry["address"] = (
+                    entry["address"]
+                    or device.get("fqdn")
+                    or network.get("tailscale_ip")
+                    or (f"{name}.{tailnet_domain}" if tailnet_domain else name)
+                )
+
+    for entry in hosts.values():
+        entry["groups"].add("all")
+        entry["address"] = entry["address"] or (f"{entry['name']}.{tailnet_domain}" if tailnet_domain else entry["name"])
+    return hosts
+
+
+def load_policy(path: str = POLICY_FILE) -> Dict:
+    return ops_inventory.load(path) or {}
+
+
+def expected_ports(host: Dict, policy: Dict) -> Dict[Tuple[str, int], bool]:
+    """``{(port_name, port): should_listen}`` for one host. must_not_listen wins on conflict."""
+    expected: Dict[Tuple[str, int], bool] = {}
+    for rule in policy.get("rules", []):
+        if not host["groups"] & set(rule.get("groups", ["all"])):
+            continue
+        for port_name, port in (rule.get("must_listen") or {}).items():
+            expected.setdefault((port_name, int(port)), True)
+        for port_name, port in (rule.get("must_not_listen") or {}).items():
+            expected[(port_name, int(port))] = False
+    return expected
+
+
+# ============================================================================
+# Scanning
+# ============================================================================
+
+async def resolve_all(names: List[str], timeout: float) -> Dict[str, Dict]:
+    """Resolve each unique name once, concurrently. Returns {name: {address, error}}."""
+    loop = asyncio.get_running_loop()
+
+    async def resolve(name: str) -> Dict:
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(name, None, type=socket.SOCK_STREAM), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return {"address": None, "error": f"DNS resolution timed out after {timeout}s"}
+        except socket.gaierror as e:
+            return {"address": None, "error": f"DNS resolution failed: {str(e)}"}
+        # Prefer IPv4: tailnet MagicDNS answers both, and 100.x is the stable path
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        return {"address": infos[0][4][0], "error": ""}
+
+    unique = sorted(set(names))
+    resolved = await asyncio.gather(*(resolve(n) for n in unique))
+    return dict(zip(unique, resolved))
+
+
+async def scan(hosts: Dict[str, Dict], policy: Dict) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Probe every expected port of every host. Returns (checks, dns)."""
+    timeout = float(policy.get("timeout", 2))
+    deadline = float(policy.get("deadline", 5))
+    limit = asyncio.Semaphore(int(policy.get("max_concurrency", 256)))
+
+    dns = await resolve_all([h["address"] for h in hosts.values()], timeout)
+
+    async def bounded_probe(address: str, port: int) -> Dict:
+        async with limit:
+            return await port_probe.probe(address, port, timeout)
+
+    checks = []
+    tasks = {}
+    for name in sorted(hosts):
+        host = hosts[name]
+        resolved = dns[host["address"]]
+        for (port_name, port), should_listen in sorted(expected_ports(host, policy).items(), key=lambda x: x[0][1]):
+            check = {
+                "host": name,
+                "address": host["address"],
+                "ip": resolved["address"] or "",
+                "port_name": port_name,
+                "port": port,
+                "expect": "listen" if should_listen else "closed",
+                "listening": None,
+                "latency_ms": None,
+                "error": resolved["error"],
+            }
+            checks.append(check)
+            if resolved["address"] and (resolved["address"], port) not in tasks:
+                tasks[(resolved["address"], port)] = asyncio.ensure_future(bounded_probe(resolved["address"], port))
+
+    if tasks:
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+
+    for check in checks:
+        task = tasks.get((check["ip"], check["port"]))
+        if task is None:
+            continue
+        if task.done() and not task.cancelled():
+            result = task.result()
+            check["listening"] = result["success"]
+            check["latency_ms"] = round(result["latency_ms"], 2)
+            check["error"] = result["error"]
+        else:
+            check["listening"] = False
+            check["error"] = f"Connection timeout after {deadline}s (global deadline)"
+    for check in checks:
+        check["compliant"] = evaluate(check)
+    return checks, dns
+
+
+def evaluate(check: Dict) -> Optional[bool]:
+    """True/False for a verdict, None when the host could not be scanned."""
+    if check["listening"] is None:
+        return None
+    if check["expect"] == "listen":
+        return check["listening"]
+    return not check["listening"]
+
+
+# ============================================================================
+# Reporting
+# ============================================================================
+
+def print_matrix(checks: List[Dict]):
+    ports = sorted({(c["port"], c["port_name"]) for c in checks})
+    by_host: Dict[str, Dict[int, Dict]] = {}
+    for c in checks:
+        by_host.setdefault(c["host"], {})[c["port"]] = c
+
+    header = f"{'host':<18}" + "".join(f"{f'{name}/{port}':>16}" for port, name in ports)
+    print(header)
+    print("-" * len(header))
+    for host in sorted(by_host):
+        cells = []
+        for port, _ in ports:
+            c = by_host[host].get(port)
+            if c is None:
+                cells.append("-")
+            elif c["compliant"] is None:
+                cells.append("? unresolved")
+            else:
+                state = "open" if c["listening"] else "closed"
+                cells.append(f"{'✅' if c['compliant'] else '❌'} {state}")
+        print(f"{host:<18}" + "".join(f"{cell:>16}" for cell in cells))
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(checks: List[Dict], duration: float) -> str:
+    lines = [
+        "# HELP fleet_compliance_port_compliant 1 if the port state matches policy, 0 if not, -1 if unscanned",
+        "# TYPE fleet_compliance_port_compliant gauge",
+    ]
+    for c in checks:
+        value = -1 if c["compliant"] is None else int(c["compliant"])
+        lines.append(
+            f'fleet_compliance_port_compliant{{host="{_label(c["host"])}",port="{c["port"]}",'
+            f'service="{_label(c["port_name"])}",expect="{c["expect"]}"}} {value}'
+        )
+
+    hosts: Dict[str, List[Optional[bool]]] = {}
+    for c in checks:
+        hosts.setdefault(c["host"], []).append(c["compliant"])
+    lines += [
+        "# HELP fleet_compliance_host_compliant 1 if every policy check on the host passed",
+        "# TYPE fleet_compliance_host_compliant gauge",
+    ]
+    for host, verdicts in sorted(hosts.items()):
+        lines.append(f'fleet_compliance_host_compliant{{host="{_label(host)}"}} {int(all(v is True for v in verdicts))}')
+
+    violations = sum(1 for c in checks if c["compliant"] is False)
+    lines += [
+        "# HELP fleet_compliance_violations Number of failed policy checks",
+        "# TYPE fleet_compliance_violations gauge",
+        f"fleet_compliance_violations {violations}",
+        "# HELP fleet_compliance_scan_duration_seconds Wall time of the last scan",
+        "# TYPE fleet_compliance_scan_duration_seconds gauge",
+        f"fleet_compliance_scan_duration_seconds {duration:.3f}",
+        "# HELP fleet_compliance_last_run_timestamp_seconds Unix time of the last scan",
+        "# TYPE fleet_compliance_last_run_timestamp_seconds gauge",
+        f"fleet_compliance_last_run_timestamp_seconds {int(time.time())}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str, content: str):
+    """Atomic write so the textfile collector never reads a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fleet port-compliance scanner")
+    parser.add_argument("--policy", default=POLICY_FILE, help="Policy YAML")
+    parser.add_argument("--inventory", default=DEVICE_INVENTORY, help="devices/inventory.yaml path")
+    parser.add_argument("--ansible-inventory", default=ANSIBLE_INVENTORY, help="Ansible hosts.yml path")
+    parser.add_argument("--host", action="append", help="Only scan these hosts")
+    parser.add_argument("--prom-file", default=PROM_FILE, help="Prometheus textfile output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    policy = load_policy(args.policy)
+    hosts = load_hosts(args.inventory, args.ansible_inventory, policy.get("tailnet_domain", ""))
+    excluded = set(policy.get("exclude") or [])
+    hosts = {
+        name: host for name, host in hosts.items()
+        if name not in excluded and (not args.host or name in args.host)
+    }
+
+    print("=" * 60)
+    print("Fleet Compliance Scan")
+    print("=" * 60)
+    print(f"Timestamp: {datetime.now().isoformat()}")
+    print(f"Hosts: {len(hosts)}, rules: {len(policy.get('rules', []))}")
+    print()
+
+    start = time.monotonic()
+    checks, dns = asyncio.run(scan(hosts, policy))
+    duration = time.monotonic() - start
+
+    print_matrix(checks)
+    print(f"\nScanned {len(checks)} checks across {len(hosts)} hosts in {duration:.2f}s")
+
+    unresolved = sorted(name for name, result in dns.items() if result["error"])
+    if unresolved:
+        print(f"Unresolved: {', '.join(unresolved)}")
+    violations = [c for c in checks if c["compliant"] is False]
+    for c in violations:
+        verb = "not listening" if c["expect"] == "listen" else "listening"
+        print(f"❌ {c['host']}: {c['port_name']} port {c['port']} {verb} ({c['error'] or 'policy violation'})")
+
+    artifacts_dir = "artifacts"
+    os.makedirs(artifacts_dir, exist_ok=True)
+    csv_path = os.path.join(artifacts_dir, "fleet_compliance.csv")
+    with open(csv_path, "w", newline="") as f:
+        fieldnames = ["timestamp", "host", "address", "ip", "port_name", "port", "expect",
+                      "listening", "compliant", "latency_ms", "error"]
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        timestamp = datetime.now().isoformat()
+        for c in checks:
+            writer.writerow({"timestamp": timestamp, **c})
+    print(f"\nResults saved to: {csv_path}")
+
+    write_metrics(args.prom_file, render_metrics(checks, duration))
+    print(f"Metrics written to: {args.prom_file}")
+
+    unscanned = any(c["compliant"] is None for c in checks)
+    sys.exit(1 if violations or unscanned else 0)
+
+
+if __name__ == "__main__":
+    main()
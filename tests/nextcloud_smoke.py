@@ -10,6 +10,11 @@ Validates:
 - External storage mounts are configured
 - Internal user homes are empty (pure façade)
 - M365 sync and backup timers are active
+
+All occ/filesystem queries are batched into one `exec` of a PHP script that
+bootstraps Nextcloud once and prints JSON (see batch_query), instead of one
+`php occ` process per check. The per-check commands remain as a fallback if
+the batch script fails.
 """
 
 import os
@@ -46,6 +51,11 @@ EXPECTED_MOUNTS = [
 # Managed users (internal homes should be empty)
 MANAGED_USERS = ["admin", "mike"]
 
+# Internal home scan bounds: stop walking a home once either limit is hit
+HOME_SCAN_MAX_FILES = 10000
+HOME_SCAN_MAX_BYTES = 10 * 1024 ** 3
+HOME_SCAN_TOP_N = 5
+
 # Expected systemd timers
 EXPECTED_TIMERS = [
     "nextcloud-m365-sync.timer",
@@ -53,14 +63,107 @@ EXPECTED_TIMERS = [
     "nextcloud-home-sweeper.timer",
 ]
 
+# Runs inside the container as www-data: bootstraps Nextcloud once and answers
+# every occ/find query the smoke test needs as a single JSON document.
+BATCH_QUERY_SCRIPT = r"""<?php
+ini_set('display_errors', '0');
+chdir('/var/www/html');
+require_once '/var/www/html/lib/base.php';
+
+$out = ['errors' => new stdClass()];
+$config = \OC::$server->getConfig();
+
+try {
+    $out['skeletondirectory'] = $config->getSystemValue('skeletondirectory', null);
+} catch (\Throwable $e) {
+    $out['errors']->skeleton = $e->getMessage();
+}
+
+try {
+    \OC_App::loadApp('files_external');
+    $service = \OCP\Server::get(\OCA\Files_External\Service\DBConfigService::class);
+    $out['mounts'] = array_values(array_map(
+        fn($m) => ['mount_point' => $m['mount_point']],
+        $service->getAllMounts()
+    ));
+} catch (\Throwable $e) {
+    $out['errors']->mounts = $e->getMessage();
+}
 
-def run_command(cmd: List[str], capture: bool = True) -> Tuple[int, str, str]:
+// Walk each home recursively, stopping at NC_SMOKE_MAX_FILES files or
+// NC_SMOKE_MAX_BYTES bytes; keep the NC_SMOKE_TOP_N largest files.
+$dataDir = $config->getSystemValue('datadirectory', '/var/www/html/data');
+$maxFiles = (int)(getenv('NC_SMOKE_MAX_FILES') ?: 10000);
+$maxBytes = (int)(getenv('NC_SMOKE_MAX_BYTES') ?: 10737418240);
+$topN = (int)(getenv('NC_SMOKE_TOP_N') ?: 5);
+$out['homes'] = new stdClass();
+foreach (array_filter(explode(',', getenv('NC_SMOKE_USERS') ?: '')) as $user) {
+    $home = "$dataDir/$user/files";
+    if (!is_dir($home)) {
+        $out['homes']->$user = null;
+        continue;
+    }
+    $summary = ['files' => 0, 'bytes' => 0, 'truncated' => false, 'top' => []];
+    $errors = 0;
+    $top = new SplMinHeap();  // [size, relative path]
+    $stack = [$home];
+    while ($stack && !$summary['truncated']) {
+        $dir = array_pop($stack);
+        $handle = @opendir($dir);
+        if ($handle === false) {
+            $errors++;
+            continue;
+        }
+        while (($name = readdir($handle)) !== false) {
+            if ($name === '.' || $name === '..') {
+                continue;
+            }
+            $path = "$dir/$name";
+            $st = @lstat($path);
+            if ($st === false) {
+                $errors++;
+                continue;
+            }
+            if (($st['mode'] & 0170000) === 0040000) {
+                $stack[] = $path;
+                continue;
+            }
+            $summary['files']++;
+            $summary['bytes'] += $st['size'];
+            $top->insert([$st['size'], substr($path, strlen($home) + 1)]);
+            if ($top->count() > $topN) {
+                $top->extract();
+            }
+            if ($summary['files'] >= $maxFiles || $summary['bytes'] >= $maxBytes) {
+                $summary['truncated'] = true;
+                break;
+            }
+        }
+        closedir($handle);
+    }
+    if ($errors) {
+        // Partial view: leave the user out so the caller checks it directly
+        $out['errors']->{"home_$user"} = "$errors entries unreadable";
+        continue;
+    }
+    foreach ($top as [$size, $path]) {
+        array_unshift($summary['top'], [$path, $size]);
+    }
+    $out['homes']->$user = $summary;
+}
+
+echo "\n" . json_encode($out) . "\n";
+"""
+
+
+def run_command(cmd: List[str], capture: bool = True, input: Optional[str] = None) -> Tuple[int, str, str]:
     """Run a shell command and return exit code, stdout, stderr."""
     try:
         result = subprocess.run(
             cmd,
             capture_output=capture,
             text=True,
+            input=input,
             timeout=30,
         )
         return (result.returncode, result.stdout, result.stderr)
@@ -70,9 +173,32 @@ def run_command(cmd: List[str], capture: bool = True) -> Tuple[int, str, str]:
         return (-1, "", str(e))
 
 
-def container_exec(args: List[str]) -> Tuple[int, str, str]:
+def container_exec(args: List[str], input: Optional[str] = None) -> Tuple[int, str, str]:
     """Run a container command using the configured runtime."""
-    return run_command([CONTAINER_RUNTIME] + args)
+    return run_command([CONTAINER_RUNTIME] + args, input=input)
+
+
+def batch_query(users: List[str]) -> Optional[Dict]:
+    """
+    Run BATCH_QUERY_SCRIPT in the container (one exec, one PHP bootstrap).
+    Returns the parsed JSON, or None if the script failed so callers fall
+    back to per-check commands.
+    """
+    code, stdout, stderr = container_exec([
+        "exec", "-i", "-u", "33", "-e", f"NC_SMOKE_USERS={','.join(users)}",
+        "-e", f"NC_SMOKE_MAX_FILES={HOME_SCAN_MAX_FILES}",
+        "-e", f"NC_SMOKE_MAX_BYTES={HOME_SCAN_MAX_BYTES}",
+        "-e", f"NC_SMOKE_TOP_N={HOME_SCAN_TOP_N}",
+        NEXTCLOUD_CONFIG["container_name"], "php",
+    ], input=BATCH_QUERY_SCRIPT)
+    if code != 0:
+        return None
+    # Nextcloud may print warnings during bootstrap; the JSON is the last line
+    lines = [line for line in stdout.strip().split("\n") if line]
+    try:
+        return json.loads(lines[-1]) if lines else None
+    except json.JSONDecodeError:
+        return None
 
 
 def test_container_running() -> Tuple[bool, str]:
@@ -102,27 +228,34 @@ def test_nextcloud_status() -> Tuple[bool, str, Optional[Dict]]:
         return (False, f"Error checking status: {str(e)}", None)
 
 
-def test_skeleton_disabled() -> Tuple[bool, str]:
+def test_skeleton_disabled(batch: Optional[Dict] = None) -> Tuple[bool, str]:
     """Test if skeleton directory is disabled (pure façade requirement)."""
-    code, stdout, stderr = container_exec([
-        "exec", "-u", "33", NEXTCLOUD_CONFIG["container_name"],
-        "php", "occ", "config:system:get", "skeletondirectory"
-    ])
+    if batch is not None and "skeletondirectory" in batch:
+        # Unset (null) matches occ's non-zero exit; empty string means disabled
+        code, stdout = 0, batch["skeletondirectory"] or ""
+    else:
+        code, stdout, stderr = container_exec([
+            "exec", "-u", "33", NEXTCLOUD_CONFIG["container_name"],
+            "php", "occ", "config:system:get", "skeletondirectory"
+        ])
     # Empty output or non-zero exit means disabled (good)
     if code != 0 or stdout.strip() == "":
         return (True, "Skeleton directory disabled")
     return (False, f"Skeleton directory is set: {stdout.strip()}")
 
 
-def test_external_mounts() -> Tuple[bool, str, List[str]]:
+def test_external_mounts(batch: Optional[Dict] = None) -> Tuple[bool, str, List[str]]:
     """Test if external storage mounts are configured."""
-    # Use -a flag to show all mounts including user-specific (personal) mounts
-    code, stdout, stderr = container_exec([
-        "exec", "-u", "33", NEXTCLOUD_CONFIG["container_name"],
-        "php", "occ", "files_external:list", "-a", "--output=json"
-    ])
-    if code != 0:
-        return (False, f"Cannot list external mounts: {stderr}", [])
+    if batch is not None and "mounts" in batch:
+        code, stdout = 0, json.dumps(batch["mounts"])
+    else:
+        # Use -a flag to show all mounts including user-specific (personal) mounts
+        code, stdout, stderr = container_exec([
+            "exec", "-u", "33", NEXTCLOUD_CONFIG["container_name"],
+            "php", "occ", "files_external:list", "-a", "--output=json"
+        ])
+        if code != 0:
+            return (False, f"Cannot list external mounts: {stderr}", [])
     
     try:
         mounts = json.loads(stdout)
@@ -137,12 +270,42 @@ def test_external_mounts() -> Tuple[bool, str, List[str]]:
         return (False, f"Invalid JSON from occ: {stdout[:100]}", [])
 
 
-def test_internal_home_empty(user: str) -> Tuple[bool, str]:
-    """Test if user's internal Nextcloud home is empty (pure façade)."""
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size}B"
+
+
+def test_internal_home_empty(user: str, batch: Optional[Dict] = None) -> Tuple[bool, str]:
+    """
+    Test if user's internal Nextcloud home is empty (pure façade).
+
+    The occ batch walks the whole home (subdirectories included, bounded by
+    HOME_SCAN_MAX_FILES / HOME_SCAN_MAX_BYTES) and reports a summary of
+    {files, bytes, truncated, top}; without it, fall back to a bounded
+    ``find`` in the container.
+    """
+    homes = (batch or {}).get("homes") or {}
+    if user in homes:
+        summary = homes[user]
+        if summary is None:
+            return (True, "User home not created yet (expected)")
+        if summary["files"] == 0:
+            return (True, "Internal home is empty (pure façade compliant)")
+        count = f"{'at least ' if summary['truncated'] else ''}{summary['files']}"
+        offenders = [f"{path} ({_format_bytes(size)})" for path, size in summary["top"]]
+        return (False, f"Found {count} files ({_format_bytes(summary['bytes'])}) in internal home; "
+                       f"largest: {offenders}")
+    
     # Use container exec to check as www-data user (uid 33)
+    home = f"/var/www/html/data/{user}/files"
     code, stdout, stderr = container_exec([
-        "exec", "-u", "33", NEXTCLOUD_CONFIG["container_name"],
-        "find", f"/var/www/html/data/{user}/files", "-maxdepth", "1", "-type", "f"
+        "exec", "-u", "33", NEXTCLOUD_CONFIG["container_name"], "sh", "-c",
+        f'test -d "$1" || {{ echo "No such file" >&2; exit 1; }}; '
+        f'find "$1" -type f | head -n {HOME_SCAN_MAX_FILES}',
+        "sh", home,
     ])
     
     if code != 0:
@@ -156,8 +319,9 @@ def test_internal_home_empty(user: str) -> Tuple[bool, str]:
         return (True, "Internal home is empty (pure façade compliant)")
     
     # List what's there
-    file_names = [Path(f).name for f in files[:5]]
-    return (False, f"Found {len(files)} files in internal home: {file_names}")
+    count = f"{'at least ' if len(files) >= HOME_SCAN_MAX_FILES else ''}{len(files)}"
+    file_names = [os.path.relpath(f, home) for f in files[:5]]
+    return (False, f"Found {count} files in internal home: {file_names}")
 
 
 def test_space_mounts_exist() -> Tuple[bool, str, List[str]]:
@@ -180,6 +344,143 @@ def test_timer_active(timer: str) -> Tuple[bool, str]:
     return (False, f"{timer} is not active: {stdout.strip() or stderr.strip()}")
 
 
+# ============================================================================
+# Check graph
+# ============================================================================
+
+def build_checks() -> List[Dict]:
+    """
+    Declare every check as a node in a dependency graph.
+
+    Each node has a ``name``, a ``run(outputs)`` callable returning
+    ``(passed, message, value)``, and ``deps`` naming nodes that must finish
+    (and pass) first; ``outputs`` maps finished node names to their value.
+    ``group`` is the report section; nodes with ``group=None`` are internal
+    and not reported. A node whose dependency failed is skipped (failed)
+    without running; ``after`` lists nodes that only need to have finished,
+    whatever their outcome.
+    """
+    def occ_batch(outputs: Dict) -> Tuple[bool, str, Optional[Dict]]:
+        batch = batch_query(MANAGED_USERS)
+        # Never fails the graph: consumers fall back to per-check commands
+        return (True, "batched" if batch is not None else "batch failed", batch)
+
+    def external_mounts(outputs: Dict) -> Tuple[bool, str, List[str]]:
+        return test_external_mounts(outputs["occ batch"])
+
+    checks = [
+        {"name": "Container", "group": "1. Container Status", "deps": [], "critical": True,
+         "run": lambda outputs: (*test_container_running(), None)},
+        {"name": "API Status", "group": "2. Nextcloud API Status", "deps": [], "critical": True,
+         "run": lambda outputs: test_nextcloud_status()},
+        {"name": "occ batch", "group": None, "deps": ["Container"],
+         "run": occ_batch},
+        {"name": "Skeleton Disabled", "group": "3. Skeleton Directory (Pure Façade)",
+         "deps": ["occ batch"], "critical": True,
+         "run": lambda outputs: (*test_skeleton_disabled(outputs["occ batch"]), None)},
+        {"name": "External Mounts", "group": "4. External Storage Mounts", "deps": ["occ batch"],
+         "run": external_mounts},
+        {"name": "/space Dirs", "group": "5. /space Mount Directories", "deps": [],
+         "run": lambda outputs: test_space_mounts_exist()},
+    ]
+    for user in MANAGED_USERS:
+        checks.append({
+            "name": f"Home {user}", "group": "6. Internal User Homes (Pure Façade)",
+            "deps": ["occ batch"], "warn_only": True, "label": user,
+            "run": lambda outputs, user=user: (*test_internal_home_empty(user, outputs["occ batch"]), None),
+        })
+    for timer in EXPECTED_TIMERS:
+        checks.append({
+            "name": timer, "group": "7. Systemd Timers", "deps": [], "warn_only": True,
+            "run": lambda outputs, timer=timer: (*test_timer_active(timer), None),
+        })
+    return checks
+
+
+def run_check_graph(checks: List[Dict], max_workers: int = 8) -> Dict[str, Dict]:
+    """
+    Run *checks* concurrently, each starting as soon as its dependencies have
+    finished, so total time is bounded by the critical path.
+    Returns {name: {passed, message, value, started_ms, duration_ms, skipped}}.
+    """
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+    by_name = {c["name"]: c for c in checks}
+    for check in checks:
+        unknown = [d for d in check["deps"] + check.get("after", []) if d not in by_name]
+        if unknown:
+            raise ValueError(f"{check['name']}: unknown dependencies {unknown}")
+
+    origin = time.monotonic()
+    results: Dict[str, Dict] = {}
+    outputs: Dict[str, object] = {}
+    running = {}
+
+    def timed(check: Dict) -> Tuple[float, Tuple]:
+        start = time.monotonic()
+        try:
+            outcome = check["run"](outputs)
+        except Exception as e:
+            outcome = (False, f"Check raised: {str(e)}", None)
+        return start, outcome
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = list(checks)
+        while pending or running:
+            for check in list(pending):
+                if not all(d in results for d in check["deps"] + check.get("after", [])):
+                    continue
+                pending.remove(check)
+                failed = [d for d in check["deps"] if not results[d]["passed"]]
+                if failed:
+                    # Report the check that actually failed, not intermediate skips
+                    blocked_by = sorted({b for d in failed for b in results[d].get("blocked_by") or [d]})
+                    results[check["name"]] = {
+                        "passed": False, "message": f"Skipped: {', '.join(blocked_by)} failed",
+                        "value": None, "started_ms": None, "duration_ms": 0.0, "skipped": True,
+                        "blocked_by": blocked_by,
+                    }
+                    outputs[check["name"]] = None
+                else:
+                    running[executor.submit(timed, check)] = check
+
+            if not running:
+                if pending:
+                    # Every remaining node waits on something that can never finish
+                    raise ValueError(f"Dependency cycle among: {[c['name'] for c in pending]}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            finished = time.monotonic()
+            for future in done:
+                check = running.pop(future)
+                start, (passed, message, value) = future.result()
+                results[check["name"]] = {
+                    "passed": passed, "message": message, "value": value,
+                    "started_ms": round((start - origin) * 1000, 1),
+                    "duration_ms": round((finished - start) * 1000, 1),
+                    "skipped": False,
+                }
+                outputs[check["name"]] = value
+    return results
+
+
+def critical_path(checks: List[Dict], results: Dict[str, Dict]) -> Tuple[List[str], float]:
+    """Longest chain of dependent check durations (ms) - the lower bound on run time."""
+    best: Dict[str, Tuple[float, List[str]]] = {}
+
+    def longest(name: str) -> Tuple[float, List[str]]:
+        if name not in best:
+            check = next(c for c in checks if c["name"] == name)
+            prior = max((longest(d) for d in check["deps"] + check.get("after", [])),
+                        default=(0.0, []), key=lambda x: x[0])
+            best[name] = (prior[0] + results[name]["duration_ms"], prior[1] + [name])
+        return best[name]
+
+    total, path = max((longest(c["name"]) for c in checks), key=lambda x: x[0])
+    return path, round(total, 1)
+
+
 def main():
     """Run all Nextcloud pure façade smoke tests."""
     print("=" * 70)
@@ -189,67 +490,35 @@ def main():
     print(f"Testing: {NEXTCLOUD_CONFIG['name']}")
     print()
     
-    results = []
-    all_passed = True
-    
-    # Test 1: Container running
-    print("1. Container Status")
-    passed, msg = test_container_running()
-    results.append(("Container", passed, msg))
-    print(f"   {'✅' if passed else '❌'} {msg}")
-    if not passed:
-        all_passed = False
-    
-    # Test 2: Nextcloud status
-    print("\n2. Nextcloud API Status")
-    passed, msg, status_data = test_nextcloud_status()
-    results.append(("API Status", passed, msg))
-    print(f"   {'✅' if passed else '❌'} {msg}")
-    if not passed:
-        all_passed = False
-    
-    # Test 3: Skeleton disabled
-    print("\n3. Skeleton Directory (Pure Façade)")
-    passed, msg = test_skeleton_disabled()
-    results.append(("Skeleton Disabled", passed, msg))
-    print(f"   {'✅' if passed else '❌'} {msg}")
-    if not passed:
-        all_passed = False
-    
-    # Test 4: External mounts
-    print("\n4. External Storage Mounts")
-    passed, msg, mounts = test_external_mounts()
-    results.append(("External Mounts", passed, msg))
-    print(f"   {'✅' if passed else '❌'} {msg}")
-    if mounts:
-        for m in mounts:
-            print(f"      - {m}")
-    if not passed:
-        all_passed = False
+    checks = build_checks()
+    run_start = time.monotonic()
+    outcomes = run_check_graph(checks)
+    wall_ms = round((time.monotonic() - run_start) * 1000, 1)
     
-    # Test 5: /space directories exist
-    print("\n5. /space Mount Directories")
-    passed, msg, missing = test_space_mounts_exist()
-    results.append(("/space Dirs", passed, msg))
-    print(f"   {'✅' if passed else '❌'} {msg}")
-    if not passed:
-        all_passed = False
+    # Report in declaration order, grouped by section
+    results = []
+    current_group = None
+    for check in checks:
+        if check["group"] is None:
+            continue
+        outcome = outcomes[check["name"]]
+        if check["group"] != current_group:
+            current_group = check["group"]
+            print(f"\n{current_group}" if results else current_group)
+        passed, msg = outcome["passed"], outcome["message"]
+        icon = "✅" if passed else ("⚠️" if check.get("warn_only") else "❌")
+        label = f"{check['label']}: " if check.get("label") else ""
+        print(f"   {icon} {label}{msg}  ({outcome['duration_ms']:.0f}ms)")
+        if check["name"] == "External Mounts":
+            for m in outcome["value"] or []:
+                print(f"      - {m}")
+        # Don't fail overall for non-empty homes or inactive timers - just warn
+        results.append((check["name"], passed, msg))
     
-    # Test 6: Internal homes empty
-    print("\n6. Internal User Homes (Pure Façade)")
-    for user in MANAGED_USERS:
-        passed, msg = test_internal_home_empty(user)
-        results.append((f"Home {user}", passed, msg))
-        print(f"   {'✅' if passed else '⚠️'} {user}: {msg}")
-        # Don't fail overall for non-empty homes (might have pre-existing data)
-        # Just warn
+    if outcomes["occ batch"]["value"] is None and not outcomes["occ batch"]["skipped"]:
+        print("\n   ⚠️ Batched occ query failed - fell back to per-check commands")
     
-    # Test 7: Systemd timers
-    print("\n7. Systemd Timers")
-    for timer in EXPECTED_TIMERS:
-        passed, msg = test_timer_active(timer)
-        results.append((timer, passed, msg))
-        print(f"   {'✅' if passed else '⚠️'} {msg}")
+    path, path_ms = critical_path(checks, outcomes)
     
     # Summary
     print("\n" + "=" * 70)
@@ -260,10 +529,11 @@ def main():
     total = len(results)
     
     print(f"Overall: {passed_count}/{total} tests passed")
+    print(f"Wall time: {wall_ms:.0f}ms (critical path {path_ms:.0f}ms: {' -> '.join(path)})")
     print()
     
     # External mounts may fail if mike user doesn't exist yet (first run) - not critical
-    critical_tests = ["Container", "API Status", "Skeleton Disabled"]
+    critical_tests = [c["name"] for c in checks if c.get("critical")]
     critical_passed = all(p for name, p, _ in results if name in critical_tests)
     
     if critical_passed:
@@ -283,7 +553,19 @@ def main():
             "timestamp": datetime.now().isoformat(),
             "server": NEXTCLOUD_CONFIG["name"],
             "overall_passed": critical_passed,
-            "results": [{"test": name, "passed": p, "message": msg} for name, p, msg in results],
+            "wall_time_ms": wall_ms,
+            "critical_path": path,
+            "critical_path_ms": path_ms,
+            "internal_homes": (outcomes["occ batch"]["value"] or {}).get("homes"),
+            "results": [
+                {
+                    "test": name, "passed": p, "message": msg,
+                    "started_ms": outcomes[name]["started_ms"],
+                    "duration_ms": outcomes[name]["duration_ms"],
+                    "skipped": outcomes[name]["skipped"],
+                }
+                for name, p, msg in results
+            ],
         }, f, indent=2)
     
     print(f"\nResults saved to: {report_path}")
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Nextcloud WebDAV throughput benchmark.
+
+Measures how fast files move through the Nextcloud façade into each /space
+external mount:
+- Large-file PUT/GET throughput (MB/s) for several sizes; files above the
+  chunk size use Nextcloud chunked upload v2 (MKCOL + chunk PUTs + MOVE)
+- Small-file PUT/GET operations per second
+- PROPFIND (Depth: 1) latency on a deep directory tree
+
+Everything is written under a per-run "_webdav_bench-<id>" folder in each
+mount and deleted afterwards. Requests reuse keep-alive connections, one per
+worker thread.
+
+Credentials come from NEXTCLOUD_USER / NEXTCLOUD_PASSWORD (use an app
+password). --local starts a throwaway SQLite-backed Nextcloud container on
+port 8081 and benchmarks the user's root folder instead of the /space mounts.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import argparse
+import http.client
+import threading
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from urllib.parse import quote, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_store
+from nextcloud_smoke import CONTAINER_RUNTIME, EXPECTED_MOUNTS, run_command
+
+# Configuration
+NEXTCLOUD_URL = os.getenv("NEXTCLOUD_URL", "http://127.0.0.1:8080")
+NEXTCLOUD_USER = os.getenv("NEXTCLOUD_USER", "mike")
+NEXTCLOUD_PASSWORD = os.getenv("NEXTCLOUD_PASSWORD", "")
+
+LARGE_SIZES_MB = [1, 16, 64]
+CHUNK_SIZE_MB = 10
+SMALL_FILE_COUNT = 200
+SMALL_FILE_SIZE = 4096
+PROPFIND_DEPTH = 8
+PROPFIND_FILES = 50  # entries in the deepest directory
+PROPFIND_REPEATS = 20
+CONCURRENCY = 4
+TIMEOUT = 120
+
+# Throwaway container for --local runs
+LOCAL_IMAGE = "docker.io/library/nextcloud:29-apache"
+LOCAL_CONTAINER = "nextcloud-webdav-bench"
+LOCAL_PORT = 8081
+LOCAL_ADMIN = ("admin", "webdav-bench-admin")
+
+
+class DavClient:
+    """Minimal keep-alive WebDAV client. Not thread-safe; use one per thread."""
+
+    def __init__(self, base_url: str, user: str, password: str, timeout: float = TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.user = user
+        self.timeout = timeout
+        token = base64.b64encode(f"{user}:{password}".encode()).decode()
+        self.headers = {"Authorization": f"Basic {token}", "OCS-APIRequest": "true"}
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self.netloc, timeout=self.timeout)
+        return self._conn
+
+    def files_path(self, path: str) -> str:
+        return f"{self.prefix}/remote.php/dav/files/{quote(self.user)}/{quote(path.strip('/'))}"
+
+    def uploads_path(self, path: str) -> str:
+        return f"{self.prefix}/remote.php/dav/uploads/{quote(self.user)}/{quote(path.strip('/'))}"
+
+    def absolute(self, dav_path: str) -> str:
+        return f"{self.scheme}://{self.netloc}{dav_path}"
+
+    def request(self, method: str, dav_path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict] = None) -> Tuple[int, int, float]:
+        """Send one request. Returns (status, response_bytes, seconds); the body is drained, not kept."""
+        all_headers = {**self.headers, **(headers or {})}
+        for attempt in range(2):
+            start = time.monotonic()
+            try:
+                conn = self._connection()
+                conn.request(method, dav_path, body=body, headers=all_headers)
+                response = conn.getresponse()
+                received = 0
+                while True:
+                    chunk = response.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                return (response.status, received, time.monotonic() - start)
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed an idle keep-alive connection; reconnect once
+                self.close()
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def mkcol(self, path: str) -> int:
+        return self.request("MKCOL", self.files_path(path))[0]
+
+    def delete(self, path: str) -> int:
+        return self.request("DELETE", self.files_path(path))[0]
+
+    def put(self, path: str, data: bytes) -> Tuple[int, float]:
+        status, _, elapsed = self.request("PUT", self.files_path(path), data)
+        return status, elapsed
+
+    def get(self, path: str) -> Tuple[int, int, float]:
+        return self.request("GET", self.files_path(path))
+
+    def propfind(self, path: str, depth: str = "1") -> Tuple[int, float]:
+        body = b'<?xml version="1.0"?><d:propfind xmlns:d="DAV:"><d:allprop/></d:propfind>'
+        status, _, elapsed = self.request(
+            "PROPFIND", self.files_path(path), body,
+            {"Depth": depth, "Content-Type": "application/xml"},
+        )
+        return status, elapsed
+
+    def chunked_put(self, path: str, data: bytes, chunk_size: int) -> Tuple[int, float]:
+        """
+        Nextcloud chunked upload v2: MKCOL an upload folder, PUT numbered
+        chunks, then MOVE the assembled ".file" onto the destination.
+        """
+        destination = {"Destination": self.absolute(self.files_path(path)),
+                       "OC-Total-Length": str(len(data))}
+        folder = f"bench-{uuid.uuid4().hex}"
+        start = time.monotonic()
+        status, _, _ = self.request("MKCOL", self.uploads_path(folder), headers=destination)
+        if status >= 300:
+            return status, time.monotonic() - start
+        for index, offset in enumerate(range(0, len(data), chunk_size), start=1):
+            status, _, _ = self.request(
+                "PUT", self.uploads_path(f"{folder}/{index:05d}"),
+                data[offset:offset + chunk_size], destination,
+            )
+            if status >= 300:
+                self.request("DELETE", self.uploads_path(folder))
+                return status, time.monotonic() - start
+        status, _, _ = self.request("MOVE", self.uploads_path(f"{folder}/.file"), headers=destination)
+        return status, time.monotonic() - start
+
+
+def _ok(status: int) -> bool:
+    return 200 <= status < 300
+
+
+def bench_large_files(client: DavClient, root: str, sizes_mb: List[int], chunk_size: int) -> Tuple[List[Dict], List[Dict]]:
+    rows, samples = [], []
+    for size_mb in sizes_mb:
+        data = os.urandom(size_mb * 1024 * 1024)
+        path = f"{root}/large-{size_mb}mb.bin"
+        if len(data) > chunk_size:
+            status, put_time = client.chunked_put(path, data, chunk_size)
+        else:
+            status, put_time = client.put(path, data)
+        put_ok = _ok(status)
+        get_status, received, get_time = client.get(path) if put_ok else (0, 0, 0.0)
+        get_ok = _ok(get_status) and received == len(data)
+        rows.append({
+            "size_mb": size_mb,
+            "chunked": len(data) > chunk_size,
+            "put_status": status,
+            "put_mb_s": round(size_mb / put_time, 2) if put_ok and put_time else None,
+            "get_status": get_status,
+            "get_mb_s": round(size_mb / get_time, 2) if get_ok and get_time else None,
+        })
+        samples.append({"op": f"put-{size_mb}mb", "success": put_ok, "status_code": status, "latency": put_time})
+        samples.append({"op": f"get-{size_mb}mb", "success": get_ok, "status_code": get_status, "latency": get_time})
+    return rows, samples
+
+
+def bench_small_files(make_client, root: str, count: int, size: int, concurrency: int) -> Tuple[Dict, List[Dict]]:
+    data = os.urandom(size)
+    local = threading.local()
+
+    def client() -> DavClient:
+        if not hasattr(local, "client"):
+            local.client = make_client()
+        return local.client
+
+    def put(i: int) -> Dict:
+        status, elapsed = client().put(f"{root}/small/{i:05d}.bin", data)
+        return {"op": "small-put", "success": _ok(status), "status_code": status, "latency": elapsed}
+
+    def get(i: int) -> Dict:
+        status, received, elapsed = client().get(f"{root}/small/{i:05d}.bin")
+        return {"op": "small-get", "success": _ok(status) and received == size,
+                "status_code": status, "latency": elapsed}
+
+    summary = {"count": count, "size_bytes": size, "concurrency": concurrency}
+    samples: List[Dict] = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for name, fn in (("put", put), ("get", get)):
+            start = time.monotonic()
+            results = list(executor.map(fn, range(count)))
+            wall = time.monotonic() - start
+            ok = sum(1 for r in results if r["success"])
+            summary[f"{name}_ok"] = ok
+            summary[f"{name}_ops_s"] = round(ok / wall, 1) if wall else None
+            samples.extend(results)
+    return summary, samples
+
+
+def bench_propfind(client: DavClient, root: str, depth: int, files: int, repeats: int) -> Tuple[Dict, List[Dict]]:
+    path = f"{root}/deep"
+    client.mkcol(path)
+    for level in range(depth):
+        path = f"{path}/d{level}"
+        client.mkcol(path)
+    for i in range(files):
+        client.put(f"{path}/f{i:04d}.txt", b"x")
+
+    timings, samples = [], []
+    for _ in range(repeats):
+        status, elapsed = client.propfind(path, "1")
+        samples.append({"op": "propfind-deep", "success": _ok(status) or status == 207,
+                        "status_code": status, "latency": elapsed})
+        if status == 207:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        "depth": depth,
+        "entries": files,
+        "repeats": repeats,
+        "ok": len(timings),
+        "p50_ms": round(timings[len(timings) // 2], 2) if timings else None,
+        "max_ms": round(timings[-1], 2) if timings else None,
+    }, samples
+
+
+def bench_mount(args, mount: str) -> Tuple[Dict, List[Dict]]:
+    def make_client() -> DavClient:
+        return DavClient(args.url, args.user, args.password)
+
+    client = make_client()
+    root = f"{mount}/_webdav_bench-{uuid.uuid4().hex[:8]}".strip("/")
+    result: Dict = {"mount": mount or "/", "root": root}
+    samples: List[Dict] = []
+    try:
+        status = client.mkcol(root)
+        if not _ok(status):
+            result["error"] = f"MKCOL {root} returned {status}"
+            return result, samples
+        client.mkcol(f"{root}/small")
+
+        result["large"], s = bench_large_files(client, root, args.sizes, args.chunk_size * 1024 * 1024)
+        samples += s
+        result["small"], s = bench_small_files(make_client, root, args.small_count, args.small_size, args.concurrency)
+        samples += s
+        result["propfind"], s = bench_propfind(client, root, args.depth, args.propfind_files, args.repeats)
+        samples += s
+    except (OSError, http.client.HTTPException) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        try:
+            client.delete(root)
+        except (OSError, http.client.HTTPException):
+            pass
+        client.close()
+
+    for sample in samples:
+        sample["model"] = f"{result['mount']}:{sample.pop('op')}"
+    return result, samples
+
+
+def start_local_nextcloud() -> str:
+    """Start a throwaway SQLite Nextcloud and wait until status.php reports installed."""
+    import urllib.request
+
+    run_command([CONTAINER_RUNTIME, "rm", "-f", LOCAL_CONTAINER])
+    code, _, stderr = run_command([
+        CONTAINER_RUNTIME, "run", "-d", "--name", LOCAL_CONTAINER, "-p", f"127.0.0.1:{LOCAL_PORT}:80",
+        "-e", "SQLITE_DATABASE=nextcloud",
+        "-e", f"NEXTCLOUD_ADMIN_USER={LOCAL_ADMIN[0]}",
+        "-e", f"NEXTCLOUD_ADMIN_PASSWORD={LOCAL_ADMIN[1]}",
+        "-e", "NEXTCLOUD_TRUSTED_DOMAINS=127.0.0.1 localhost",
+        LOCAL_IMAGE,
+    ])
+    if code != 0:
+        raise RuntimeError(f"Cannot start {LOCAL_IMAGE}: {stderr.strip()}")
+
+    url = f"http://127.0.0.1:{LOCAL_PORT}"
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/status.php", timeout=5) as response:
+                if json.loads(response.read().decode()).get("installed"):
+                    return url
+        except (OSError, ValueError):
+            pass
+        time.sleep(2)
+    raise RuntimeError("Local Nextcloud did not finish installing within 300s")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Nextcloud WebDAV throughput benchmark")
+    parser.add_argument("--url", default=NEXTCLOUD_URL, help="Nextcloud base URL")
+    parser.add_argument("--user", default=NEXTCLOUD_USER)
+    parser.add_argument("--password", default=NEXTCLOUD_PASSWORD, help="App password (or NEXTCLOUD_PASSWORD)")
+    parser.add_argument("--mount", action="append", help="Mount to benchmark (default: all expected mounts)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=LARGE_SIZES_MB, help="Large file sizes in MB")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE_MB, help="Chunked upload threshold/size in MB")
+    parser.add_argument("--small-count", type=int, default=SMALL_FILE_COUNT)
+    parser.add_argument("--small-size", type=int, default=SMALL_FILE_SIZE, help="Small file size in bytes")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Workers for small-file ops")
+    parser.add_argument("--depth", type=int, default=PROPFIND_DEPTH, help="Directory depth for PROPFIND")
+    parser.add_argument("--propfind-files", type=int, default=PROPFIND_FILES)
+    parser.add_argument("--repeats", type=int, default=PROPFIND_REPEATS)
+    parser.add_argument("--local", action="store_true", help="Benchmark a throwaway local Nextcloud container")
+    parser.add_argument("--keep", action="store_true", help="Leave the --local container running")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    mounts = args.mount or [m["name"] for m in EXPECTED_MOUNTS]
+
+    if args.local:
+        print(f"Starting local Nextcloud ({LOCAL_IMAGE})...")
+        args.url = start_local_nextcloud()
+        args.user, args.password = LOCAL_ADMIN
+        # A fresh container has no external storage; use the home folder
+        mounts = args.mount or [""]
+    elif not args.password:
+        print("❌ Set NEXTCLOUD_PASSWORD (app password) or use --local")
+        sys.exit(2)
+
+    print("=" * 70)
+    print("Nextcloud WebDAV Throughput Benchmark")
+    print("=" * 70)
+    print(f"Timestamp: {datetime.now().isoformat()}")
+    print(f"Target: {args.url} as {args.user}")
+    print(f"Mounts: {', '.join(m or '/' for m in mounts)}")
+
+    results, samples = [], []
+    try:
+        for mount in mounts:
+            print(f"\n{mount or '/'}")
+            result, mount_samples = bench_mount(args, mount)
+            results.append(result)
+            samples += mount_samples
+            if "error" in result:
+                print(f"   ❌ {result['error']}")
+            for row in result.get("large", []):
+                mode = "chunked" if row["chunked"] else "single PUT"
+                print(f"   {row['size_mb']:>4} MB ({mode:<10}) PUT {row['put_mb_s'] or 'FAIL':>8} MB/s"
+                      f"   GET {row['get_mb_s'] or 'FAIL':>8} MB/s")
+            small = result.get("small")
+            if small:
+                print(f"   {small['count']} x {small['size_bytes']}B files: "
+                      f"PUT {small['put_ops_s']} ops/s, GET {small['get_ops_s']} ops/s")
+            propfind = result.get("propfind")
+            if propfind:
+                print(f"   PROPFIND depth {propfind['depth']} ({propfind['entries']} entries): "
+                      f"p50 {propfind['p50_ms']}ms, max {propfind['max_ms']}ms")
+    finally:
+        if args.local and not args.keep:
+            run_command([CONTAINER_RUNTIME, "rm", "-f", LOCAL_CONTAINER])
+
+    artifacts_dir = "artifacts"
+    os.makedirs(artifacts_dir, exist_ok=True)
+    report_path = os.path.join(artifacts_dir, "nextcloud_webdav_bench.json")
+    with open(report_path, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "url": args.url,
+            "user": args.user,
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults saved to: {report_path}")
+
+    run_id = bench_store.record_run("webdav", samples, target=args.url,
+                                    metrics={"results": results})
+    print(f"Run recorded in {bench_store.BENCH_DB}: {run_id}")
+
+    if any("error" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
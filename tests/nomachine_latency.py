@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+NoMachine session-level latency benchmark.
+
+A TCP connect to port 4000 only proves the kernel accepted the socket. This
+probe goes one step further and performs the NX greeting: the client sends
+its hello line and the NX daemon answers with an "NXD-<version>" banner. A
+responsive banner means nxd itself is alive and scheduling, which is what
+remote-desktop lag tracks.
+
+Each host is sampled repeatedly (hosts run concurrently, samples per host run
+sequentially) and connect/handshake percentiles are reported per host and per
+tailnet path - "direct" or "derp:<region>" - taken from `tailscale status
+--json`, so lag complaints can be correlated with relayed connections.
+
+Results go to artifacts/nomachine_latency_results.csv and, per host, into the
+benchmark store (suite "nomachine-handshake") for history and `compare`.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+from datetime import datetime
+
+import bench_store
+from port_probe import HAPPY_EYEBALLS_DELAY
+from nomachine_smoke import NOMACHINE_SERVERS
+
+# Client hello sent after connecting; nxd replies with its NXD-<version> banner
+NX_HELLO = os.getenv("NX_HELLO", "NXSERVER-8.0.0\n").encode()
+NX_BANNER_PREFIX = b"NXD-"
+
+SAMPLES = 10
+INTERVAL = 0.5  # seconds between samples to the same host
+TIMEOUT = 5.0
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (q in 0-100); None for no data."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def tailnet_paths() -> Dict[str, str]:
+    """
+    Map peer DNS names and hostnames to their current path: "direct",
+    "derp:<region>", or "idle" when no connection is active yet.
+    """
+    try:
+        output = subprocess.run(
+            ["tailscale", "status", "--json"],
+            capture_output=True, text=True, timeout=10,
+        ).stdout
+        peers = json.loads(output).get("Peer", {}) if output else {}
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return {}
+
+    paths = {}
+    for meta in peers.values():
+        if meta.get("CurAddr"):
+            path = "direct"
+        elif meta.get("Relay"):
+            path = f"derp:{meta['Relay']}"
+        else:
+            path = "idle"
+        for name in (meta.get("DNSName", "").rstrip("."), meta.get("HostName", "")):
+            if name:
+                paths[name.lower()] = path
+    return paths
+
+
+async def nx_handshake(host: str, port: int, timeout: float = TIMEOUT) -> Dict:
+    """One connect + NX greeting exchange. Times are in milliseconds."""
+    sample = {"success": False, "connect_ms": None, "handshake_ms": None, "banner": "", "error": ""}
+    start = time.monotonic()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY, interleave=1),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        sample["error"] = f"Connection timeout after {timeout}s"
+        return sample
+    except OSError as e:
+        sample["error"] = f"Connect failed: {e}"
+        return sample
+    connected = time.monotonic()
+    sample["connect_ms"] = (connected - start) * 1000
+
+    try:
+        writer.write(NX_HELLO)
+        await writer.drain()
+        banner = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        sample["handshake_ms"] = (time.monotonic() - connected) * 1000
+        sample["banner"] = banner.decode("latin-1").strip()[:80]
+        if banner.startswith(NX_BANNER_PREFIX):
+            sample["success"] = True
+        elif banner:
+            sample["error"] = f"Unexpected banner: {sample['banner']}"
+        else:
+            sample["error"] = "Connection closed without banner"
+    except asyncio.TimeoutError:
+        sample["error"] = f"No banner within {timeout}s"
+    except OSError as e:
+        sample["error"] = f"Handshake failed: {e}"
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return sample
+
+
+async def sample_host(server: Dict, samples: int, interval: float, timeout: float) -> List[Dict]:
+    results = []
+    for i in range(samples):
+        results.append(await nx_handshake(server["host"], server["port"], timeout))
+        if i < samples - 1:
+            await asyncio.sleep(interval)
+    return results
+
+
+async def sample_all(servers: List[Dict], samples: int, interval: float, timeout: float) -> List[List[Dict]]:
+    return await asyncio.gather(*(sample_host(s, samples, interval, timeout) for s in servers))
+
+
+def summarize_host(server: Dict, samples: List[Dict], path: str) -> Dict:
+    ok = [s for s in samples if s["success"]]
+    connect = [s["connect_ms"] for s in samples if s["connect_ms"] is not None]
+    handshake = [s["handshake_ms"] for s in ok]
+
+    def fmt(value: Optional[float]) -> Optional[float]:
+        return round(value, 2) if value is not None else None
+
+    errors = [s["error"] for s in samples if s["error"]]
+    return {
+        "server_name": server["name"],
+        "host": server["host"],
+        "path": path,
+        "samples": len(samples),
+        "successful": len(ok),
+        "connect_p50_ms": fmt(percentile(connect, 50)),
+        "connect_p90_ms": fmt(percentile(connect, 90)),
+        "handshake_p50_ms": fmt(percentile(handshake, 50)),
+        "handshake_p90_ms": fmt(percentile(handshake, 90)),
+        "handshake_p99_ms": fmt(percentile(handshake, 99)),
+        "handshake_max_ms": fmt(max(handshake) if handshake else None),
+        "banner": ok[0]["banner"] if ok else "",
+        "error": errors[0] if errors else "",
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NoMachine NX handshake latency benchmark")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="Handshakes per host")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="Seconds between samples")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="Connect/banner timeout")
+    parser.add_argument("--host", action="append", help="Only probe these server names")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    servers = [s for s in NOMACHINE_SERVERS if not args.host or s["name"] in args.host]
+
+    print("=" * 60)
+    print("NoMachine Handshake Latency Benchmark")
+    print("=" * 60)
+    print(f"Timestamp: {datetime.now().isoformat()}")
+    print(f"Hosts: {len(servers)}, samples/host: {args.samples}")
+    print()
+
+    paths = tailnet_paths()
+    all_samples = asyncio.run(sample_all(servers, args.samples, args.interval, args.timeout))
+    # Path is sampled after the run: the handshakes themselves wake idle peers
+    paths = tailnet_paths() or paths
+
+    summaries = []
+    for server, samples in zip(servers, all_samples):
+        path = paths.get(server["host"].lower()) or paths.get(server["name"].lower(), "unknown")
+        summaries.append(summarize_host(server, samples, path))
+
+    print(f"{'host':<12} {'path':<14} {'ok':>6} {'conn p50':>9} {'hs p50':>8} {'hs p90':>8} {'hs p99':>8}")
+    for s in summaries:
+        icon = "✅" if s["successful"] == s["samples"] else ("⚠️ " if s["successful"] else "❌")
+        print(f"{s['server_name']:<12} {s['path']:<14} {s['successful']:>3}/{s['samples']:<2} "
+              f"{str(s['connect_p50_ms']):>9} {str(s['handshake_p50_ms']):>8} "
+              f"{str(s['handshake_p90_ms']):>8} {str(s['handshake_p99_ms']):>8} {icon}")
+        if s["error"]:
+            print(f"{'':<12} {s['error']}")
+
+    # Per-path rollup
+    by_path: Dict[str, List[float]] = {}
+    for server, samples, summary in zip(servers, all_samples, summaries):
+        by_path.setdefault(summary["path"], []).extend(
+            x["handshake_ms"] for x in samples if x["success"]
+        )
+    print("\nBy path:")
+    for path, values in sorted(by_path.items()):
+        p50, p90 = percentile(values, 50), percentile(values, 90)
+        print(f"  {path:<14} n={len(values):<4} p50={p50 and round(p50, 2)}ms p90={p90 and round(p90, 2)}ms")
+
+    artifacts_dir = "artifacts"
+    os.makedirs(artifacts_dir, exist_ok=True)
+    csv_path = os.path.join(artifacts_dir, "nomachine_latency_results.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["timestamp"] + list(summaries[0].keys()) if summaries else ["timestamp"])
+        writer.writeheader()
+        timestamp = datetime.now().isoformat()
+        for s in summaries:
+            writer.writerow({"timestamp": timestamp, **s})
+    print(f"\nResults saved to: {csv_path}")
+
+    # Per-sample history, keyed by host+path so compare never pools paths
+    records = []
+    for server, samples, summary in zip(servers, all_samples, summaries):
+        for i, sample in enumerate(samples):
+            records.append({
+                "model": f"{server['name']}@{summary['path']}",
+                "request_id": i,
+                "success": sample["success"],
+                "latency": sample["handshake_ms"] / 1000 if sample["handshake_ms"] is not None else None,
+            })
+    run_id = bench_store.record_run("nomachine-handshake", records,
+                                    metrics={"samples": args.samples, "interval": args.interval})
+    print(f"Run recorded in {bench_store.BENCH_DB}: {run_id}")
+
+    if any(s["successful"] == 0 for s in summaries):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@
 NoMachine connectivity smoke test.
 Tests that NoMachine servers are reachable and responsive on port 4000.
 Validates architectural compliance (RDP/VNC ports should NOT be listening).
+
+All host/port pairs are probed concurrently (see port_probe.py) under a global
+deadline, so offline hosts cost one timeout in total rather than one each.
 """
 
 import os
@@ -13,9 +16,11 @@ import time
 import socket
 import subprocess
 import csv
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import port_probe
+
 # Configuration
 NOMACHINE_SERVERS = [
     {"name": "motoko", "host": "motoko.pangolin-vega.ts.net", "port": 4000, "os": "Linux"},
@@ -29,6 +34,11 @@ DEPRECATED_PORTS = {
     "vnc": 5900,
 }
 
+# Probe timeouts (seconds)
+NOMACHINE_TIMEOUT = 5
+DEPRECATED_PORT_TIMEOUT = 2
+SCAN_DEADLINE = NOMACHINE_TIMEOUT + 1  # whole-scan bound
+
 
 def test_port_connectivity(host: str, port: int, timeout: int = 5) -> Tuple[bool, float, str]:
     """
@@ -58,12 +68,32 @@ def test_port_connectivity(host: str, port: int, timeout: int = 5) -> Tuple[bool
         return (False, latency_ms, f"Unexpected error: {str(e)}")
 
 
-def test_deprecated_port_not_listening(host: str, port: int, protocol: str) -> Tuple[bool, str]:
+def scan_all_ports(servers: List[Dict]) -> Dict[Tuple[str, int], Dict]:
+    """Probe every server's NoMachine and deprecated ports concurrently."""
+    targets = []
+    for server in servers:
+        targets.append((server["host"], server["port"], NOMACHINE_TIMEOUT))
+        for port in DEPRECATED_PORTS.values():
+            targets.append((server["host"], port, DEPRECATED_PORT_TIMEOUT))
+    return port_probe.probe_all_sync(targets, deadline=SCAN_DEADLINE)
+
+
+def _probe_tuple(probe: Dict) -> Tuple[bool, float, str]:
+    return (probe["success"], probe["latency_ms"], probe["error"])
+
+
+def test_deprecated_port_not_listening(
+    host: str, port: int, protocol: str, probe: Optional[Dict] = None
+) -> Tuple[bool, str]:
     """
     Test that deprecated RDP/VNC ports are NOT listening (architectural compliance).
+    Uses a pre-computed *probe* result when given.
     Returns: (compliant, message)
     """
-    success, latency, error = test_port_connectivity(host, port, timeout=2)
+    if probe is not None:
+        success, latency, error = _probe_tuple(probe)
+    else:
+        success, latency, error = test_port_connectivity(host, port, timeout=DEPRECATED_PORT_TIMEOUT)
     
     if success:
         return (False, f"FAIL: {protocol.upper()} port {port} is listening (architectural violation)")
@@ -76,8 +106,9 @@ def test_deprecated_port_not_listening(host: str, port: int, protocol: str) -> T
             return (True, f"PASS: {protocol.upper()} port {port} not reachable (DNS may fail, but port not listening)")
 
 
-def test_nomachine_server(server: Dict) -> Dict:
-    """Test a single NoMachine server."""
+def test_nomachine_server(server: Dict, probes: Optional[Dict[Tuple[str, int], Dict]] = None) -> Dict:
+    """Test a single NoMachine server, using results from scan_all_ports() when given."""
+    probes = probes or {}
     print(f"\nTesting {server['name']} ({server['os']})...")
     print(f"  Host: {server['host']}:{server['port']}")
     
@@ -99,7 +130,11 @@ def test_nomachine_server(server: Dict) -> Dict:
     
     # Test NoMachine port 4000
     print("  Testing NoMachine connectivity...")
-    success, latency, error = test_port_connectivity(server["host"], server["port"])
+    probe = probes.get((server["host"], server["port"]))
+    if probe is not None:
+        success, latency, error = _probe_tuple(probe)
+    else:
+        success, latency, error = test_port_connectivity(server["host"], server["port"], timeout=NOMACHINE_TIMEOUT)
     result["nomachine_reachable"] = success
     result["nomachine_latency_ms"] = round(latency, 2)
     result["nomachine_error"] = error
@@ -113,14 +148,16 @@ def test_nomachine_server(server: Dict) -> Dict:
     print("  Testing architectural compliance...")
     
     rdp_compliant, rdp_msg = test_deprecated_port_not_listening(
-        server["host"], DEPRECATED_PORTS["rdp"], "rdp"
+        server["host"], DEPRECATED_PORTS["rdp"], "rdp",
+        probes.get((server["host"], DEPRECATED_PORTS["rdp"])),
     )
     result["rdp_compliant"] = rdp_compliant
     result["rdp_message"] = rdp_msg
     print(f"  {'✅' if rdp_compliant else '❌'} RDP compliance: {rdp_msg}")
     
     vnc_compliant, vnc_msg = test_deprecated_port_not_listening(
-        server["host"], DEPRECATED_PORTS["vnc"], "vnc"
+        server["host"], DEPRECATED_PORTS["vnc"], "vnc",
+        probes.get((server["host"], DEPRECATED_PORTS["vnc"])),
     )
     result["vnc_compliant"] = vnc_compliant
     result["vnc_message"] = vnc_msg
@@ -144,10 +181,14 @@ def main():
     print(f"Testing {len(NOMACHINE_SERVERS)} servers")
     print()
     
+    scan_start = time.time()
+    probes = scan_all_ports(NOMACHINE_SERVERS)
+    print(f"Probed {len(probes)} host/port pairs concurrently in {time.time() - scan_start:.2f}s")
+    
     results = []
     
     for server in NOMACHINE_SERVERS:
-        result = test_nomachine_server(server)
+        result = test_nomachine_server(server, probes)
         results.append(result)
     
     # Summary
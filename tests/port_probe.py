@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Concurrent TCP connection prober for the smoke tests.
+
+Probes every (host, port) pair at once with asyncio, using happy-eyeballs
+(RFC 8305) connection racing so a host with a dead IPv6 (or IPv4) path
+still answers on the other family without waiting out a full timeout.
+A global deadline bounds the whole scan; probes still pending when it
+expires are reported as timed out instead of holding up the run.
+
+Error strings match the ones nomachine_smoke.py has always written to its CSV.
+"""
+
+import time
+import socket
+import asyncio
+from typing import Dict, Iterable, Optional, Tuple
+
+# Delay before racing the next address family (RFC 8305 recommends 250ms)
+HAPPY_EYEBALLS_DELAY = 0.25
+
+ProbeKey = Tuple[str, int]
+
+
+def _result(success: bool, start: float, error: str = "", family: str = "", address: str = "") -> Dict:
+    return {
+        "success": success,
+        "latency_ms": (time.monotonic() - start) * 1000,
+        "error": error,
+        "family": family,
+        "address": address,
+    }
+
+
+async def probe(host: str, port: int, timeout: float = 5) -> Dict:
+    """
+    Open (and immediately close) one TCP connection to *host*:*port*.
+    Returns a dict with success, latency_ms, error, family and address.
+    """
+    start = time.monotonic()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY, interleave=1),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        return _result(False, start, f"Connection timeout after {timeout}s")
+    except socket.gaierror as e:
+        return _result(False, start, f"DNS resolution failed: {str(e)}")
+    except OSError as e:
+        if e.errno is not None:
+            return _result(False, start, f"Connection refused (error code: {e.errno})")
+        # Happy eyeballs raises a plain OSError aggregating each address failure
+        return _result(False, start, f"Connection refused ({str(e)})")
+    except Exception as e:
+        return _result(False, start, f"Unexpected error: {str(e)}")
+
+    result = _result(True, start)
+    sock = writer.get_extra_info("socket")
+    peer = writer.get_extra_info("peername") or ("",)
+    if sock is not None:
+        result["family"] = "ipv6" if sock.family == socket.AF_INET6 else "ipv4"
+    result["address"] = str(peer[0])
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return result
+
+
+async def probe_all(
+    targets: Iterable[Tuple[str, int, float]],
+    deadline: Optional[float] = None,
+) -> Dict[ProbeKey, Dict]:
+    """
+    Probe all ``(host, port, timeout)`` targets concurrently. Returns results
+    keyed by ``(host, port)``. Probes unfinished at *deadline* seconds are
+    cancelled and reported as timeouts.
+    """
+    start = time.monotonic()
+    tasks = {}
+    for host, port, timeout in targets:
+        if (host, port) not in tasks:
+            tasks[(host, port)] = asyncio.ensure_future(probe(host, port, timeout))
+    if not tasks:
+        return {}
+
+    done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    results: Dict[ProbeKey, Dict] = {}
+    for key, task in tasks.items():
+        if task in done:
+            results[key] = task.result()
+        else:
+            results[key] = _result(False, start, f"Connection timeout after {deadline}s (global deadline)")
+    return results
+
+
+def probe_all_sync(
+    targets: Iterable[Tuple[str, int, float]],
+    deadline: Optional[float] = None,
+) -> Dict[ProbeKey, Dict]:
+    """Blocking wrapper around :func:`probe_all` for the synchronous smoke tests."""
+    return asyncio.run(probe_all(list(targets), deadline))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Client-side rate control for the LiteLLM load generators.
+
+TokenBucket paces request admission to the proxy's configured rpm/tpm limits,
+and RetryPolicy turns 429 responses into jittered sleeps that honor the
+server's Retry-After header. burst_test.py uses both for its "retry" and
+"paced" client modes.
+"""
+
+import math
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at *rate* tokens/sec up to *capacity*.
+
+    acquire() reserves tokens immediately (the balance may go negative) and
+    sleeps for the deficit outside the lock, so waiting callers are admitted
+    in arrival order without busy-polling.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float, burst: Optional[float] = None) -> "TokenBucket":
+        """Bucket for a per-minute limit (rpm/tpm); *burst* defaults to one minute's worth."""
+        return cls(limit / 60.0, burst if burst is not None else limit)
+
+    def acquire(self, cost: float = 1.0) -> float:
+        """Block until *cost* tokens are available. Returns seconds waited."""
+        cost = min(cost, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= cost
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given as delta-seconds or an HTTP date.
+    Returns None for anything unusable, including inf/nan.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(seconds, 0.0) if math.isfinite(seconds) else None
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """
+    Jittered backoff for 429/5xx responses.
+
+    When the server sends Retry-After the client waits at least that long,
+    plus up to *jitter* of it extra so retries from a burst don't re-align.
+    Retry-After is never shortened: if it exceeds *max_delay* delay() returns
+    None and the caller gives up instead of sleeping. Without Retry-After,
+    *max_delay* caps the exponential backoff.
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5,
+                 max_delay: float = 60.0, jitter: float = 0.25,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """Seconds to sleep before retry number *attempt* (0-based); None to stop retrying."""
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            return retry_after * (1 + self.rng.uniform(0, self.jitter))
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return self.rng.uniform(0, ceiling)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Stub OpenAI-compatible server for offline performance testing.
+
+Implements just enough of the LiteLLM/vLLM surface for the load generators in
+this directory (burst_test.py, context_smoke.py, cache_benchmark.py) and
+scripts/tests/ai_fabric_smoke_test.py to run on a laptop or in CI:
+
+    GET  /health, /v1/models, /stats
+    POST /v1/chat/completions   (JSON or SSE with "stream": true)
+    POST /v1/embeddings
+
+Latency follows a simple model - time-to-first-token plus completion tokens
+at a fixed tokens/sec, with optional log-normal jitter - and the server can
+enforce a concurrency limit with a bounded queue, an rpm limit answered with
+429 + Retry-After, and inject errors or dropped connections. Any model name
+is accepted. Pure asyncio, no third-party dependencies.
+
+Usage:
+    python3 tests/stub_openai_server.py --port 8000 --ttft 0.2 --tokens-per-sec 40 --max-concurrency 2 --rpm 40
+    LITELLM_URL=http://127.0.0.1:8000 python3 scripts/tests/ai_fabric_smoke_test.py
+"""
+
+import sys
+import time
+import json
+import math
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MODELS = ["akira/qwen2.5-7b", "chat-fast", "chat-deep", "embeddings-general"]
+
+HTTP_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+@dataclass
+class StubConfig:
+    """Latency model, limits and failure injection for the stub server."""
+
+    host: str = "127.0.0.1"
+    port: int = 8000
+    models: List[str] = field(default_factory=lambda: list(DEFAULT_MODELS))
+    ttft: float = 0.1  # seconds to first token
+    tokens_per_sec: float = 50.0  # decode speed
+    completion_tokens: int = 32  # tokens generated when max_tokens allows
+    jitter: float = 0.0  # sigma of log-normal multiplier on latency (0 = none)
+    embed_latency: float = 0.02
+    embed_dim: int = 384
+    max_concurrency: int = 0  # in-flight generations (0 = unlimited)
+    queue_limit: int = -1  # waiting requests before 429 (-1 = unbounded)
+    rpm: int = 0  # requests per minute before 429 (0 = unlimited)
+    error_rate: float = 0.0  # fraction answered with error_status
+    error_status: int = 500
+    disconnect_rate: float = 0.0  # fraction dropped without a response
+    seed: Optional[int] = None
+
+
+class StubServer:
+    """asyncio HTTP/1.1 server implementing the stub endpoints."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.stats: Dict[str, int] = {
+            "requests": 0, "chat_completions": 0, "embeddings": 0, "rate_limited": 0,
+            "errors_injected": 0, "disconnects_injected": 0, "in_flight": 0, "max_in_flight": 0,
+        }
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._recent: deque = deque()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self) -> int:
+        """Bind and start serving. Returns the bound port (useful with port 0)."""
+        if self.config.max_concurrency > 0:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, self.config.host, self.config.port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        port = await self.start()
+        print(f"Stub OpenAI server listening on http://{self.config.host}:{port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self) -> None:
+        if self._server:
+            self._server.close()
+
+    # -- HTTP plumbing -----------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ValueError as exc:
+                    await self._send(writer, 400, self._error(str(exc), "invalid_request_error"),
+                                     {"Connection": "close"})
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                keep_alive = await self._dispatch(method, path, body, writer) and keep_alive
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Next request, None at EOF; ValueError if the request is malformed."""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        parts = request_line.decode("latin-1").split(" ", 2)
+        if len(parts) != 3:
+            raise ValueError(f"malformed request line: {request_line.strip()[:80]!r}")
+        method, path, _ = parts
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise ValueError("invalid Content-Length") from None
+        if length < 0:
+            raise ValueError("invalid Content-Length")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?")[0], headers, body
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, payload: Dict,
+                    extra_headers: Optional[Dict[str, str]] = None) -> bool:
+        data = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}",
+                "Content-Type: application/json", f"Content-Length: {len(data)}"]
+        head += [f"{k}: {v}" for k, v in (extra_headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await writer.drain()
+        return True
+
+    @staticmethod
+    def _error(message: str, kind: str) -> Dict:
+        return {"error": {"message": message, "type": kind}}
+
+    # -- admission and failure injection -----------------------------------
+
+    def _check_rate_limit(self) -> Optional[int]:
+        """Return Retry-After seconds if the rpm window is full, else record the request."""
+        if self.config.rpm <= 0:
+            return None
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.config.rpm:
+            return max(1, math.ceil(60 - (now - self._recent[0])))
+        self._recent.append(now)
+        return None
+
+    def _latency(self, base: float) -> float:
+        if self.config.jitter > 0:
+            return base * self.rng.lognormvariate(0, self.config.jitter)
+        return base
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Route one request. Returns False when the connection must close."""
+        self.stats["requests"] += 1
+
+        if method == "GET" and path == "/health":
+            return await self._send(writer, 200, {"status": "healthy"})
+        if method == "GET" and path in ("/v1/models", "/models"):
+            return await self._send(writer, 200, {
+                "object": "list",
+                "data": [{"id": m, "object": "model", "owned_by": "stub"} for m in self.config.models],
+            })
+        if method == "GET" and path == "/stats":
+            return await self._send(writer, 200, dict(self.stats))
+        if method != "POST" or path not in ("/v1/chat/completions", "/chat/completions",
+                                            "/v1/embeddings", "/embeddings"):
+            return await self._send(writer, 404, self._error(f"No route for {method} {path}", "not_found"))
+
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            return await self._send(writer, 400, self._error("Invalid JSON body", "invalid_request_error"))
+
+        retry_after = self._check_rate_limit()
+        if retry_after is not None:
+            self.stats["rate_limited"] += 1
+            return await self._send(writer, 429, self._error("Rate limit exceeded (rpm)", "rate_limit_error"),
+                                    {"Retry-After": str(retry_after)})
+
+        roll = self.rng.random()
+        if roll < self.config.disconnect_rate:
+            self.stats["disconnects_injected"] += 1
+            return False
+        if roll < self.config.disconnect_rate + self.config.error_rate:
+            self.stats["errors_injected"] += 1
+            return await self._send(writer, self.config.error_status,
+                                    self._error("Injected failure", "server_error"))
+
+        if self._semaphore is not None and self._semaphore.locked():
+            if 0 <= self.config.queue_limit <= self._waiting:
+                self.stats["rate_limited"] += 1
+                return await self._send(writer, 429, self._error("Too many concurrent requests", "rate_limit_error"),
+                                        {"Retry-After": "1"})
+
+        self._waiting += 1
+        try:
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            if path.endswith("embeddings"):
+                return await self._embeddings(request, writer)
+            return await self._chat(request, writer)
+        finally:
+            self.stats["in_flight"] -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    # -- endpoints ---------------------------------------------------------
+
+    async def _chat(self, request: Dict, writer: asyncio.StreamWriter) -> bool:
+        self.stats["chat_completions"] += 1
+        model = request.get("model", self.config.models[0])
+        max_tokens = request.get("max_tokens") or self.config.completion_tokens
+        n_tokens = max(1, min(int(max_tokens), self.config.completion_tokens))
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": n_tokens,
+                 "total_tokens": prompt_chars // 4 + n_tokens}
+        completion_id = f"chatcmpl-stub{self.stats['chat_completions']}"
+        per_token = 1 / self.config.tokens_per_sec if self.config.tokens_per_sec > 0 else 0.0
+
+        await asyncio.sleep(self._latency(self.config.ttft))
+
+        if not request.get("stream"):
+            await asyncio.sleep(self._latency(per_token * n_tokens))
+            return await self._send(writer, 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop" if n_tokens < max_tokens else "length",
+                             "message": {"role": "assistant", "content": " ".join(["stub"] * n_tokens)}}],
+                "usage": usage,
+            })
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        for i in range(n_tokens):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": "stub "} if i else {"role": "assistant", "content": "stub "},
+                             "finish_reason": None}],
+            }
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            if i < n_tokens - 1:
+                await asyncio.sleep(self._latency(per_token))
+        final = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+        writer.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        await writer.drain()
+        return False
+
+    async def _embeddings(self, request: Dict, writer: asyncio.StreamWriter) -> bool:
+        self.stats["embeddings"] += 1
+        inputs = request.get("input", "")
+        if not isinstance(inputs, list):
+            inputs = [inputs]
+        await asyncio.sleep(self._latency(self.config.embed_latency))
+
+        data = []
+        for index, text in enumerate(inputs):
+            # Deterministic pseudo-vector so identical input embeds identically
+            rng = random.Random(hashlib.sha256(str(text).encode()).digest())
+            data.append({"object": "embedding", "index": index,
+                         "embedding": [round(rng.uniform(-1, 1), 6) for _ in range(self.config.embed_dim)]})
+        tokens = sum(len(str(t)) // 4 for t in inputs)
+        return await self._send(writer, 200, {
+            "object": "list",
+            "model": request.get("model", self.config.models[0]),
+            "data": data,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+def start_in_thread(config: StubConfig) -> Tuple[str, StubServer]:
+    """
+    Run a stub server on a background event loop. Returns its base URL and the
+    server (whose ``stats`` can be read directly). Use port 0 for an ephemeral port.
+    """
+    server = StubServer(config)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    bound: Dict[str, int] = {}
+
+    def run() -> None:
+        asyncio.set_event_loop(loop)
+        bound["port"] = loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(timeout=10)
+    return f"http://{config.host}:{bound['port']}", server
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = StubConfig()
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible server for offline perf testing")
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--models", default=",".join(defaults.models), help="Comma-separated model ids")
+    parser.add_argument("--ttft", type=float, default=defaults.ttft, help="Time to first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults.tokens_per_sec)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens,
+                        help="Tokens generated per completion (capped by max_tokens)")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter,
+                        help="Log-normal sigma applied to latencies (0 = deterministic)")
+    parser.add_argument("--embed-latency", type=float, default=defaults.embed_latency)
+    parser.add_argument("--embed-dim", type=int, default=defaults.embed_dim)
+    parser.add_argument("--max-concurrency", type=int, default=defaults.max_concurrency,
+                        help="Concurrent generations (0 = unlimited)")
+    parser.add_argument("--queue-limit", type=int, default=defaults.queue_limit,
+                        help="Queued requests before answering 429 (-1 = unbounded)")
+    parser.add_argument("--rpm", type=int, default=defaults.rpm, help="Requests/minute before 429 (0 = off)")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--disconnect-rate", type=float, default=defaults.disconnect_rate)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = StubConfig(
+        host=args.host,
+        port=args.port,
+        models=[m for m in args.models.split(",") if m],
+        ttft=args.ttft,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        jitter=args.jitter,
+        embed_latency=args.embed_latency,
+        embed_dim=args.embed_dim,
+        max_concurrency=args.max_concurrency,
+        queue_limit=args.queue_limit,
+        rpm=args.rpm,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        disconnect_rate=args.disconnect_rate,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(StubServer(config).serve_forever())
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 MikeT LLC. All rights reserved.
+
+"""
+Traffic trace record-and-replay for LiteLLM/vLLM benchmarking.
+
+Recording runs a pass-through proxy in front of LiteLLM and captures the
+*shape* of each request - arrival offset, endpoint, model, estimated prompt
+tokens, max_tokens, streaming flag and a short prompt hash - without storing
+any prompt content. Traces are JSONL by default, or Parquet when pyarrow is
+installed and the path ends in .parquet.
+
+Replay re-issues a trace against any base URL at its original arrival timing,
+scaled by a speed factor (2.0 = twice as fast). burst_test.py and
+cache_benchmark.py consume traces through this module.
+
+Usage:
+    python3 tests/traffic_trace.py record --listen 4001 --upstream http://127.0.0.1:4000 --out trace.jsonl
+    python3 tests/traffic_trace.py info trace.jsonl
+    python3 tests/burst_test.py --replay trace.jsonl --speed 2
+"""
+
+import os
+import time
+import json
+import hashlib
+import argparse
+import threading
+import http.client
+import concurrent.futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Fields written for every record, in column order
+TRACE_FIELDS = [
+    "t", "endpoint", "model", "prompt_tokens", "max_tokens", "stream",
+    "prompt_hash", "status_code", "latency",
+]
+
+# Request paths worth recording, mapped to a short endpoint name
+RECORDED_PATHS = {
+    "/v1/chat/completions": "chat",
+    "/chat/completions": "chat",
+    "/v1/completions": "completion",
+    "/v1/embeddings": "embedding",
+    "/embeddings": "embedding",
+}
+
+# Headers that must not be copied verbatim between hops
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "host"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimation: ~4 chars per token (matches context_smoke.py)."""
+    return len(text) // 4
+
+
+def _prompt_text(request: Dict) -> str:
+    """Flatten the prompt portion of an OpenAI-style request body."""
+    if "messages" in request:
+        parts = []
+        for message in request["messages"]:
+            content = message.get("content") or ""
+            if isinstance(content, list):
+                content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+            parts.append(content)
+        return "\n".join(parts)
+    value = request.get("prompt", request.get("input", ""))
+    if isinstance(value, list):
+        return "\n".join(str(v) for v in value)
+    return str(value)
+
+
+def request_shape(endpoint: str, request: Dict) -> Dict:
+    """Reduce a request body to the fields a trace records."""
+    text = _prompt_text(request)
+    return {
+        "endpoint": endpoint,
+        "model": request.get("model", ""),
+        "prompt_tokens": estimate_tokens(text),
+        "max_tokens": request.get("max_tokens"),
+        "stream": bool(request.get("stream", False)),
+        "prompt_hash": hashlib.sha256(text.encode()).hexdigest()[:12],
+    }
+
+
+def synthesize_prompt(record: Dict) -> str:
+    """
+    Build a prompt with the recorded token count. Records with the same
+    prompt_hash get identical text, so replay preserves repeat structure.
+    """
+    seed = record.get("prompt_hash") or "trace"
+    target = max(int(record.get("prompt_tokens") or 0), 1)
+    header = f"[{seed}] Summarize the following text.\n"
+    sentence = f"Sample sentence {seed}. "
+    filler = sentence * (target * 4 // len(sentence) + 1)
+    return (header + filler)[: max(target * 4, len(header))]
+
+
+# ---------------------------------------------------------------------------
+# Trace files
+# ---------------------------------------------------------------------------
+
+def write_trace(path: str, records: List[Dict]) -> None:
+    """Write *records* as JSONL, or Parquet when *path* ends in .parquet."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - depends on optional deps
+            raise RuntimeError("pyarrow is required for Parquet traces (pip install pyarrow)") from exc
+        columns = {field: [r.get(field) for r in records] for field in TRACE_FIELDS}
+        pq.write_table(pa.table(columns), path, compression="zstd")
+        return
+
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps({k: record.get(k) for k in TRACE_FIELDS}, separators=(",", ":")) + "\n")
+
+
+def load_trace(path: str) -> List[Dict]:
+    """Load a JSONL or Parquet trace, sorted by arrival offset."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - depends on optional deps
+            raise RuntimeError("pyarrow is required for Parquet traces (pip install pyarrow)") from exc
+        records = pq.read_table(path).to_pylist()
+    else:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    records.sort(key=lambda r: r.get("t") or 0.0)
+    return records
+
+
+def summarize_trace(records: List[Dict]) -> Dict:
+    """Aggregate statistics used by the `info` command and benchmark reports."""
+    if not records:
+        return {"requests": 0}
+    duration = (records[-1].get("t") or 0.0) - (records[0].get("t") or 0.0)
+    gaps = [b["t"] - a["t"] for a, b in zip(records, records[1:])]
+    models: Dict[str, int] = {}
+    for r in records:
+        models[r.get("model", "")] = models.get(r.get("model", ""), 0) + 1
+    return {
+        "requests": len(records),
+        "duration": round(duration, 3),
+        "mean_rps": round(len(records) / duration, 3) if duration > 0 else None,
+        "mean_gap": round(sum(gaps) / len(gaps), 3) if gaps else None,
+        "distinct_prompts": len({r.get("prompt_hash") for r in records}),
+        "mean_prompt_tokens": round(sum(r.get("prompt_tokens") or 0 for r in records) / len(records), 1),
+        "models": models,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+def replay_trace(records: List[Dict], send: Callable[[int, Dict], Dict],
+                 speed: float = 1.0, max_workers: int = 64) -> List[Dict]:
+    """
+    Issue *records* through ``send(index, record)`` at their recorded arrival
+    offsets divided by *speed*. Each result dict is annotated with the
+    scheduled offset and how late the request actually started.
+    """
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    if not records:
+        return []
+
+    base_t = records[0].get("t") or 0.0
+    start = time.monotonic()
+
+    def timed_send(index: int, record: Dict, scheduled: float) -> Dict:
+        lag = time.monotonic() - start - scheduled
+        result = send(index, record)
+        result["scheduled_offset"] = round(scheduled, 4)
+        result["start_lag"] = round(max(lag, 0.0), 4)
+        return result
+
+    futures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, record in enumerate(records):
+            scheduled = ((record.get("t") or 0.0) - base_t) / speed
+            delay = scheduled - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(timed_send, index, record, scheduled))
+        return [f.result() for f in futures]
+
+
+# ---------------------------------------------------------------------------
+# Recording proxy
+# ---------------------------------------------------------------------------
+
+class TraceRecorder:
+    """
+    Thread-safe accumulator that flushes each record to a JSONL file.
+
+    Offsets restart at 0 for every recording, so an existing trace is never
+    appended to: it raises FileExistsError unless *overwrite* is set.
+    """
+
+    def __init__(self, path: str, overwrite: bool = False):
+        if not overwrite and os.path.exists(path):
+            raise FileExistsError(f"{path} already exists (use --force to overwrite)")
+        self.path = path
+        self.records: List[Dict] = []
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._jsonl = None if path.endswith(".parquet") else open(path, "w" if overwrite else "x")
+
+    def add(self, record: Dict) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self._jsonl:
+                self._jsonl.write(json.dumps({k: record.get(k) for k in TRACE_FIELDS},
+                                             separators=(",", ":")) + "\n")
+                self._jsonl.flush()
+
+    def offset(self) -> float:
+        return round(time.monotonic() - self._start, 4)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._jsonl:
+                self._jsonl.close()
+            else:
+                write_trace(self.path, self.records)
+
+
+def make_proxy_handler(upstream: str, recorder: TraceRecorder):
+    """Build a pass-through handler that records request shapes."""
+    target = urlsplit(upstream)
+    connection_cls = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+
+    class RecordingProxyHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _forward(self, method: str) -> None:
+            arrival = recorder.offset()
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else None
+
+            shape = None
+            endpoint = RECORDED_PATHS.get(self.path.split("?")[0])
+            if endpoint and body:
+                try:
+                    shape = request_shape(endpoint, json.loads(body))
+                except (ValueError, AttributeError):
+                    shape = None
+
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+            conn = connection_cls(target.hostname, target.port, timeout=600)
+            start = time.monotonic()
+            status = 502
+            headers_sent = False
+            try:
+                conn.request(method, target.path.rstrip("/") + self.path, body=body, headers=headers)
+                upstream_resp = conn.getresponse()
+                status = upstream_resp.status
+                self.send_response(status)
+                for key, value in upstream_resp.getheaders():
+                    if key.lower() not in HOP_HEADERS:
+                        self.send_header(key, value)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                headers_sent = True
+                # Copy incrementally so SSE streams keep their timing
+                while True:
+                    chunk = upstream_resp.read1(65536)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    self.wfile.flush()
+            except OSError as e:
+                if not headers_sent:
+                    self.send_error(502, f"Upstream error: {e}")
+            finally:
+                conn.close()
+                if shape is not None:
+                    shape.update({
+                        "t": arrival,
+                        "status_code": status,
+                        "latency": round(time.monotonic() - start, 4),
+                    })
+                    recorder.add(shape)
+
+        def do_GET(self):
+            self._forward("GET")
+
+        def do_POST(self):
+            self._forward("POST")
+
+    return RecordingProxyHandler
+
+
+def record(listen_host: str, listen_port: int, upstream: str, out_path: str,
+           duration: Optional[float] = None, overwrite: bool = False) -> int:
+    """Run the recording proxy until interrupted (or *duration* elapses)."""
+    recorder = TraceRecorder(out_path, overwrite=overwrite)
+    server = ThreadingHTTPServer((listen_host, listen_port), make_proxy_handler(upstream, recorder))
+    server.daemon_threads = True
+    print(f"Recording {listen_host}:{listen_port} -> {upstream} into {out_path} (Ctrl-C to stop)")
+
+    if duration:
+        threading.Timer(duration, server.shutdown).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        recorder.close()
+
+    print(f"Recorded {len(recorder.records)} requests")
+    return len(recorder.records)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Record and inspect LiteLLM traffic traces")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rec = subparsers.add_parser("record", help="Run a recording pass-through proxy")
+    rec.add_argument("--listen-host", default="127.0.0.1")
+    rec.add_argument("--listen", type=int, default=4001, help="Port to listen on")
+    rec.add_argument("--upstream", default=os.getenv("LITELLM_URL", "http://127.0.0.1:4000"),
+                     help="Proxy base URL to forward to")
+    rec.add_argument("--out", required=True, help="Trace path (.jsonl or .parquet)")
+    rec.add_argument("--duration", type=float, help="Stop recording after N seconds")
+    rec.add_argument("--force", action="store_true", help="Overwrite --out if it already exists")
+
+    info = subparsers.add_parser("info", help="Summarize a trace")
+    info.add_argument("trace")
+
+    convert = subparsers.add_parser("convert", help="Convert between JSONL and Parquet")
+    convert.add_argument("src")
+    convert.add_argument("dst")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "record":
+        try:
+            record(args.listen_host, args.listen, args.upstream, args.out, args.duration, args.force)
+        except FileExistsError as exc:
+            raise SystemExit(f"Error: {exc}")
+    elif args.command == "info":
+        print(json.dumps(summarize_trace(load_trace(args.trace)), indent=2))
+    elif args.command == "convert":
+        records = load_trace(args.src)
+        write_trace(args.dst, records)
+        print(f"Wrote {len(records)} records to {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,11 @@ reuse from other Python entrypoints.
 """
 from __future__ import annotations
 
+import http.client
 import json
 import os
 import shlex
+import socket
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
@@ -35,6 +37,15 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 ANSIBLE_DIR = REPO_ROOT / "ansible"
 DEFAULT_INVENTORY = ANSIBLE_DIR / "inventory"
 
+# Mode agent (``mode_switcher.py agent``) on the target workstation
+MODE_AGENT_PORT = int(os.environ.get("MODE_AGENT_PORT", "8765"))
+MODE_AGENT_TOKEN_FILE = Path(
+    os.environ.get("MODE_AGENT_TOKEN_FILE", Path.home() / ".config" / "tailnet" / "mode-agent.token")
+)
+MODE_AGENT_CONNECT_TIMEOUT = 3.0
+# A switch can wait for a model to load into VRAM before the agent answers
+MODE_AGENT_SWITCH_TIMEOUT = 420.0
+
 
 class TailnetCommandError(RuntimeError):
     """Raised when an underlying command invocation fails."""
@@ -132,19 +143,91 @@ def fetch_tailnet_status() -> List[TailnetDevice]:
     return devices
 
 
+def _mode_agent_token() -> Optional[str]:
+    token = os.environ.get("MODE_AGENT_TOKEN")
+    if token:
+        return token.strip()
+    try:
+        return MODE_AGENT_TOKEN_FILE.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def switch_device_mode_via_agent(
+    hostname: str,
+    mode: str,
+    *,
+    port: int = MODE_AGENT_PORT,
+    token: Optional[str] = None,
+) -> Optional[Dict[str, object]]:
+    """Switch *hostname* into *mode* through its mode agent.
+
+    Returns the agent's JSON result, or ``None`` when no agent is reachable
+    (nothing listening, host down, no token configured) so callers can fall
+    back to Ansible.
+
+    Raises:
+        TailnetCommandError: If the agent answered but rejected or failed the
+            switch.  Falling back to Ansible would only repeat the failure.
+    """
+
+    token = token or _mode_agent_token()
+    if not token:
+        return None
+
+    connection = http.client.HTTPConnection(hostname, port, timeout=MODE_AGENT_CONNECT_TIMEOUT)
+    try:
+        try:
+            connection.connect()
+        except (OSError, socket.timeout):
+            return None
+        connection.sock.settimeout(MODE_AGENT_SWITCH_TIMEOUT)
+        console.log(f"Switching {hostname} to {mode} via mode agent on port {port}")
+        connection.request(
+            "POST",
+            "/v1/mode",
+            body=json.dumps({"mode": mode, "wait": True}),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        body = response.read()
+    except (OSError, http.client.HTTPException) as exc:
+        raise TailnetCommandError(f"Mode agent on {hostname} failed mid-request: {exc}") from exc
+    finally:
+        connection.close()
+
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        payload = {"error": body.decode(errors="replace")}
+    if response.status != 200:
+        raise TailnetCommandError(
+            f"Mode agent on {hostname} returned {response.status}: {payload.get('error', payload)}"
+        )
+    return payload
+
+
 def switch_device_mode(
     hostname: str,
     mode: str,
     *,
     inventory: Path = DEFAULT_INVENTORY,
     playbook: Optional[Path] = None,
-) -> None:
-    """Switch the workstation *hostname* into *mode* using Ansible.
+    use_agent: bool = True,
+) -> Optional[Dict[str, object]]:
+    """Switch the workstation *hostname* into *mode*.
 
-    The helper looks for a playbook named ``workstations/switch_mode.yml`` by
-    default.  A custom path can be provided via *playbook*.
+    The host's mode agent is tried first (seconds, no Ansible run); its result
+    is returned.  If no agent answers, the helper falls back to the playbook
+    ``workstations/switch_mode.yml`` (or *playbook*) and returns ``None``.
     """
 
+    if use_agent:
+        result = switch_device_mode_via_agent(hostname, mode)
+        if result is not None:
+            return result
+        console.log(f"No mode agent on {hostname}:{MODE_AGENT_PORT}; falling back to Ansible")
+
     selected_playbook = playbook or (ANSIBLE_DIR / "workstations" / "switch_mode.yml")
 
     if not selected_playbook.exists():
@@ -162,6 +245,7 @@ def switch_device_mode(
         extra_vars,
     ]
     _run_command(command)
+    return None
 
 
 def deploy_workstation(
@@ -256,16 +340,31 @@ def switch_mode(  # pragma: no cover - thin typer wrapper
         "-p",
         help="Override path to the switch_mode playbook.",
     ),
+    no_agent: bool = typer.Option(
+        False,
+        "--no-agent",
+        help="Skip the host's mode agent and always run the Ansible playbook.",
+    ),
 ) -> None:
-    """Switch a workstation into a predefined mode using Ansible."""
+    """Switch a workstation into a predefined mode (mode agent, else Ansible)."""
 
     try:
-        switch_device_mode(hostname, mode, inventory=inventory, playbook=playbook)
+        result = switch_device_mode(
+            hostname, mode, inventory=inventory, playbook=playbook, use_agent=not no_agent
+        )
     except TailnetCommandError as exc:
         console.print(f"[red]{exc}[/red]")
         raise typer.Exit(code=1) from exc
 
-    console.print(f"[green]Mode '{mode}' applied to {hostname}.[/green]")
+    if result is None:
+        console.print(f"[green]Mode '{mode}' applied to {hostname}.[/green]")
+        return
+    timings = [f"units {result['switch']:.2f}s"]
+    if result.get("ready") is not None:
+        timings.append(f"ready {result['ready']:.2f}s")
+    if result.get("vram") is not None:
+        timings.append(f"VRAM released {result['vram']:.2f}s")
+    console.print(f"[green]Mode '{mode}' applied to {hostname} via agent ({', '.join(timings)}).[/green]")
 
 
 @APP.command()